@@ -0,0 +1,5 @@
+"""
+Reproducible benchmarks for every puzzle type and solver.
+
+Run with ``python -m benchmarks``; see benchmarks.runner for options.
+"""
@@ -0,0 +1,163 @@
+"""
+Fixed benchmark instances for each puzzle type, at increasing sizes:
+word ladders by path length, MN boards by optimal depth, sudokus by
+difficulty and peg solitaire boards by size.
+"""
+import os
+
+# the words file at the root of the project
+WORDS_PATH = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "words")
+
+_word_set = None
+
+
+def word_set():
+    """
+    Return the set of words in WORDS_PATH, read once per process.
+
+    @rtype: set[str]
+    """
+    global _word_set
+    if _word_set is None:
+        with open(WORDS_PATH, "r") as words:
+            _word_set = set(words.read().split())
+    return _word_set
+
+
+class BenchmarkCase:
+    """
+    One benchmark instance: a puzzle of some type at some level of
+    difficulty, and the solver strategies worth timing on it: those
+    named in strategies, or every solver in puzzle_registry when
+    strategies is None.
+    """
+
+    def __init__(self, name, puzzle_type, level, strategies, make):
+        """
+        Create a new BenchmarkCase self whose puzzle is built by make().
+
+        @type self: BenchmarkCase
+        @type name: str
+        @type puzzle_type: str
+        @type level: str
+        @type strategies: list[str] | None
+        @type make: callable
+        @rtype: None
+        """
+        self.name, self.puzzle_type, self.level = name, puzzle_type, level
+        self.strategies, self.make = strategies, make
+
+    def solvers(self):
+        """
+        Return the names of the solver strategies timed on self.
+
+        @type self: BenchmarkCase
+        @rtype: list[str]
+
+        >>> BenchmarkCase("a", "mn", "easy", ["dfs"], None).solvers()
+        ['dfs']
+        >>> "beam" in BenchmarkCase("a", "mn", "easy", None, None).solvers()
+        True
+        """
+        if self.strategies is None:
+            from puzzle_registry import solver_names
+            return solver_names()
+        return self.strategies
+
+
+def _ladder(from_word, to_word):
+    def make():
+        from word_ladder_puzzle import WordLadderPuzzle
+        return WordLadderPuzzle(from_word, to_word, word_set())
+    return make
+
+
+def _mn(rows, to_rows):
+    def make():
+        from mn_puzzle import MNPuzzle
+        return MNPuzzle(tuple(tuple(r) for r in rows),
+                        tuple(tuple(r) for r in to_rows))
+    return make
+
+
+def _sudoku(symbols):
+    def make():
+        from sudoku_puzzle import SudokuPuzzle
+        return SudokuPuzzle(9, list(symbols), set("123456789"))
+    return make
+
+
+def _peg(rows, columns, hole):
+    def make():
+        from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+        marker = [["*"] * columns for _ in range(rows)]
+        marker[hole[0]][hole[1]] = "."
+        return GridPegSolitairePuzzle(marker, {"*", ".", "#"})
+    return make
+
+
+_GOAL_2X3 = ["123", "45*"]
+_GOAL_3X3 = ["123", "456", "78*"]
+_PEG_DEEP = ["dfs", "idastar", "wastar", "beam"]
+
+CASES = [
+    # word ladders, by number of steps in a shortest ladder
+    BenchmarkCase("ladder-2", "word_ladder", "length 2",
+                  None, _ladder("cast", "vase")),
+    BenchmarkCase("ladder-3", "word_ladder", "length 3",
+                  None, _ladder("lead", "gold")),
+    BenchmarkCase("ladder-4", "word_ladder", "length 4",
+                  None, _ladder("same", "cost")),
+    BenchmarkCase("ladder-5", "word_ladder", "length 5",
+                  None, _ladder("head", "tail")),
+    BenchmarkCase("ladder-6", "word_ladder", "length 6",
+                  None, _ladder("wheat", "bread")),
+    BenchmarkCase("ladder-8", "word_ladder", "length 8",
+                  None, _ladder("black", "white")),
+    # MN puzzles, by number of moves in an optimal solution
+    BenchmarkCase("mn-2x3-5", "mn", "depth 5",
+                  None, _mn(["413", "2*5"], _GOAL_2X3)),
+    BenchmarkCase("mn-2x3-8", "mn", "depth 8",
+                  None, _mn(["542", "13*"], _GOAL_2X3)),
+    BenchmarkCase("mn-2x3-11", "mn", "depth 11",
+                  None, _mn(["534", "1*2"], _GOAL_2X3)),
+    BenchmarkCase("mn-2x3-15", "mn", "depth 15",
+                  None, _mn(["*42", "351"], _GOAL_2X3)),
+    BenchmarkCase("mn-3x3-5", "mn", "depth 5", None,
+                  _mn(["152", "483", "7*6"], _GOAL_3X3)),
+    BenchmarkCase("mn-3x3-12", "mn", "depth 12", None,
+                  _mn(["152", "8*6", "437"], _GOAL_3X3)),
+    BenchmarkCase("mn-3x3-18", "mn", "depth 18", None,
+                  _mn(["42*", "715", "386"], _GOAL_3X3)),
+    # sudokus, by the grade sudoku_generator gives them, and the
+    # newspaper puzzles from sudoku_puzzle.py
+    BenchmarkCase("sudoku-easy", "sudoku", "easy", None, _sudoku(
+        "**7*5*4918********1*4*2*****15**9*87*********"
+        "78*6**93*****6*1*5********2268*4*3**")),
+    BenchmarkCase("sudoku-medium", "sudoku", "medium", None, _sudoku(
+        "**2*1****9***45***543*****7*2***8**9**6*3*4**"
+        "1**5***7*3*****798***15***4****9*3**")),
+    BenchmarkCase("sudoku-hard", "sudoku", "hard", None, _sudoku(
+        "58**4***33*1****9**94**18*******3*5*****5****"
+        "*2*9*******72**46**5****3*14***1**82")),
+    BenchmarkCase("sudoku-star", "sudoku", "newspaper", None, _sudoku(
+        "***7*8*1***7*9***69*31*****35*8**6*1*********"
+        "1*6**9*48*****12*78***7*4***6*3*2***")),
+    BenchmarkCase("sudoku-3-star", "sudoku", "3 stars", None, _sudoku(
+        "***9*2****91***63**3**7**8*3*******8**9***2**"
+        "5*******7*7**8**4**45***81****3*6***")),
+    BenchmarkCase("sudoku-4-star", "sudoku", "4 stars", None, _sudoku(
+        "56***7**9*7**48*31*********43********8*****9*"
+        "*******26*********19*36**7*7**1***42")),
+    # peg solitaire, by board size
+    BenchmarkCase("peg-3x4", "peg", "3x4", None, _peg(3, 4, (0, 0))),
+    BenchmarkCase("peg-4x4", "peg", "4x4", None, _peg(4, 4, (0, 1))),
+    # from 5x5 on, breadth-first, bidirectional, Dijkstra and A* searches
+    # keep too many boards open to finish in a benchmark run
+    BenchmarkCase("peg-5x5", "peg", "5x5", _PEG_DEEP, _peg(5, 5, (3, 2))),
+    BenchmarkCase("peg-6x6", "peg", "6x6", _PEG_DEEP, _peg(6, 6, (0, 1))),
+]
+
+# cases by name
+BY_NAME = {case.name: case for case in CASES}
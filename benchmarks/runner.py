@@ -0,0 +1,282 @@
+"""
+Run the benchmark corpus and compare the results to a saved baseline.
+
+Every (case, strategy) pair is measured in a fresh process, so peak
+RSS belongs to that solve alone and no cache carries over between runs:
+
+    python -m benchmarks                        # run and print everything
+    python -m benchmarks --save-baseline b.json # record a baseline
+    python -m benchmarks --baseline b.json      # flag regressions
+
+The exit status is 1 when any regression was flagged.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+from time import perf_counter
+from benchmarks.corpus import CASES, BY_NAME
+from puzzle_registry import get_solver, solver_names
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows: peak RSS is then not recorded
+    resource = None
+
+
+def solve(strategy, puzzle, stats):
+    """
+    Return what the solver named strategy in puzzle_registry returns
+    for puzzle, recording what it did in stats.  Depth-first searches
+    get a fresh DeadStateCache, so that earlier repeats don't make later
+    ones free.
+
+    @type strategy: str
+    @type puzzle: Puzzle
+    @type stats: SearchStats
+    @rtype: PuzzleNode | None
+    """
+    solver = get_solver(strategy)
+    if strategy == "dfs":
+        from dead_state_cache import DeadStateCache
+        return solver(puzzle, dead_states=DeadStateCache(), stats=stats)
+    return solver(puzzle, stats=stats)
+
+
+def peak_rss_kb():
+    """
+    Return the peak resident set size of this process in kilobytes, or
+    None where the resource module is unavailable.
+
+    @rtype: int | None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure(name, strategy, repeat=1):
+    """
+    Return the measurements of solving case name with strategy, the
+    best of repeat runs: wall time in seconds, nodes expanded and
+    generated, nodes expanded per second, peak RSS in kilobytes and
+    whether a solution was found.
+
+    @type name: str
+    @type strategy: str
+    @type repeat: int
+    @rtype: dict
+    """
+    from search_stats import SearchStats
+    case = BY_NAME[name]
+    best = None
+    for _ in range(repeat):
+        puzzle, stats = case.make(), SearchStats()
+        start = perf_counter()
+        node = solve(strategy, puzzle, stats)
+        wall = perf_counter() - start
+        if best is None or wall < best["wall"]:
+            best = {"wall": wall,
+                    "nodes_expanded": stats.nodes_expanded,
+                    "nodes_generated": stats.nodes_generated,
+                    "nodes_per_sec": (stats.nodes_expanded / wall
+                                      if wall > 0 else 0.0),
+                    "solved": node is not None}
+    best["peak_rss_kb"] = peak_rss_kb()
+    best["status"] = "ok"
+    return best
+
+
+def _child(conn, name, strategy, repeat):
+    # Process target: send measure's result, or the error, back on conn
+    try:
+        conn.send(measure(name, strategy, repeat))
+    except Exception as e:
+        conn.send({"status": "error", "error": repr(e)})
+    conn.close()
+
+
+def run_isolated(name, strategy, repeat=1, timeout=None):
+    """
+    Return measure(name, strategy, repeat) run in a freshly spawned
+    process, or a result with status "timeout" if it takes longer than
+    timeout seconds.
+
+    @type name: str
+    @type strategy: str
+    @type repeat: int
+    @type timeout: float | None
+    @rtype: dict
+    """
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_child,
+                              args=(sender, name, strategy, repeat))
+    process.start()
+    sender.close()
+    if receiver.poll(timeout):
+        result = receiver.recv()
+    else:
+        process.terminate()
+        result = {"status": "timeout"}
+    process.join()
+    return result
+
+
+def run(names=None, strategies=None, repeat=1, timeout=60.0, isolate=True,
+        report=None):
+    """
+    Return a dict mapping "case/strategy" to the measurements of every
+    case in names (all of CASES when None) with every strategy in
+    strategies that the case allows (all of them when None).  Each
+    result is passed to report(key, result) as it arrives.
+
+    @type names: list[str] | None
+    @type strategies: list[str] | None
+    @type repeat: int
+    @type timeout: float | None
+    @type isolate: bool
+    @type report: callable | None
+    @rtype: dict[str, dict]
+
+    >>> results = run(["peg-3x4"], ["dfs"], isolate=False)
+    >>> r = results["peg-3x4/dfs"]
+    >>> r["solved"], r["nodes_expanded"] > 0
+    (True, True)
+    """
+    cases = CASES if names is None else [BY_NAME[name] for name in names]
+    results = {}
+    for case in cases:
+        for strategy in case.solvers():
+            if strategies is not None and strategy not in strategies:
+                continue
+            key = "{}/{}".format(case.name, strategy)
+            if isolate:
+                result = run_isolated(case.name, strategy, repeat, timeout)
+            else:
+                result = measure(case.name, strategy, repeat)
+            results[key] = result
+            if report is not None:
+                report(key, result)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=0.05):
+    """
+    Return a list of messages describing every regression of results
+    against baseline: a case that no longer solves or finishes, wall
+    time or peak RSS more than tolerance above the baseline (ignoring
+    time differences under min_seconds, which are noise), or more
+    nodes expanded than before.
+
+    @type results: dict[str, dict]
+    @type baseline: dict[str, dict]
+    @type tolerance: float
+    @type min_seconds: float
+    @rtype: list[str]
+
+    >>> old = {"a/bfs": {"status": "ok", "solved": True, "wall": 1.0,
+    ...                  "nodes_expanded": 10, "peak_rss_kb": 100}}
+    >>> new = {"a/bfs": {"status": "ok", "solved": True, "wall": 1.5,
+    ...                  "nodes_expanded": 10, "peak_rss_kb": 110}}
+    >>> compare(new, old)
+    ['a/bfs: wall time 1.000s -> 1.500s (+50%)']
+    >>> compare(new, old, tolerance=0.6)
+    []
+    """
+    messages = []
+    for key in sorted(results):
+        new, old = results[key], baseline.get(key)
+        if old is None or old.get("status") != "ok":
+            continue
+        if new.get("status") != "ok":
+            messages.append("{}: {}".format(key, new.get("status")))
+            continue
+        if old["solved"] and not new["solved"]:
+            messages.append("{}: no longer solved".format(key))
+        if (new["wall"] > old["wall"] * (1 + tolerance) and
+                new["wall"] - old["wall"] >= min_seconds):
+            messages.append("{}: wall time {:.3f}s -> {:.3f}s ({:+.0%})".format(
+                key, old["wall"], new["wall"], new["wall"] / old["wall"] - 1))
+        if new["nodes_expanded"] > old["nodes_expanded"]:
+            messages.append("{}: nodes expanded {} -> {}".format(
+                key, old["nodes_expanded"], new["nodes_expanded"]))
+        if (new.get("peak_rss_kb") and old.get("peak_rss_kb") and
+                new["peak_rss_kb"] > old["peak_rss_kb"] * (1 + tolerance)):
+            messages.append("{}: peak RSS {}KB -> {}KB".format(
+                key, old["peak_rss_kb"], new["peak_rss_kb"]))
+    return messages
+
+
+def _format(key, result):
+    # One line of the report for result
+    if result.get("status") != "ok":
+        return "{:<24} {}".format(key, result.get("error", result["status"]))
+    return "{:<24} {:>9.3f}s {:>10} nodes {:>11.0f} nodes/s {:>8} KB{}".format(
+        key, result["wall"], result["nodes_expanded"], result["nodes_per_sec"],
+        result["peak_rss_kb"], "" if result["solved"] else "  (no solution)")
+
+
+def main(argv=None):
+    """
+    Run the benchmarks from the command line; see the module docstring.
+
+    @type argv: list[str] | None
+    @rtype: None
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("cases", nargs="*",
+                        help="case names to run (default: all)")
+    parser.add_argument("--strategy", action="append",
+                        choices=solver_names(),
+                        help="only run this strategy (repeatable)")
+    parser.add_argument("--type", action="append",
+                        help="only run cases of this puzzle type")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per measurement, best kept")
+    parser.add_argument("--timeout", type=float, default=60.0,
+                        help="seconds before a measurement is abandoned")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before flagging, as a fraction")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="write the results as a baseline JSON")
+    parser.add_argument("--list", action="store_true",
+                        help="list the cases and exit")
+    args = parser.parse_args(argv)
+    if args.list:
+        for case in CASES:
+            print("{:<18} {:<12} {:<10} {}".format(
+                case.name, case.puzzle_type, case.level,
+                " ".join(case.solvers())))
+        return
+    names = args.cases or [case.name for case in CASES
+                           if args.type is None or case.puzzle_type in args.type]
+    unknown = [name for name in names if name not in BY_NAME]
+    if unknown:
+        parser.error("unknown cases: {}".format(", ".join(unknown)))
+    results = run(names, args.strategy, args.repeat, args.timeout,
+                  report=lambda key, result: print(_format(key, result)))
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "results": results}, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print("REGRESSION " + message)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
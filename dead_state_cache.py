@@ -0,0 +1,121 @@
+"""
+A size-bounded cache of configurations proven to have no solution,
+shared between solves and optionally kept on disk between runs.
+"""
+from collections import OrderedDict
+import os
+import pickle
+
+
+class DeadStateCache:
+    """
+    State keys of configurations from which no solution can be reached,
+    evicting the least recently used keys beyond max_size.
+
+    Only configurations of acyclic puzzles can be proven dead
+    independently of the search that found them, so the solvers only
+    add to the cache for those.
+    """
+
+    def __init__(self, max_size=1000000, path=None):
+        """
+        Create a new DeadStateCache self holding at most max_size keys,
+        loading the keys saved at path if there are any.
+
+        @type self: DeadStateCache
+        @type max_size: int
+        @type path: str | None
+        @rtype: None
+        """
+        assert max_size > 0
+        self.max_size, self.path = max_size, path
+        self._keys = OrderedDict()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __contains__(self, key):
+        """
+        Return whether key is known to be dead, marking it recently used.
+
+        @type self: DeadStateCache
+        @type key: Hashable
+        @rtype: bool
+
+        >>> cache = DeadStateCache(2)
+        >>> cache.add("a")
+        >>> "a" in cache, "b" in cache
+        (True, False)
+        """
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return True
+        return False
+
+    def __len__(self):
+        """
+        Return the number of keys in self.
+
+        @type self: DeadStateCache
+        @rtype: int
+        """
+        return len(self._keys)
+
+    def add(self, key):
+        """
+        Record that key is dead, evicting the least recently used key
+        if self is full.
+
+        @type self: DeadStateCache
+        @type key: Hashable
+        @rtype: None
+
+        >>> cache = DeadStateCache(2)
+        >>> for key in "abc": cache.add(key)
+        >>> sorted(cache._keys)
+        ['b', 'c']
+        """
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+    def clear(self):
+        """
+        Forget every key in self.
+
+        @type self: DeadStateCache
+        @rtype: None
+        """
+        self._keys.clear()
+
+    def save(self, path=None):
+        """
+        Write the keys of self to path, or to self.path.
+
+        @type self: DeadStateCache
+        @type path: str | None
+        @rtype: None
+        """
+        path = self.path if path is None else path
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            pickle.dump(list(self._keys), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+
+    def load(self, path=None):
+        """
+        Add the keys saved at path, or at self.path, to self.
+
+        @type self: DeadStateCache
+        @type path: str | None
+        @rtype: None
+        """
+        path = self.path if path is None else path
+        with open(path, "rb") as f:
+            for key in pickle.load(f):
+                self.add(key)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
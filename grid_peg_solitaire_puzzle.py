@@ -1,13 +1,181 @@
 from puzzle import Puzzle
-import copy
+from dead_state_cache import DeadStateCache
+from operator import add
+
+# sigma ** 2 + sigma == 1, so sigma ** (d + 2) + sigma ** (d + 1) equals
+# sigma ** d and weights decaying by sigma per step form pagoda functions
+SIGMA = (5 ** 0.5 - 1) / 2
+# slack for rounding in the floating point pagoda sums
+EPSILON = 1e-9
+
+# PegBoards already built, keyed by (rows, columns, blocked cells)
+_BOARDS = {}
+
+
+class PegBoard:
+    """
+    The shape of a peg solitaire grid, shared by every configuration
+    played on it.  Cell (column c, row r) is bit r * columns + c of a
+    peg mask.
+    """
+
+    def __init__(self, rows, columns, blocked):
+        """
+        Create a new PegBoard self with rows x columns cells, where the
+        cells in mask blocked are unused.
+
+        jumps lists (target, over, source) cell masks for every jump,
+        ordered by target cell column by column, then N, E, S, W.
+
+        @type self: PegBoard
+        @type rows: int
+        @type columns: int
+        @type blocked: int
+        @rtype: None
+        """
+        self.rows, self.columns, self.blocked = rows, columns, blocked
+        self.key = (rows, columns, blocked)
+        self.jumps = []
+        for c in range(columns):
+            for r in range(rows):
+                for dc, dr in [(0, -1), (1, 0), (0, 1), (-1, 0)]:
+                    cells = [(c + k * dc, r + k * dr) for k in range(3)]
+                    if all(0 <= x < columns and 0 <= y < rows and
+                           not blocked & (1 << (y * columns + x))
+                           for x, y in cells):
+                        self.jumps.append(tuple(1 << (y * columns + x)
+                                                for x, y in cells))
+        self.cells = [m for m in range(rows * columns)
+                      if not blocked & (1 << m)]
+
+        # Position classes: label cell (c, r) by (c + r) % 3 and by
+        # (c - r) % 3.  The three cells of a jump carry all three labels
+        # of each kind, so every jump flips the parity of the number of
+        # pegs on each label: the 6-bit XOR of class_of over the pegs
+        # flips all bits each move.
+        self.class_of = [(1 << ((m % columns + m // columns) % 3)) |
+                         (8 << ((m % columns - m // columns) % 3))
+                         for m in range(rows * columns)]
+
+        # Pagoda functions: weights w with w(source) + w(over) >= w(target)
+        # for every jump, so the weight of the pegs never increases.
+        # Weights sigma ** distance to a cell, a row or a column are.
+        def distance_weights(distance):
+            return [SIGMA ** distance(m % columns, m // columns)
+                    for m in range(rows * columns)]
+        self.pagodas = (
+            [distance_weights(lambda x, y, t=t: abs(x - t % columns) +
+                              abs(y - t // columns)) for t in self.cells] +
+            [distance_weights(lambda x, y, r0=r0: abs(y - r0))
+             for r0 in range(rows)] +
+            [distance_weights(lambda x, y, c0=c0: abs(x - c0))
+             for c0 in range(columns)])
+        # change in each pagoda sum made by each jump
+        self.jump_deltas = [
+            tuple(w[_bit_index(t)] - w[_bit_index(o)] - w[_bit_index(s)]
+                  for w in self.pagodas)
+            for t, o, s in self.jumps]
+        # thresholds for each final class, built on demand
+        self._thresholds = {}
+        # (cell mask, twice its distance from the middle of the board)
+        # for each cell
+        self.spread = [(1 << m, abs(2 * (m // columns) - rows + 1) +
+                        abs(2 * (m % columns) - columns + 1))
+                       for m in self.cells]
+
+    def pagoda_sums(self, pegs):
+        """
+        Return the sum of each pagoda function over the pegs in mask pegs.
+
+        @type self: PegBoard
+        @type pegs: int
+        @rtype: tuple[float]
+        """
+        cells = [m for m in self.cells if pegs & (1 << m)]
+        return tuple(sum(w[m] for m in cells) for w in self.pagodas)
+
+    def position_class(self, pegs):
+        """
+        Return the XOR of the position classes of the pegs in mask pegs.
+
+        @type self: PegBoard
+        @type pegs: int
+        @rtype: int
+        """
+        result = 0
+        for m in self.cells:
+            if pegs & (1 << m):
+                result ^= self.class_of[m]
+        return result
+
+    def thresholds(self, final_class):
+        """
+        Return, for each pagoda function, its least weight on a cell
+        whose position class is final_class, or None if there is no
+        such cell.  A single peg can only finish on such a cell.
+
+        @type self: PegBoard
+        @type final_class: int
+        @rtype: tuple[float] | None
+
+        >>> board = peg_board(1, 4, 0)
+        >>> board.thresholds(board.class_of[0]) is not None
+        True
+        """
+        if final_class not in self._thresholds:
+            finals = [m for m in self.cells
+                      if self.class_of[m] == final_class]
+            self._thresholds[final_class] = (
+                tuple(min(w[m] for m in finals) for w in self.pagodas)
+                if finals else None)
+        return self._thresholds[final_class]
+
+
+def _bit_index(bit):
+    # Return the index of the single bit set in bit
+    return bit.bit_length() - 1
+
+
+def peg_board(rows, columns, blocked):
+    """
+    Return the shared PegBoard for rows x columns with cells in blocked
+    unused.
+
+    @type rows: int
+    @type columns: int
+    @type blocked: int
+    @rtype: PegBoard
+
+    >>> peg_board(1, 3, 0).jumps
+    [(1, 2, 4), (4, 2, 1)]
+    >>> peg_board(1, 3, 0) is peg_board(1, 3, 0)
+    True
+    """
+    key = (rows, columns, blocked)
+    if key not in _BOARDS:
+        _BOARDS[key] = PegBoard(rows, columns, blocked)
+    return _BOARDS[key]
 
 
 class GridPegSolitairePuzzle(Puzzle):
     """
     Snapshot of peg solitaire on a rectangular grid. May be solved,
     unsolved, or even unsolvable.
+
+    Each configuration holds its peg mask with the peg count, position
+    class and pagoda sums kept up to date from it; the board shape, its
+    jumps and pagoda weights live in the PegBoard every configuration
+    on that board shares.
     """
 
+    __slots__ = ("_board", "_pegs", "_count", "_class", "_sums",
+                 "_marker_set")
+
+    # every jump removes a peg
+    acyclic = True
+    # configurations proven unsolvable, shared by every solve
+    dead_states = DeadStateCache()
+
     def __init__(self, marker, marker_set):
         """
         Create a new GridPegSolitairePuzzle self with
@@ -23,7 +191,40 @@ class GridPegSolitairePuzzle(Puzzle):
         assert all([len(x) == len(marker[0]) for x in marker[1:]])
         assert all([all(x in marker_set for x in row) for row in marker])
         assert all([x == "*" or x == "." or x == "#" for x in marker_set])
-        self._marker, self._marker_set = marker, marker_set
+        self._marker_set = marker_set
+        columns, blocked, pegs = len(marker[0]), 0, 0
+        for r, row in enumerate(marker):
+            for c, x in enumerate(row):
+                if x == "#":
+                    blocked |= 1 << (r * columns + c)
+                elif x == "*":
+                    pegs |= 1 << (r * columns + c)
+        self._board = peg_board(len(marker), columns, blocked)
+        self._pegs = pegs
+        # number of pegs, position class and pagoda sums, kept up to
+        # date incrementally by each jump
+        self._count = bin(pegs).count("1")
+        self._class = self._board.position_class(pegs)
+        self._sums = self._board.pagoda_sums(pegs)
+
+    def _jump(self, jump, delta):
+        # Return the GridPegSolitairePuzzle reached from self by
+        # flipping the cells in mask jump, whose pagoda sums change
+        # by delta
+        result = GridPegSolitairePuzzle.__new__(GridPegSolitairePuzzle)
+        result._board, result._pegs = self._board, self._pegs ^ jump
+        result._marker_set = self._marker_set
+        result._count, result._class = self._count - 1, self._class ^ 63
+        result._sums = tuple(map(add, self._sums, delta))
+        return result
+
+    @property
+    def _marker(self):
+        # The markers of self as a list of rows
+        board, pegs = self._board, self._pegs
+        return [["#" if board.blocked & (1 << (r * board.columns + c)) else
+                 "*" if pegs & (1 << (r * board.columns + c)) else "."
+                 for c in range(board.columns)] for r in range(board.rows)]
 
     # implement __eq__, __str__ methods
     # __repr__ is up to you
@@ -101,33 +302,28 @@ class GridPegSolitairePuzzle(Puzzle):
         . . * END
         """
 
-        result = []
-        empty_spaces = self.list_empty_spaces()
-        directions = ["N", "E", "S", "W"]
-        copied = copy.deepcopy(self)
-
-        for origin in empty_spaces:
+        pegs = self._pegs
+        # a jump moves the peg at source over the peg at over into the
+        # empty cell target, flipping all three cells
+        board = self._board
+        return [self._jump(target | over | source, delta)
+                for (target, over, source), delta in zip(board.jumps,
+                                                         board.jump_deltas)
+                if pegs & over and pegs & source and not pegs & target]
 
-            for direction in directions:
-                neighbour = copied.neighbour_at(origin, direction)
+    def state_key(self):
+        """
+        Return the board shape and peg mask of self: (rows, columns,
+        blocked cells, pegs).
 
-                if neighbour is not None and neighbour[1] == "*":
-                    next_neighbour = copied.neighbour_at(neighbour[0],
-                                                         direction)
+        :rtype: tuple(int, int, int, int)
 
-                    if next_neighbour is not None and next_neighbour[1] == "*":
-                        # Peg fills up the empty spot
-                        copied._marker[origin[1]][origin[0]] = "*"
-                        # Peg that is skipped over is taken off
-                        copied._marker[neighbour[0][1]][neighbour[0][0]] = "."
-                        # Peg's original location is now empty
-                        copied._marker[next_neighbour[0][1]][
-                            next_neighbour[0][0]] = "."
-                        result.append(copied)
+        >>> GridPegSolitairePuzzle([["*", "."], ["#", "*"]], \
+        {"*", ".", "#"}).state_key()
+        (2, 2, 4, 9)
+        """
 
-                # Reset copied
-                copied = copy.deepcopy(self)
-        return result
+        return self._board.key + (self._pegs,)
 
     def list_empty_spaces(self):
         """
@@ -245,16 +441,46 @@ class GridPegSolitairePuzzle(Puzzle):
         True
         """
 
-        empty_spaces = self.list_empty_spaces()
+        if self.final_cells_unreachable():
+            return True
+        pegs = self._pegs
+        return not any(pegs & over and pegs & source and not pegs & target
+                       for target, over, source in self._board.jumps)
+
+    def final_cells_unreachable(self):
+        """
+        Return whether no single peg finish can be reached from self,
+        because no cell has the position class a last peg must have, or
+        some pagoda function weighs the pegs of self less than any such
+        cell.
+
+        :rtype: bool
+
+        >>> grid = [["*", "*", "*", "*", "*"],
+        ...         ["*", "*", "*", "*", "*"],
+        ...         ["*", "*", ".", "*", "*"],
+        ...         ["*", "*", "*", "*", "*"],
+        ...         ["*", "*", "*", "*", "*"]]
+        >>> GridPegSolitairePuzzle(grid, {"*", ".", "#"}).\
+final_cells_unreachable()
+        True
+        >>> grid[2][2], grid[0][2] = "*", "."
+        >>> GridPegSolitairePuzzle(grid, {"*", ".", "#"}).\
+final_cells_unreachable()
+        False
+        >>> grid = [["*", ".", ".", ".", "*"]]
+        >>> GridPegSolitairePuzzle(grid, {"*", ".", "#"}).\
+final_cells_unreachable()
+        True
+        """
 
-        for space in empty_spaces:
-            for direction in ["N", "E", "S", "W"]:
-                neighbour = self.neighbour_at(space, direction)
-                if neighbour is not None and neighbour[1] == "*":
-                    next_neighbour = self.neighbour_at(neighbour[0], direction)
-                    if next_neighbour is not None and next_neighbour[1] == "*":
-                        return False
-        return True
+        # after count - 1 more jumps a single peg is left, and each
+        # jump flips every bit of the position class
+        final_class = self._class ^ (63 if (self._count - 1) % 2 else 0)
+        thresholds = self._board.thresholds(final_class)
+        return thresholds is None or any(
+            total < least - EPSILON
+            for total, least in zip(self._sums, thresholds))
 
     def is_solved(self):
         """
@@ -282,9 +508,114 @@ class GridPegSolitairePuzzle(Puzzle):
 
         # override is_solved
         # A configuration is solved when there is exactly one "*" left
-        pegs = sum([x.count("*") for x in self._marker])
-        # Total "*" for row in board
-        return pegs == 1
+        pegs = self._pegs
+        return pegs != 0 and pegs & (pegs - 1) == 0
+
+    def encode_state(self):
+        """
+        Return the peg mask of self as little-endian bytes, one bit per
+        cell of the board.
+
+        :rtype: bytes
+
+        >>> p = GridPegSolitairePuzzle([["*", "*", "."]], {"*", "."})
+        >>> p.encode_state()
+        b'\\x03'
+        >>> p.decode_state(b'\\x04') == p.extensions()[0]
+        True
+        """
+        board = self._board
+        return self._pegs.to_bytes((board.rows * board.columns + 7) // 8,
+                                   "little")
+
+    def decode_state(self, data):
+        """
+        Return the GridPegSolitairePuzzle on the board of self with the
+        peg mask encoded in data.
+
+        :type data: bytes
+        :rtype: GridPegSolitairePuzzle
+        """
+        result = GridPegSolitairePuzzle.__new__(GridPegSolitairePuzzle)
+        board, pegs = self._board, int.from_bytes(data, "little")
+        result._board, result._pegs = board, pegs
+        result._marker_set = self._marker_set
+        result._count = bin(pegs).count("1")
+        result._class = board.position_class(pegs)
+        result._sums = board.pagoda_sums(pegs)
+        return result
+
+    def context_key(self):
+        """
+        Return the shape of the board of self: rows, columns and the
+        mask of blocked cells.
+
+        :rtype: str
+
+        >>> GridPegSolitairePuzzle([["*", "#", "."]], {"*", ".", "#"}).\
+context_key()
+        '1x3#2'
+        """
+        board = self._board
+        return "{}x{}#{}".format(board.rows, board.columns, board.blocked)
+
+    def __reduce__(self):
+        """
+        Return how to pickle self: rebuilt from its markers, so that the
+        unpickled puzzle shares the interned PegBoard.
+
+        :rtype: tuple
+
+        >>> import pickle
+        >>> p = GridPegSolitairePuzzle([["*", "*", "."]], {"*", "."})
+        >>> pickle.loads(pickle.dumps(p)) == p
+        True
+        """
+        return GridPegSolitairePuzzle, (self._marker, self._marker_set)
+
+    def move_to(self, child):
+        """
+        Return the jump from GridPegSolitairePuzzle self to its
+        extension child, as the mask of the three cells it flips.
+
+        :rtype: int
+
+        >>> p = GridPegSolitairePuzzle([["*", "*", "."]], {"*", "."})
+        >>> p.move_to(p.extensions()[0])
+        7
+        """
+        return self._pegs ^ child._pegs
+
+    def heuristic(self):
+        """
+        Return the number of jumps left to reach a single peg: each
+        jump removes exactly one.
+
+        :rtype: int
+
+        >>> GridPegSolitairePuzzle([["*", "*", "."]], {"*", "."}).heuristic()
+        1
+        """
+        return max(self._count - 1, 0)
+
+    def tie_break(self):
+        """
+        Return how far the pegs are from the middle of the board, in
+        total: every configuration with the same number of pegs has the
+        same heuristic(), and pegs gathered in the middle leave more
+        jumps open than pegs scattered to the edges.
+
+        :rtype: int
+
+        >>> spread = GridPegSolitairePuzzle([["*", ".", ".", ".", "*"]], \
+{"*", "."})
+        >>> gathered = GridPegSolitairePuzzle([[".", "*", "*", ".", "."]], \
+{"*", "."})
+        >>> gathered.tie_break() < spread.tie_break()
+        True
+        """
+        pegs = self._pegs
+        return sum(d for bit, d in self._board.spread if pegs & bit)
 
     def __str__(self):
         """
@@ -363,12 +694,21 @@ class GridPegSolitairePuzzle(Puzzle):
         False
         """
 
-        for i in range(len(self._marker)):
-            for j in range(len(self._marker[i])):
-                if self._marker[i][j] != other._marker[i][j]:
-                    return False
+        return (type(other) == type(self) and
+                self._board is other._board and self._pegs == other._pegs)
 
-        return True
+    def __hash__(self):
+        """
+        Return a hash of GridPegSolitairePuzzle self, from its pegs.
+
+        :rtype: int
+
+        >>> grid = [["*", "*", "."]]
+        >>> hash(GridPegSolitairePuzzle(grid, {"*", "."})) == \
+hash(GridPegSolitairePuzzle(grid, {"*", "."}))
+        True
+        """
+        return hash(self._pegs)
 
     def __repr__(self):
         """
@@ -1,12 +1,135 @@
 from puzzle import Puzzle
+from move_ordering import HeuristicOrder
+
+# MNContexts, keyed by target grid
+_CONTEXTS = {}
+
+
+class MNContext:
+    """
+    What every configuration of MN puzzles with target grid to_grid
+    shares: the shape n x m, the tiles, numbered in sorted order with
+    any tiles met that are not in to_grid numbered after them, the
+    packed target, and tables of the moves of the blank and of the
+    distance of each tile from where it belongs.
+
+    A configuration is packed into the codes of its tiles in row-major
+    order, as bytes when there are few enough tiles.
+    """
+
+    __slots__ = ("to_grid", "n", "m", "tiles", "codes", "goal_size",
+                 "blank", "goal", "moves", "distance", "_goal_positions")
+
+    def __init__(self, to_grid):
+        """
+        Create the MNContext self for target grid to_grid.
+
+        @type self: MNContext
+        @type to_grid: tuple[tuple[str]]
+        @rtype: None
+        """
+        self.to_grid = to_grid
+        self.n, self.m = n, m = len(to_grid), len(to_grid[0])
+        self._goal_positions = {tile: (i, j)
+                                for i, row in enumerate(to_grid)
+                                for j, tile in enumerate(row)}
+        self.tiles = sorted(self._goal_positions)
+        self.codes = {tile: k for k, tile in enumerate(self.tiles)}
+        self.goal_size = len(self.tiles)
+        self.distance = []
+        for tile in self.tiles:
+            self._add_distances(tile)
+        self.blank = self.code("*")
+        self.goal = self.pack(to_grid)
+        # moves[p]: (direction, position) for each move of the blank at
+        # position p, in the order N, E, S, W
+        self.moves = []
+        for p in range(n * m):
+            i, j = divmod(p, m)
+            self.moves.append(
+                [(d, q) for d, q, legal in (("N", p - m, i > 0),
+                                            ("E", p + 1, j < m - 1),
+                                            ("S", p + m, i < n - 1),
+                                            ("W", p - 1, j > 0)) if legal])
+
+    def _add_distances(self, tile):
+        # Add the row of distances of tile from where it belongs at each
+        # position; the blank and tiles not in to_grid add nothing
+        goal = self._goal_positions.get(tile)
+        self.distance.append(
+            [0 if goal is None or tile == "*" else
+             abs(goal[0] - p // self.m) + abs(goal[1] - p % self.m)
+             for p in range(self.n * self.m)])
+
+    def code(self, tile):
+        """
+        Return the code of tile, numbering it if it is new.
+
+        @type self: MNContext
+        @type tile: str
+        @rtype: int
+        """
+        if tile not in self.codes:
+            self.codes[tile] = len(self.tiles)
+            self.tiles.append(tile)
+            self._add_distances(tile)
+        return self.codes[tile]
+
+    def pack(self, grid):
+        """
+        Return grid packed into the codes of its tiles.
+
+        @type self: MNContext
+        @type grid: tuple[tuple[str]]
+        @rtype: bytes | tuple[int]
+
+        >>> mn_context((("1", "2"), ("3", "*"))).pack((("*", "2"), ("1", "3")))
+        b'\\x00\\x02\\x01\\x03'
+        """
+        codes = [self.code(tile) for row in grid for tile in row]
+        return bytes(codes) if len(self.tiles) <= 256 else tuple(codes)
+
+    def rows(self, cells):
+        """
+        Return the grid packed into cells.
+
+        @type self: MNContext
+        @type cells: bytes | tuple[int]
+        @rtype: tuple[tuple[str]]
+        """
+        tiles, m = self.tiles, self.m
+        return tuple(tuple(tiles[k] for k in cells[i:i + m])
+                     for i in range(0, len(cells), m))
+
+
+def mn_context(to_grid):
+    """
+    Return the shared MNContext for target grid to_grid.
+
+    @type to_grid: tuple[tuple[str]]
+    @rtype: MNContext
+    """
+    if to_grid not in _CONTEXTS:
+        _CONTEXTS[to_grid] = MNContext(to_grid)
+    return _CONTEXTS[to_grid]
 
 
 class MNPuzzle(Puzzle):
     """
     An nxm puzzle, like the 15-puzzle, which may be solved, unsolved,
     or even unsolvable.
+
+    Each configuration holds only its tiles, packed by the MNContext of
+    its target grid, which every configuration of the puzzle shares.
     """
 
+    __slots__ = ("_cells", "_context")
+
+    # every slide can be slid back
+    reversible = True
+    # depth-first search tries the moves that bring tiles closest first
+    move_order = HeuristicOrder()
+
     def __init__(self, from_grid, to_grid):
         """
         MNPuzzle in state from_grid, working towards
@@ -22,8 +145,57 @@ class MNPuzzle(Puzzle):
         assert len(from_grid) > 0
         assert all([len(r) == len(from_grid[0]) for r in from_grid])
         assert all([len(r) == len(to_grid[0]) for r in to_grid])
-        self.n, self.m = len(from_grid), len(from_grid[0])
-        self.from_grid, self.to_grid = from_grid, to_grid
+        assert len(from_grid) == len(to_grid)
+        assert len(from_grid[0]) == len(to_grid[0])
+        self._context = mn_context(to_grid)
+        self._cells = self._context.pack(from_grid)
+
+    def _with_cells(self, cells):
+        # Return the MNPuzzle with tiles packed in cells, sharing the
+        # context of self
+        result = MNPuzzle.__new__(MNPuzzle)
+        result._cells, result._context = cells, self._context
+        return result
+
+    @property
+    def from_grid(self):
+        """
+        The current configuration of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: tuple[tuple[str]]
+        """
+        return self._context.rows(self._cells)
+
+    @property
+    def to_grid(self):
+        """
+        The solved configuration of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: tuple[tuple[str]]
+        """
+        return self._context.to_grid
+
+    @property
+    def n(self):
+        """
+        The number of rows of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: int
+        """
+        return self._context.n
+
+    @property
+    def m(self):
+        """
+        The number of columns of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: int
+        """
+        return self._context.m
 
     # TODO
     # implement __eq__ and __str__
@@ -41,17 +213,57 @@ class MNPuzzle(Puzzle):
         >>> grid_1.__eq__(grid_2)
         True
         >>> grid_1.__eq__(grid_3)
+        False
+        >>> MNPuzzle(grid_1, grid_2) == MNPuzzle(grid_2, grid_1)
+        True
+        >>> MNPuzzle(grid_1, grid_2) == MNPuzzle((("1", "2", "3"), \
+("4", "*", "5")), grid_2)
         False
         """
 
-        if len(self.to_grid) != len(other.to_grid):
-            return False
+        # configurations of one puzzle share their context, and packed
+        # tiles compare, and cache their hashes, as single values
+        return self is other or (type(other) == type(self) and
+                                 self._context is other._context and
+                                 self._cells == other._cells)
 
-        for i in range(len(self.from_grid)):
-            for j in range(len(self.to_grid[i])):
-                if self.from_grid[i][j] != other.from_grid[i][j]:
-                    return False
-        return True
+    def __hash__(self):
+        """
+        Return the hash of the packed tiles of MNPuzzle self.
+
+        :rtype: int
+
+        >>> grid = (("1", "*"),)
+        >>> hash(MNPuzzle(grid, grid)) == hash(MNPuzzle(grid, grid))
+        True
+        """
+        return hash(self._cells)
+
+    def __reduce__(self):
+        """
+        Return how to pickle MNPuzzle self: by its grids, so that an
+        unpickled puzzle shares the context of its target grid.
+
+        :rtype: tuple
+
+        >>> import pickle
+        >>> grid = (("1", "*"),)
+        >>> pickle.loads(pickle.dumps(MNPuzzle(grid, grid))) == \
+MNPuzzle(grid, grid)
+        True
+        """
+        return MNPuzzle, (self.from_grid, self.to_grid)
+
+    def state_key(self):
+        """
+        Return the packed tiles of MNPuzzle self.
+
+        :rtype: bytes | tuple[int]
+
+        >>> MNPuzzle((("1", "*"),), (("*", "1"),)).state_key()
+        b'\\x01\\x00'
+        """
+        return self._cells
 
     def __str__(self):
         """
@@ -69,16 +281,8 @@ class MNPuzzle(Puzzle):
 
         """
 
-        result = ""
-        for row in self.from_grid:
-            for element in row:
-                result += str(element)
-                result += " "
-            result = result.strip(" ")
-            result += "\n"
-
-        result = result.strip("\n")
-        return result
+        return "\n".join(" ".join(str(element) for element in row)
+                         for row in self.from_grid)
 
     def __repr__(self):
         """
@@ -112,6 +316,8 @@ class MNPuzzle(Puzzle):
         True
         >>> all([s in L1 for s in L2])
         True
+        >>> all([mn in child.extensions() for child in mn.extensions()])
+        True
         >>> start_grid2 = (("1", "2", "3"), ("*", "5", "6"), ("7", "8", "9"))
         >>> target = ((" ", " ", " "), (" ", " ", " "), (" ", " ", " "))
         >>> example = MNPuzzle(start_grid2, target)
@@ -128,17 +334,60 @@ class MNPuzzle(Puzzle):
         """
 
         extensions = []
-        # A tuple for the location of the blank spot
-        swap_spot = self.find_coordinates("*")
-        directions = ["N", "E", "S", "W"]
+        cells, context = self._cells, self._context
+        # the position of the blank spot
+        p = cells.index(context.blank)
+
+        for _, q in context.moves[p]:
+            # swap the blank at p with the tile at q
+            i, j = min(p, q), max(p, q)
+            extensions.append(self._with_cells(
+                cells[:i] + cells[j:j + 1] + cells[i + 1:j] +
+                cells[i:i + 1] + cells[j + 1:]))
+        return extensions
 
-        for direction in directions:
-            # swap_direction() returns an mn puzzle that we can append
-            new_grid = self.swap_direction(swap_spot, direction)
+    def goal_state(self):
+        """
+        Return the MNPuzzle with the tiles of self in place.
 
-            if new_grid is not None:
-                extensions.append(new_grid)
-        return extensions
+        :rtype: MNPuzzle
+
+        >>> print(MNPuzzle((("*", "1"),), (("1", "*"),)).goal_state())
+        1 *
+        """
+        return self._with_cells(self._context.goal)
+
+    def predecessors(self):
+        """
+        Return the configurations MNPuzzle self is an extension of: every
+        move of the blank undoes itself, so those one move away.
+
+        :rtype: list[MNPuzzle]
+
+        >>> mn = MNPuzzle((("1", "*", "2"),), (("1", "2", "*"),))
+        >>> [str(p) for p in mn.extensions()[0].predecessors()]
+        ['1 * 2']
+        >>> [str(p) for p in mn.predecessors()]
+        ['1 2 *', '* 1 2']
+        """
+        return self.extensions()
+
+    def move_to(self, child):
+        """
+        Return the tile that moves from MNPuzzle self to its extension
+        child, and the position it moves to.
+
+        :type child: MNPuzzle
+        :rtype: (str, int, int)
+
+        >>> mn = MNPuzzle((("*", "2"), ("1", "3")), (("1", "2"), ("3", "*")))
+        >>> [mn.move_to(child) for child in mn.extensions()]
+        [('2', 0, 0), ('1', 0, 0)]
+        """
+        context = self._context
+        tile = self._cells[child._cells.index(context.blank)]
+        blank_i, blank_j = divmod(self._cells.index(context.blank), context.m)
+        return context.tiles[tile], blank_i, blank_j
 
     def is_solved(self):
         """
@@ -163,7 +412,62 @@ class MNPuzzle(Puzzle):
         # override is_solved
         # a configuration is solved when from_grid is the same as to_grid
 
-        return self.from_grid == self.to_grid
+        return self._cells == self._context.goal
+
+    def encode_state(self):
+        """
+        Return from_grid of MNPuzzle self as one byte per position: the
+        index of its tile among the sorted tiles of to_grid.
+
+        :rtype: bytes
+
+        >>> goal = (("1", "2"), ("3", "*"))
+        >>> mn = MNPuzzle((("*", "2"), ("1", "3")), goal)
+        >>> mn.encode_state()
+        b'\\x00\\x02\\x01\\x03'
+        >>> mn.decode_state(mn.encode_state()) == mn
+        True
+        """
+        size = self._context.goal_size
+        return bytes(k if k < size else 255 for k in self._cells)
+
+    def decode_state(self, data):
+        """
+        Return the MNPuzzle with the from_grid encoded in data and the
+        to_grid of MNPuzzle self.
+
+        :type data: bytes
+        :rtype: MNPuzzle
+        """
+        context = self._context
+        if len(context.tiles) > 256:
+            return self._with_cells(tuple(data))
+        return self._with_cells(bytes(data))
+
+    def context_key(self):
+        """
+        Return the rows of to_grid of MNPuzzle self.
+
+        :rtype: str
+
+        >>> MNPuzzle((("*", "1"),), (("1", "*"),)).context_key()
+        '1 *'
+        """
+        return "/".join(" ".join(row) for row in self.to_grid)
+
+    def heuristic(self):
+        """
+        Return the sum over the tiles of MNPuzzle self of their row and
+        column distances from where they are in to_grid.
+
+        :rtype: int
+
+        >>> MNPuzzle((("*", "2"), ("1", "3")), (("1", "2"), ("3", "*"))).\
+heuristic()
+        2
+        """
+        distance = self._context.distance
+        return sum(distance[k][p] for p, k in enumerate(self._cells))
 
     def grid_string(self, grid):
         """
@@ -268,10 +572,10 @@ class MNPuzzle(Puzzle):
         [0, 0]
         """
 
-        for i in range(self.n):
-            for j in range(self.m):
-                if self.from_grid[i][j] == obj:
-                    return [j, i]
+        context = self._context
+        if obj in context.codes and context.codes[obj] in self._cells:
+            i, j = divmod(self._cells.index(context.codes[obj]), context.m)
+            return [j, i]
 
         return "error: object not in grid"
 
@@ -0,0 +1,188 @@
+"""
+Orders in which depth_first_solve tries the extensions of a
+configuration.  A puzzle class picks its default with the move_order
+class attribute; depth_first_solve also takes one as order.
+
+Each MoveOrder sorts the extensions of a configuration before they are
+tried and is told, after each one, whether it led to a solution.  The
+history and killer orders learn from that, naming moves with
+Puzzle.move_to, so what they learn carries over between configurations
+sharing a move and, when the same order is passed again, between
+solves.
+"""
+
+
+class MoveOrder:
+    """
+    Extensions in the order extensions() returns them.
+    """
+
+    def order(self, puzzle, extensions, depth):
+        """
+        Return extensions of puzzle, which is depth moves from the root
+        of the search, in the order they should be tried.
+
+        @type self: MoveOrder
+        @type puzzle: Puzzle
+        @type extensions: list[Puzzle]
+        @type depth: int
+        @rtype: list[Puzzle]
+        """
+        return extensions
+
+    def record(self, puzzle, extension, depth, solved):
+        """
+        Note that the search below extension of puzzle, which is depth
+        moves from the root, did or did not find a solution.
+
+        @type self: MoveOrder
+        @type puzzle: Puzzle
+        @type extension: Puzzle
+        @type depth: int
+        @type solved: bool
+        @rtype: None
+        """
+        pass
+
+
+class HeuristicOrder(MoveOrder):
+    """
+    Extensions with the lowest heuristic() first.
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> p = WordLadderPuzzle("cast", "vase", {"case", "cost", "vast"})
+    >>> [e._from_word for e in p.extensions()]
+    ['vast', 'cost', 'case']
+    >>> [e._from_word for e in HeuristicOrder().order(p, p.extensions(), 0)]
+    ['vast', 'case', 'cost']
+    """
+
+    def order(self, puzzle, extensions, depth):
+        return sorted(extensions, key=_heuristic)
+
+
+class FollowUpOrder(MoveOrder):
+    """
+    Extensions with the fewest extensions of their own first, so that
+    forced lines and dead ends are tried while they are cheap.  Every
+    extension's extensions are built to be counted, so this only pays
+    where it prunes most of the search, as on the 6x6 peg board but
+    not the 5x5 one, and no puzzle uses it by default.
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> p = GridPegSolitairePuzzle([["*", "*", ".", "*", "*", "."]], \
+{"*", "."})
+    >>> for e in FollowUpOrder().order(p, p.extensions(), 0): print(e)
+    * * * . . .
+    * * . . . *
+    . . * * * .
+    """
+
+    def order(self, puzzle, extensions, depth):
+        return sorted(extensions, key=_follow_ups)
+
+
+class HistoryOrder(MoveOrder):
+    """
+    Moves that led to solutions most often, less how often they led
+    nowhere, first: the history heuristic.  Ties keep the order of
+    fallback, a MoveOrder.
+    """
+
+    def __init__(self, fallback=None):
+        """
+        Create a new HistoryOrder self with no history.
+
+        @type self: HistoryOrder
+        @type fallback: MoveOrder | None
+        @rtype: None
+        """
+        self.fallback = MoveOrder() if fallback is None else fallback
+        self.scores = {}
+
+    def order(self, puzzle, extensions, depth):
+        """
+        >>> from mn_puzzle import MNPuzzle
+        >>> p = MNPuzzle((("1", "*", "2"),), (("1", "2", "*"),))
+        >>> history = HistoryOrder()
+        >>> print(p.extensions()[0])
+        1 2 *
+        >>> history.record(p, p.extensions()[0], 0, False)
+        >>> print(history.order(p, p.extensions(), 0)[0])
+        * 1 2
+        """
+        scores = self.scores
+        return sorted(self.fallback.order(puzzle, extensions, depth),
+                      key=lambda e: -scores.get(puzzle.move_to(e), 0))
+
+    def record(self, puzzle, extension, depth, solved):
+        move = puzzle.move_to(extension)
+        self.scores[move] = self.scores.get(move, 0) + (1 if solved else -1)
+        self.fallback.record(puzzle, extension, depth, solved)
+
+
+class KillerOrder(MoveOrder):
+    """
+    At each depth, the last size moves there that led to a solution
+    first, most recent first, then the order of fallback, a MoveOrder.
+    """
+
+    def __init__(self, fallback=None, size=2):
+        """
+        Create a new KillerOrder self with no killer moves.
+
+        @type self: KillerOrder
+        @type fallback: MoveOrder | None
+        @type size: int
+        @rtype: None
+        """
+        self.fallback = MoveOrder() if fallback is None else fallback
+        self.size, self.killers = size, {}
+
+    def order(self, puzzle, extensions, depth):
+        """
+        >>> from mn_puzzle import MNPuzzle
+        >>> p = MNPuzzle((("1", "*", "2"),), (("1", "2", "*"),))
+        >>> killer = KillerOrder()
+        >>> killer.record(p, p.extensions()[1], 0, True)
+        >>> print(killer.order(p, p.extensions(), 0)[0])
+        * 1 2
+        """
+        extensions = self.fallback.order(puzzle, extensions, depth)
+        killers = self.killers.get(depth)
+        if not killers:
+            return extensions
+        rank = {move: i for i, move in enumerate(killers)}
+        return sorted(extensions, key=lambda e: rank.get(puzzle.move_to(e),
+                                                         len(rank)))
+
+    def record(self, puzzle, extension, depth, solved):
+        if solved:
+            move = puzzle.move_to(extension)
+            killers = self.killers.setdefault(depth, [])
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[self.size:]
+        self.fallback.record(puzzle, extension, depth, solved)
+
+
+def _heuristic(puzzle):
+    # Sort key of HeuristicOrder
+    return puzzle.heuristic()
+
+
+def _follow_ups(puzzle):
+    # Sort key of FollowUpOrder
+    return len(puzzle.extensions())
+
+
+# orders by name, as the command line and benchmarks refer to them
+ORDERS = {"none": MoveOrder, "heuristic": HeuristicOrder,
+          "follow-ups": FollowUpOrder, "history": HistoryOrder,
+          "killer": KillerOrder}
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
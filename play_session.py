@@ -0,0 +1,227 @@
+"""
+Interactive play of one puzzle: a PlaySession follows the moves a
+player applies and undoes and, after any of them, hints at the next
+move towards a solution.
+
+Hints come from a tree of the solutions found so far, in which every
+configuration on a solution path names the next one, so a player who
+follows hints, or undoes moves back onto a path, gets each hint from a
+dictionary.  Off the tree, Puzzle.step_toward gives the hint when it can
+tell that a solved configuration found before is still reachable, as
+for sudoku.  Otherwise a search is run that stops as soon as it reaches
+the tree, and its path joins the tree.  Configurations found to have no
+solution are remembered too.
+
+What a kind of puzzle precomputes for its heuristic, such as the
+distance tables of MNContext, is shared by all its configurations and
+so kept from one hint to the next.
+"""
+from puzzle import Puzzle
+from puzzle_registry import get_solver
+from search_budget import EXHAUSTED
+
+
+class PlaySession:
+    """
+    A game of a puzzle, at configuration current after the moves applied
+    and not undone.
+
+    hits counts the hints read from the tree, steps those given by
+    Puzzle.step_toward and searches those that took a search.
+    """
+
+    def __init__(self, puzzle, strategy=None, budget=None):
+        """
+        Create a new PlaySession self starting at puzzle, searching with
+        the solver named strategy in puzzle_registry: by default "dfs"
+        for acyclic puzzles, whose solutions all take as many moves, and
+        "astar" for the others.  Each search is limited by budget, if
+        given, such as Budget(deadline=0.005) to keep hints quick: when
+        a search runs out, the hint is to undo the last move, if it can
+        be undone and that returns to the tree.
+
+        @type self: PlaySession
+        @type puzzle: Puzzle
+        @type strategy: str | None
+        @type budget: Budget | None
+        @rtype: None
+        """
+        if strategy is None:
+            strategy = "dfs" if puzzle.acyclic else "astar"
+        self._solver = get_solver(strategy)
+        self.budget = budget
+        self._history = [puzzle]
+        # the next configuration towards a solution from each one in the
+        # tree, None for the solved ones, which are also in _solved
+        self._next, self._solved = {}, []
+        # keys of configurations with no solution
+        self._dead = set()
+        self.hits, self.steps, self.searches = 0, 0, 0
+
+    @property
+    def current(self):
+        """
+        The configuration PlaySession self is at.
+
+        @type self: PlaySession
+        @rtype: Puzzle
+        """
+        return self._history[-1]
+
+    def apply(self, puzzle):
+        """
+        Make the move from current to the configuration puzzle.
+
+        @type self: PlaySession
+        @type puzzle: Puzzle
+        @rtype: None
+        """
+        self._history.append(puzzle)
+
+    def undo(self):
+        """
+        Undo the last move applied and return the configuration it
+        returns to.
+
+        @type self: PlaySession
+        @rtype: Puzzle
+        """
+        if len(self._history) == 1:
+            raise IndexError("no move to undo")
+        self._history.pop()
+        return self.current
+
+    def hint(self):
+        """
+        Return the next configuration towards a solution from current,
+        or None if current is solved or no solution was found from it,
+        because it has none or the budget ran out.
+
+        @type self: PlaySession
+        @rtype: Puzzle | None
+
+        >>> from mn_puzzle import MNPuzzle
+        >>> goal = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        >>> game = PlaySession(MNPuzzle((("4", "1", "3"), \
+("7", "2", "6"), ("*", "5", "8")), goal))
+        >>> game.current.move_to(game.hint())
+        ('7', 2, 0)
+        >>> game.apply(game.hint())
+        >>> game.current.move_to(game.hint())
+        ('4', 1, 0)
+        >>> off_path = game.current.extensions()[1]
+        >>> game.current.move_to(off_path)
+        ('2', 1, 0)
+        >>> game.apply(off_path)
+        >>> game.current.move_to(game.hint())
+        ('2', 1, 1)
+        >>> _ = game.undo()
+        >>> game.current.move_to(game.hint())
+        ('4', 1, 0)
+        >>> game.hits, game.steps, game.searches
+        (3, 0, 2)
+
+        Sudoku hints off the tree fill in the solution found before:
+
+        >>> from sudoku_puzzle import SudokuPuzzle
+        >>> game = PlaySession(SudokuPuzzle(4, list("A***C*A**A**D**A"), \
+{"A", "B", "C", "D"}))
+        >>> game.current.move_to(game.hint())
+        (8, 'B')
+        >>> game.apply(SudokuPuzzle(4, list("AB**C*A**A**D**A"), \
+{"A", "B", "C", "D"}))
+        >>> game.current.move_to(game.hint())
+        (5, 'D')
+        >>> game.hits, game.steps, game.searches
+        (0, 1, 1)
+        """
+        puzzle = self.current
+        key = puzzle.state_key()
+        if key in self._next or key in self._dead:
+            self.hits += 1
+            return self._next.get(key)
+        for solved in self._solved:
+            step = puzzle.step_toward(solved)
+            if step is not None:
+                self.steps += 1
+                self._next[key] = step
+                return step
+        self.searches += 1
+        return self._search(puzzle, key)
+
+    def _search(self, puzzle, key):
+        # Return the hint from puzzle, with state key key, found by a
+        # search stopping at the tree, adding its path to the tree
+        result = self._solver(_TreeAware(puzzle, self), budget=self.budget)
+        if self.budget is not None:
+            if result.status == EXHAUSTED:
+                return self._step_back(puzzle, key)
+            result = result.node
+        if result is None:
+            self._dead.add(key)
+            return None
+        puzzles = [p.puzzle for p in result.iter_path()]
+        keys = [p.state_key() for p in puzzles]
+        for k, following in zip(keys, puzzles[1:]):
+            self._next[k] = following
+        if keys[-1] not in self._next:
+            self._next[keys[-1]] = None
+            self._solved.append(puzzles[-1])
+        return self._next[key]
+
+    def _step_back(self, puzzle, key):
+        # Return the configuration before puzzle if that move can be
+        # undone and it is in the tree, else None
+        if not puzzle.reversible or len(self._history) < 2:
+            return None
+        previous = self._history[-2]
+        if previous.state_key() not in self._next:
+            return None
+        self._next[key] = previous
+        return previous
+
+
+class _TreeAware(Puzzle):
+    # A puzzle that counts as solved when its configuration is solved
+    # or in the tree of session, so a search stops there, and that fails
+    # fast when it is known to have no solution
+
+    def __init__(self, puzzle, session):
+        self.puzzle, self.session = puzzle, session
+        self.acyclic, self.dead_states = puzzle.acyclic, puzzle.dead_states
+        self.reversible = puzzle.reversible
+        self.move_order = puzzle.move_order
+
+    def __str__(self):
+        return str(self.puzzle)
+
+    def state_key(self):
+        return self.puzzle.state_key()
+
+    def step_cost(self, child):
+        return self.puzzle.step_cost(child.puzzle)
+
+    def move_to(self, child):
+        return self.puzzle.move_to(child.puzzle)
+
+    def heuristic(self):
+        return self.puzzle.heuristic()
+
+    def tie_break(self):
+        return self.puzzle.tie_break()
+
+    def fail_fast(self):
+        return (self.puzzle.fail_fast() or
+                self.puzzle.state_key() in self.session._dead)
+
+    def is_solved(self):
+        return (self.puzzle.state_key() in self.session._next or
+                self.puzzle.is_solved())
+
+    def extensions(self):
+        return [_TreeAware(p, self.session) for p in self.puzzle.extensions()]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -4,6 +4,180 @@ class Puzzle:
     or even unsolvable.
     """
 
+    # no per-instance __dict__, so subclasses can keep their
+    # configurations in __slots__
+    __slots__ = ()
+
+    # True when no sequence of extensions can lead back to an earlier
+    # configuration, so the search space is a DAG and counts of
+    # solutions below a configuration can be memoized
+    acyclic = False
+
+    # True when every move can be undone by another move, so that the
+    # configurations form an undirected graph and breadth_first_solve
+    # can forget configurations more than a level behind
+    reversible = False
+
+    # a DeadStateCache of configurations proven unsolvable, shared by
+    # every solve of this kind of puzzle, or None
+    dead_states = None
+
+    # the MoveOrder in which depth_first_solve tries extensions by
+    # default, or None for the order extensions() returns
+    move_order = None
+
+    def state_key(self):
+        """
+        Return a hashable key identifying the configuration of Puzzle self,
+        used by the solvers to recognize configurations already seen.
+
+        Override this in a subclass with a more compact encoding.
+
+        @type self: Puzzle
+        @rtype: Hashable
+        """
+        return str(self)
+
+    def encode_state(self):
+        """
+        Return the configuration of Puzzle self as compact bytes, which
+        decode_state turns back into a puzzle.  Only the configuration
+        is encoded, not what it shares with every other configuration
+        of the same puzzle, such as a target or a word list.
+
+        Override this in a subclass to allow checkpointing its searches.
+
+        @type self: Puzzle
+        @rtype: bytes
+        """
+        raise NotImplementedError
+
+    def decode_state(self, data):
+        """
+        Return the Puzzle whose configuration encode_state encoded as
+        data, sharing everything else with Puzzle self.
+
+        Override this in a subclass together with encode_state.
+
+        @type self: Puzzle
+        @type data: bytes
+        @rtype: Puzzle
+        """
+        raise NotImplementedError
+
+    def context_key(self):
+        """
+        Return a string identifying what Puzzle self shares with every
+        configuration of the same puzzle but encode_state leaves out,
+        such as its target or word list.  Two puzzles with equal
+        context keys and encoded states are the same configuration of
+        the same puzzle.
+
+        Override this in a subclass with such shared context.
+
+        @type self: Puzzle
+        @rtype: str
+        """
+        return ""
+
+    def step_cost(self, child):
+        """
+        Return the cost of the move from Puzzle self to its extension
+        child, at least 1 so that heuristic() still never overestimates
+        the cost of a solution.
+
+        Override this in a subclass whose moves cost different amounts.
+
+        @type self: Puzzle
+        @type child: Puzzle
+        @rtype: float
+        """
+        return 1
+
+    def move_to(self, child):
+        """
+        Return a hashable name for the move from Puzzle self to its
+        extension child, the same for the same move made from other
+        configurations, so move orderings can learn which moves work.
+
+        Override this in a subclass; by default a move is named by the
+        configuration it reaches.
+
+        @type self: Puzzle
+        @type child: Puzzle
+        @rtype: Hashable
+        """
+        return child.state_key()
+
+    def heuristic(self):
+        """
+        Return an estimate of the number of moves still needed to solve
+        Puzzle self, never more than the true number, used to rate
+        partial solutions.  0 means no estimate.
+
+        Override this in a subclass that can estimate its distance from
+        a solution.
+
+        @type self: Puzzle
+        @rtype: int
+        """
+        return 0
+
+    def tie_break(self):
+        """
+        Return a value ranking configurations of Puzzle self's kind that
+        heuristic() rates the same, the least most promising, for
+        searches that keep only the best few, like beam_search_solve.
+
+        Override this in a subclass whose heuristic() rates many
+        configurations the same.
+
+        @type self: Puzzle
+        @rtype: int | float
+        """
+        return 0
+
+    def goal_state(self):
+        """
+        Return the one solved configuration of the puzzle Puzzle self is
+        a configuration of, or None if there may be more than one or
+        searching backwards from it is not supported.
+
+        Override this in a subclass together with predecessors, so that
+        bidirectional_solve can search from both ends.
+
+        @type self: Puzzle
+        @rtype: Puzzle | None
+        """
+        return None
+
+    def predecessors(self):
+        """
+        Return the configurations that Puzzle self is an extension of.
+
+        Override this in a subclass together with goal_state.
+
+        @type self: Puzzle
+        @rtype: list[Puzzle]
+        """
+        raise NotImplementedError
+
+    def step_toward(self, solved):
+        """
+        Return an extension of Puzzle self from which the solved
+        configuration solved can still be reached, or None if there is
+        none or finding one would take a search.
+
+        Override this in a subclass where it is cheap to tell whether a
+        solved configuration is still reachable, so that a PlaySession
+        can give hints off the solution paths it has found.
+
+        @type self: Puzzle
+        @type solved: Puzzle
+        @rtype: Puzzle | None
+        """
+        return None
+
     def fail_fast(self):
         """
         Return True if Puzzle self can never be extended to a solution.
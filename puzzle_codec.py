@@ -0,0 +1,389 @@
+"""
+A versioned binary format for puzzles and solution paths, for moving
+them between processes and storing them in bulk without pickling whole
+objects.
+
+An encoding is MAGIC, a version byte and a count, followed by that many
+items, each a puzzle or a solution path.  An item starts with a tag
+byte: the kind of puzzle, with the high bit set for a path.  Next comes
+its context, which is what every configuration of the puzzle shares.
+The context is written out the first time it occurs and is referred to
+by number after that, so a batch of puzzles with one target pays for it
+once.  Last come the configuration and, for a path, the moves from it.
+
+- A context holds its grid shapes and symbols.  A word ladder context
+  holds the fingerprint of its word set, not the words, so the decoding
+  PuzzleCodec must know the same words.
+- A configuration is Puzzle.encode_state.  When every code is below 16,
+  MN and sudoku cells are packed two to a byte.  Peg boards already
+  take one bit per cell.
+- A path is stored as its first configuration and, for each move, the
+  position of the next configuration among the extensions of the one
+  before, as in solution_moves.
+
+Integers are unsigned LEB128 varints and strings are UTF-8 with a
+length prefix.  Decoding reads straight from a bytes, bytearray or
+memoryview, copying only what ends up in the puzzles.
+"""
+from puzzle_registry import puzzle_class, puzzle_name
+from puzzle_tools import PuzzleNode
+from search_checkpoint import (_write_varint, _read_varint, _write_bytes,
+                               _read_bytes)
+from solution_moves import _indexes, _replay
+from word_edit_index import word_set_fingerprint
+
+MAGIC = b"PZCD"
+VERSION = 1
+# the tag bit marking a solution path
+PATH = 0x80
+
+# the low and high nibble of each byte
+_LOW = bytes(b & 0x0f for b in range(256))
+_HIGH = bytes(b >> 4 for b in range(256))
+
+
+def _pack_nibbles(codes):
+    # Return codes, each below 16, two to a byte, low nibble first
+    if len(codes) % 2:
+        codes += b"\x00"
+    return bytes(a | b << 4 for a, b in zip(codes[::2], codes[1::2]))
+
+
+def _unpack_nibbles(packed, count):
+    # Return the count codes packed two to a byte in packed
+    codes = bytearray(2 * len(packed))
+    codes[::2], codes[1::2] = packed.translate(_LOW), packed.translate(_HIGH)
+    return bytes(codes[:count])
+
+
+def _write_string(out, text):
+    # Append text to out as length-prefixed UTF-8
+    _write_bytes(out, text.encode())
+
+
+def _read_string(data, pos):
+    # Return (str, position after it) for the string at pos in data
+    raw, pos = _read_bytes(data, pos)
+    return raw.decode(), pos
+
+
+def _write_mn(out, puzzle):
+    # Append the target grid of MNPuzzle puzzle to out
+    _write_varint(out, puzzle.n)
+    _write_varint(out, puzzle.m)
+    for row in puzzle.to_grid:
+        for tile in row:
+            _write_string(out, tile)
+
+
+def _read_mn(codec, data, pos):
+    # Return (an MNPuzzle with the target grid at pos, position after it)
+    n, pos = _read_varint(data, pos)
+    m, pos = _read_varint(data, pos)
+    rows = []
+    for _ in range(n):
+        row = []
+        for _ in range(m):
+            tile, pos = _read_string(data, pos)
+            row.append(tile)
+        rows.append(tuple(row))
+    grid = tuple(rows)
+    return puzzle_class("mn")(grid, grid), pos
+
+
+def _write_peg(out, puzzle):
+    # Append the board shape and markers of GridPegSolitairePuzzle
+    # puzzle to out
+    board = puzzle._board
+    _write_varint(out, board.rows)
+    _write_varint(out, board.columns)
+    _write_varint(out, board.blocked)
+    _write_varint(out, len(puzzle._marker_set))
+    for marker in sorted(puzzle._marker_set):
+        _write_string(out, marker)
+
+
+def _read_peg(codec, data, pos):
+    # Return (a GridPegSolitairePuzzle on the board at pos, position
+    # after it)
+    rows, pos = _read_varint(data, pos)
+    columns, pos = _read_varint(data, pos)
+    blocked, pos = _read_varint(data, pos)
+    count, pos = _read_varint(data, pos)
+    marker_set = set()
+    for _ in range(count):
+        marker, pos = _read_string(data, pos)
+        marker_set.add(marker)
+    # any allowed marker will do for the open cells
+    empty = "." if "." in marker_set else "*"
+    marker = [["#" if blocked >> (r * columns + c) & 1 else empty
+               for c in range(columns)] for r in range(rows)]
+    return puzzle_class("peg")(marker, marker_set), pos
+
+
+def _write_sudoku(out, puzzle):
+    # Append the size and symbols of SudokuPuzzle puzzle to out
+    _write_varint(out, puzzle._n)
+    for symbol in sorted(puzzle._symbol_set):
+        _write_string(out, symbol)
+
+
+def _read_sudoku(codec, data, pos):
+    # Return (an empty SudokuPuzzle of the size and symbols at pos,
+    # position after it)
+    n, pos = _read_varint(data, pos)
+    symbols = set()
+    for _ in range(n):
+        symbol, pos = _read_string(data, pos)
+        symbols.add(symbol)
+    return puzzle_class("sudoku")(n, ["*"] * n ** 2, symbols), pos
+
+
+def _write_ladder(out, puzzle):
+    # Append the target, alphabet, flags and word set fingerprint of
+    # WordLadderPuzzle puzzle to out
+    context = puzzle._context
+    _write_string(out, context.to_word)
+    _write_string(out, context.chars)
+    out.append(int(context.indels) | (context.costs is not None) << 1)
+    out += bytes.fromhex(word_set_fingerprint(context.word_set))
+
+
+def _read_ladder(codec, data, pos):
+    # Return (a WordLadderPuzzle with the context at pos, position after
+    # it), taking its word set and costs from codec
+    to_word, pos = _read_string(data, pos)
+    chars, pos = _read_string(data, pos)
+    flags = data[pos]
+    fingerprint = bytes(data[pos + 1:pos + 9]).hex()
+    ws = codec.word_sets.get(fingerprint)
+    if ws is None:
+        raise ValueError("unknown word set {}".format(fingerprint))
+    costs = None
+    if flags & 2:
+        if codec.costs is None:
+            raise ValueError("word costs needed but not given")
+        costs = codec.costs
+    return (puzzle_class("ladder")(to_word, to_word, ws, chars,
+                                   bool(flags & 1), costs), pos + 9)
+
+
+# for each kind of puzzle, by tag: its name in puzzle_registry, how its
+# context is written and read, and whether its encoded states are cell
+# codes that may fit in nibbles
+_KINDS = [None,
+          ("mn", _write_mn, _read_mn, True),
+          ("peg", _write_peg, _read_peg, False),
+          ("sudoku", _write_sudoku, _read_sudoku, True),
+          ("ladder", _write_ladder, _read_ladder, False)]
+_TAGS = {kind[0]: tag for tag, kind in enumerate(_KINDS) if kind}
+
+
+class PuzzleCodec:
+    """
+    Encodes and decodes puzzles and solution paths.  word_sets maps the
+    fingerprints of the word sets of word ladders to the sets.  Every
+    word set it encodes is added to word_sets, and decoding a word
+    ladder needs its word set there.  Word ladders with word costs are
+    decoded with costs.
+    """
+
+    def __init__(self, word_sets=(), costs=None):
+        """
+        Create a new PuzzleCodec self knowing the word sets in word_sets.
+
+        @type self: PuzzleCodec
+        @type word_sets: Iterable[set[str]]
+        @type costs: WordCosts | None
+        @rtype: None
+        """
+        self.word_sets, self.costs = {}, costs
+        for ws in word_sets:
+            self.add_word_set(ws)
+
+    def add_word_set(self, ws):
+        """
+        Let self decode word ladders over ws.
+
+        @type self: PuzzleCodec
+        @type ws: set[str]
+        @rtype: None
+        """
+        self.word_sets[word_set_fingerprint(ws)] = ws
+
+    def encode(self, item):
+        """
+        Return the encoding of item, a Puzzle or the root of a solution
+        path.
+
+        @type self: PuzzleCodec
+        @type item: Puzzle | PuzzleNode
+        @rtype: bytes
+
+        >>> from mn_puzzle import MNPuzzle
+        >>> from sudoku_puzzle import SudokuPuzzle
+        >>> codec = PuzzleCodec()
+        >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+        >>> mn = MNPuzzle((("*", "4", "2"), ("3", "5", "1")), goal)
+        >>> len(codec.encode(mn)), codec.decode(codec.encode(mn)) == mn
+        (26, True)
+        >>> from puzzle_tools import bidirectional_solve
+        >>> sol = bidirectional_solve(mn)
+        >>> codec.decode(codec.encode(sol)) == sol
+        True
+        >>> grid = list("*B*D" "*D*B" "*A*C" "*C*A")
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> data = codec.encode(s)
+        >>> len(data), codec.decode(memoryview(data)) == s
+        (26, True)
+        """
+        return self.encode_batch([item])
+
+    def decode(self, data):
+        """
+        Return the puzzle or solution path encoded by encode in data.
+
+        @type self: PuzzleCodec
+        @type data: bytes | bytearray | memoryview
+        @rtype: Puzzle | PuzzleNode
+
+        >>> from puzzle_tools import breadth_first_solve
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"cast", "case", "vase", "cost"}
+        >>> sol = breadth_first_solve(WordLadderPuzzle("cost", "vase", ws))
+        >>> data = PuzzleCodec().encode(sol)
+        >>> len(data) < len(repr(sol.puzzle))
+        True
+        >>> PuzzleCodec([{"cost", "vase", "case", "cast"}]).decode(data) == sol
+        True
+        >>> PuzzleCodec().decode(data)
+        Traceback (most recent call last):
+        ...
+        ValueError: unknown word set 0df25f00ac8d39fb
+        """
+        items = self.decode_batch(data)
+        if len(items) != 1:
+            raise ValueError("expected one item, found {}".format(
+                len(items)))
+        return items[0]
+
+    def encode_batch(self, items):
+        """
+        Return the encoding of items, each a Puzzle or the root of a
+        solution path, writing each distinct context only once.
+
+        @type self: PuzzleCodec
+        @type items: Iterable[Puzzle | PuzzleNode]
+        @rtype: bytes
+
+        >>> from mn_puzzle import MNPuzzle
+        >>> goal = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+        >>> boards = [MNPuzzle(goal, goal)]
+        >>> for i in range(300): boards.extend(boards[i].extensions())
+        >>> codec = PuzzleCodec()
+        >>> data = codec.encode_batch(boards)
+        >>> len(data) // len(boards)
+        8
+        >>> codec.decode_batch(data) == boards
+        True
+        """
+        body, contexts, count = bytearray(), {}, 0
+        for item in items:
+            count += 1
+            path = isinstance(item, PuzzleNode)
+            puzzle = item.puzzle if path else item
+            tag = _TAGS.get(puzzle_name(puzzle))
+            if tag is None:
+                raise ValueError("cannot encode {}".format(
+                    type(puzzle).__name__))
+            if tag == _TAGS["ladder"]:
+                self.add_word_set(puzzle._word_set)
+            kind = _KINDS[tag]
+            context = bytearray()
+            kind[1](context, puzzle)
+            key = (tag, bytes(context))
+            body.append(tag | PATH if path else tag)
+            if key in contexts:
+                _write_varint(body, contexts[key])
+            else:
+                contexts[key] = len(contexts) + 1
+                body.append(0)
+                body += context
+            state = puzzle.encode_state()
+            if kind[3] and max(state, default=0) < 16:
+                _write_varint(body, len(state) << 1 | 1)
+                body += _pack_nibbles(state)
+            else:
+                _write_varint(body, len(state) << 1)
+                body += state
+            if path:
+                indexes = list(_indexes(item))
+                _write_varint(body, len(indexes))
+                for i in indexes:
+                    _write_varint(body, i)
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        _write_varint(out, count)
+        return bytes(out + body)
+
+    def decode_batch(self, data):
+        """
+        Return the puzzles and solution paths encoded by encode_batch in
+        data.
+
+        @type self: PuzzleCodec
+        @type data: bytes | bytearray | memoryview
+        @rtype: list[Puzzle | PuzzleNode]
+        """
+        return list(self.iter_decode(data))
+
+    def iter_decode(self, data):
+        """
+        Yield the puzzles and solution paths encoded by encode_batch in
+        data, one at a time.
+
+        @type self: PuzzleCodec
+        @type data: bytes | bytearray | memoryview
+        @rtype: Iterator[Puzzle | PuzzleNode]
+        """
+        data = memoryview(data)
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("not an encoded puzzle")
+        if data[len(MAGIC)] != VERSION:
+            raise ValueError("unsupported puzzle encoding version {}".format(
+                data[len(MAGIC)]))
+        count, pos = _read_varint(data, len(MAGIC) + 1)
+        templates = []
+        for _ in range(count):
+            tag = data[pos]
+            if not 0 < tag & ~PATH < len(_KINDS):
+                raise ValueError("unknown puzzle kind {}".format(tag))
+            kind = _KINDS[tag & ~PATH]
+            ref, pos = _read_varint(data, pos + 1)
+            if ref == 0:
+                template, pos = kind[2](self, data, pos)
+                templates.append(template)
+            else:
+                template = templates[ref - 1]
+            size, pos = _read_varint(data, pos)
+            if size & 1:
+                end = pos + (size >> 1) // 2 + (size >> 1) % 2
+                state = _unpack_nibbles(bytes(data[pos:end]), size >> 1)
+            else:
+                end = pos + (size >> 1)
+                state = bytes(data[pos:end])
+            puzzle, pos = template.decode_state(state), end
+            if not tag & PATH:
+                yield puzzle
+                continue
+            moves, pos = _read_varint(data, pos)
+            indexes = []
+            for _ in range(moves):
+                i, pos = _read_varint(data, pos)
+                indexes.append(i)
+            yield _replay(puzzle, indexes)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,148 @@
+"""
+The puzzle types and solvers known by name, each imported only when it
+is first asked for, so that a process solving one type of puzzle never
+imports the modules of the others.
+
+An entry names a module and an attribute of it.  register_puzzle and
+register_solver add or replace entries without importing anything, so
+puzzle types defined elsewhere can be named the same way.
+"""
+from importlib import import_module
+
+# puzzle types and solvers by name: (module, attribute)
+_PUZZLES = {
+    "mn": ("mn_puzzle", "MNPuzzle"),
+    "peg": ("grid_peg_solitaire_puzzle", "GridPegSolitairePuzzle"),
+    "sudoku": ("sudoku_puzzle", "SudokuPuzzle"),
+    "ladder": ("word_ladder_puzzle", "WordLadderPuzzle")}
+_SOLVERS = {
+    "bfs": ("puzzle_tools", "breadth_first_solve"),
+    "dfs": ("puzzle_tools", "depth_first_solve"),
+    "astar": ("puzzle_tools", "astar_solve"),
+    "dijkstra": ("puzzle_tools", "dijkstra_solve"),
+    "idastar": ("puzzle_tools", "ida_star_solve"),
+    "bidirectional": ("puzzle_tools", "bidirectional_solve"),
+    "wastar": ("puzzle_tools", "weighted_astar_solve"),
+    "beam": ("puzzle_tools", "beam_search_solve")}
+# what has been imported, by (module, attribute)
+_loaded = {}
+
+
+def _load(entry):
+    # Return the attribute entry names, importing its module the first
+    # time
+    found = _loaded.get(entry)
+    if found is None:
+        found = _loaded[entry] = getattr(import_module(entry[0]), entry[1])
+    return found
+
+
+def register_puzzle(name, module, attribute):
+    """
+    Name the puzzle class attribute of module name.
+
+    @type name: str
+    @type module: str
+    @type attribute: str
+    @rtype: None
+    """
+    _PUZZLES[name] = (module, attribute)
+
+
+def register_solver(name, module, attribute):
+    """
+    Name the solver attribute of module name.  A solver is called like
+    breadth_first_solve, with a puzzle and the keyword arguments stats
+    and budget.
+
+    @type name: str
+    @type module: str
+    @type attribute: str
+    @rtype: None
+    """
+    _SOLVERS[name] = (module, attribute)
+
+
+def puzzle_names():
+    """
+    Return the names of the puzzle types, in order.
+
+    @rtype: list[str]
+
+    >>> puzzle_names()
+    ['ladder', 'mn', 'peg', 'sudoku']
+    """
+    return sorted(_PUZZLES)
+
+
+def solver_names():
+    """
+    Return the names of the solvers, in order.
+
+    @rtype: list[str]
+
+    >>> print(" ".join(solver_names()))
+    astar beam bfs bidirectional dfs dijkstra idastar wastar
+    """
+    return sorted(_SOLVERS)
+
+
+def puzzle_class(name):
+    """
+    Return the puzzle class named name, importing its module if needed.
+
+    @type name: str
+    @rtype: type
+
+    >>> puzzle_class("mn").__name__
+    'MNPuzzle'
+    >>> puzzle_class("chess")
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown puzzle type: chess
+    """
+    if name not in _PUZZLES:
+        raise ValueError("unknown puzzle type: {}".format(name))
+    return _load(_PUZZLES[name])
+
+
+def get_solver(name):
+    """
+    Return the solver named name, importing its module if needed.
+
+    @type name: str
+    @rtype: Callable
+
+    >>> get_solver("bfs").__name__
+    'breadth_first_solve'
+    """
+    if name not in _SOLVERS:
+        raise ValueError("unknown solver: {}".format(name))
+    return _load(_SOLVERS[name])
+
+
+def puzzle_name(puzzle):
+    """
+    Return the name of the type of puzzle, or None if it has none.
+    Nothing is imported: the class of puzzle is matched by its module
+    and name.
+
+    @type puzzle: Puzzle
+    @rtype: str | None
+
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> puzzle_name(SudokuPuzzle(1, ["1"], {"1"}))
+    'sudoku'
+    >>> puzzle_name("cast") is None
+    True
+    """
+    entry = (type(puzzle).__module__, type(puzzle).__name__)
+    for name, known in _PUZZLES.items():
+        if known == entry:
+            return name
+    return None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,419 @@
+"""
+Streaming readers for files of puzzles, a parallel solver fed from
+them, and a writer for the results.  Files are read a line at a time
+and solved a chunk at a time, so only a bounded number of puzzles and
+solutions are in memory however large the input is.
+
+The readers take any iterable of lines, such as an open file:
+
+- read_sudokus: one sudoku per line in the common 81-character format,
+  "." or "0" for an empty position.
+- read_mn_puzzles: one MN board per line, rows separated by "/", tiles
+  by spaces, like MNPuzzle.context_key().
+- read_peg_puzzles: peg solitaire boards as printed, one row per line,
+  with a blank line between boards.
+- read_ladder_pairs: one start word and target word per line.
+
+solve_stream sends chunks of puzzles to worker processes encoded by
+PuzzleCodec.  It gets back each solution path as the encoded states of
+its configurations, which decode without replaying any moves.  It yields
+(puzzle, solution) pairs in input order, and write_results writes them
+out as they come.
+
+Solvers are named as in puzzle_registry.  Puzzle modules, the codec and
+multiprocessing are only imported once something needs them, so a
+process solving sudokus in this process never imports the others.
+"""
+from collections import deque
+import os
+from time import perf_counter
+from puzzle_registry import puzzle_class, get_solver
+from puzzle_tools import _chain
+from search_budget import SOLVED, UNSOLVABLE, peak_memory
+from search_stats import SearchStats
+from solution_moves import iter_moves, format_move
+
+# the symbols of sudokus up to 9x9, and the markers of empty positions
+DIGITS = "123456789"
+EMPTY = ".0"
+
+
+def _lines(lines):
+    # Yield (line number, stripped line) for the non-blank lines
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line:
+            yield number, line
+
+
+def read_sudokus(lines, symbols=DIGITS, empty=EMPTY):
+    """
+    Yield a SudokuPuzzle for each line of lines: n * n characters, each
+    one of the first n of symbols or, for an empty position, one of
+    empty.
+
+    @type lines: Iterable[str]
+    @type symbols: str
+    @type empty: str
+    @rtype: Iterator[SudokuPuzzle]
+
+    >>> next(read_sudokus(["1.3."]))
+    Traceback (most recent call last):
+    ...
+    ValueError: line 1: 4 positions is not a sudoku size
+    >>> print(next(read_sudokus(["3.1.0..1..1.2.3."])))
+    3*|1*
+    **|*1
+    -----
+    **|1*
+    2*|3*
+    """
+    sudoku = puzzle_class("sudoku")
+    for number, line in _lines(lines):
+        n = round(len(line) ** (1 / 2))
+        root = round(n ** (1 / 2))
+        if n * n != len(line) or root * root != n or n == 1:
+            raise ValueError("line {}: {} positions is not a sudoku "
+                             "size".format(number, len(line)))
+        if n > len(symbols):
+            raise ValueError("line {}: {}x{} needs more than {} "
+                             "symbols".format(number, n, n, len(symbols)))
+        symbol_set = set(symbols[:n])
+        cells = ["*" if c in empty else c for c in line]
+        if not all(c == "*" or c in symbol_set for c in cells):
+            raise ValueError("line {}: unknown symbol".format(number))
+        yield sudoku(n, cells, symbol_set)
+
+
+def parse_grid(text):
+    """
+    Return the grid written as text: rows separated by "/", of tiles
+    separated by spaces, or single characters when a row has no spaces.
+
+    @type text: str
+    @rtype: tuple[tuple[str]]
+
+    >>> parse_grid("1 2 3/4 * 5"), parse_grid("*1/32")
+    ((('1', '2', '3'), ('4', '*', '5')), (('*', '1'), ('3', '2')))
+    """
+    return tuple(tuple(row.split() if " " in row.strip() else row.strip())
+                 for row in text.split("/"))
+
+
+def read_mn_puzzles(lines, to_grid=None):
+    """
+    Yield an MNPuzzle for each line of lines, working towards to_grid
+    or, when it is None, towards its tiles in order with the blank "*"
+    last.
+
+    @type lines: Iterable[str]
+    @type to_grid: tuple[tuple[str]] | None
+    @rtype: Iterator[MNPuzzle]
+
+    >>> lines = ["1 2 3/4 * 5", "*1/32"]
+    >>> [p.context_key() for p in read_mn_puzzles(lines)]
+    ['1 2 3/4 5 *', '1 2/3 *']
+    """
+    mn = puzzle_class("mn")
+    for number, line in _lines(lines):
+        grid = parse_grid(line)
+        if any(len(row) != len(grid[0]) for row in grid):
+            raise ValueError("line {}: rows of different lengths".format(
+                number))
+        target = to_grid
+        if target is None:
+            tiles = sorted((t for row in grid for t in row if t != "*"),
+                           key=lambda t: (len(t), t)) + ["*"]
+            m = len(grid[0])
+            target = tuple(tuple(tiles[i:i + m])
+                           for i in range(0, len(tiles), m))
+        yield mn(grid, target)
+
+
+def read_peg_puzzles(lines):
+    """
+    Yield a GridPegSolitairePuzzle for each board in lines, a block of
+    rows of "*", "." and "#", with or without spaces between them,
+    ending at a blank line.
+
+    @type lines: Iterable[str]
+    @rtype: Iterator[GridPegSolitairePuzzle]
+
+    >>> for p in read_peg_puzzles(["* * .", "", "**.*", "#..*"]): print(p)
+    * * .
+    * * . *
+    # . . *
+    """
+    peg, rows = puzzle_class("peg"), []
+    for line in lines:
+        line = line.split()
+        if line:
+            rows.append(list("".join(line)))
+        elif rows:
+            yield peg(rows, {"*", ".", "#"})
+            rows = []
+    if rows:
+        yield peg(rows, {"*", ".", "#"})
+
+
+def read_ladder_pairs(lines, ws, chars=None, indels=False, costs=None):
+    """
+    Yield a WordLadderPuzzle over ws for each line of lines holding a
+    start word and a target word, with letters from chars (lowercase
+    letters when None).
+
+    @type lines: Iterable[str]
+    @type ws: set[str]
+    @type chars: str
+    @type indels: bool
+    @type costs: WordCosts | None
+    @rtype: Iterator[WordLadderPuzzle]
+
+    >>> ws = {"cast", "case", "vase"}
+    >>> [str(p) for p in read_ladder_pairs(["cast vase", "vase cast"], ws)]
+    ['cast --> vase', 'vase --> cast']
+    """
+    ladder = puzzle_class("ladder")
+    if chars is None:
+        from word_ladder_puzzle import LOWERCASE as chars
+    for number, line in _lines(lines):
+        words = line.split()
+        if len(words) != 2:
+            raise ValueError("line {}: expected two words".format(number))
+        yield ladder(words[0], words[1], ws, chars, indels, costs)
+
+
+def chunked(items, size):
+    """
+    Yield lists of the next size items of items, the last one shorter
+    if they run out.
+
+    @type items: Iterable
+    @type size: int
+    @rtype: Iterator[list]
+
+    >>> list(chunked(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+    """
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _solve(puzzle, solver, budget, stats, options=None):
+    # Return (solution or None, status, reason) for the search of puzzle
+    # by the solver named solver, given the keyword arguments options,
+    # as in a SearchOutcome
+    result = get_solver(solver)(puzzle, stats=stats, budget=budget,
+                                **(options or {}))
+    if budget is None:
+        return result, SOLVED if result is not None else UNSOLVABLE, None
+    return (result.node if result.solved else None, result.status,
+            result.reason)
+
+
+def measured_solve(puzzle, solver="bfs", budget=None, options=None):
+    """
+    Return (solution, metrics): the root of the path to a solution of
+    puzzle that the solver named solver finds, given the keyword
+    arguments in options, or None, and a dict of what the search took.
+
+    The metrics are:
+    - status: "solved", "unsolvable" or "exhausted". With "exhausted",
+      reason names the limit of budget that ran out.
+    - moves: the number of moves in solution.
+    - seconds: the time taken.
+    - nodes_expanded and nodes_generated.
+    - peak_visited_bytes: the estimated peak memory of the visited
+      configurations.
+    - peak_memory: the peak resident memory of the whole process, in
+      bytes.
+    - lower_bound and suboptimality: for solvers reporting them, a
+      lower bound on the least cost of a solution and how many times
+      that the solution may cost at most, else None.
+
+    @type puzzle: Puzzle
+    @type solver: str
+    @type budget: Budget | None
+    @type options: dict | None
+    @rtype: (PuzzleNode | None, dict)
+
+    >>> from search_budget import Budget
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cast", "case", "vase"}
+    >>> sol, metrics = measured_solve(WordLadderPuzzle("cast", "vase", ws))
+    >>> metrics["status"], metrics["moves"], metrics["nodes_expanded"]
+    ('solved', 2, 2)
+    >>> sol, metrics = measured_solve(WordLadderPuzzle("cast", "vase", ws), \
+"dfs", Budget(max_nodes=1))
+    >>> sol, metrics["status"], metrics["reason"]
+    (None, 'exhausted', 'max_nodes')
+    >>> sol, metrics = measured_solve(WordLadderPuzzle("cast", "vase", ws), \
+"beam", options={"width": 1})
+    >>> metrics["moves"], metrics["lower_bound"], metrics["suboptimality"]
+    (2, 2, 1.0)
+    """
+    stats = SearchStats()
+    start = perf_counter()
+    solution, status, reason = _solve(puzzle, solver, budget, stats,
+                                      options)
+    seconds = perf_counter() - start
+    return solution, {
+        "status": status, "reason": reason,
+        "moves": (None if solution is None else
+                  sum(1 for _ in solution.iter_path()) - 1),
+        "seconds": seconds,
+        "nodes_expanded": stats.nodes_expanded,
+        "nodes_generated": stats.nodes_generated,
+        "peak_visited_bytes": stats.peak_visited_bytes,
+        "peak_memory": peak_memory(),
+        "lower_bound": stats.lower_bound,
+        "suboptimality": stats.suboptimality()}
+
+
+# the PuzzleCodec of a worker process, knowing the word sets it needs
+_worker_codec = None
+
+
+def _init_worker(word_sets, costs):
+    # Pool initializer: build the PuzzleCodec of this worker
+    global _worker_codec
+    from puzzle_codec import PuzzleCodec
+    _worker_codec = PuzzleCodec(word_sets, costs)
+
+
+def _solve_job(args):
+    # Pool worker: decode a chunk of puzzles and return, for each, the
+    # encoded states along its solution path, or None where there is
+    # none, and its metrics if measure, else None
+    solver, data, budget, measure, options = args
+    results = []
+    for puzzle in _worker_codec.iter_decode(data):
+        if measure:
+            solution, metrics = measured_solve(puzzle, solver, budget,
+                                               options)
+        else:
+            solution = _solve(puzzle, solver, budget, None, options)[0]
+            metrics = None
+        results.append((None if solution is None else
+                        [p.encode_state() for p in solution.iter_path()],
+                        metrics))
+    return results
+
+
+def solve_stream(puzzles, solver="bfs", processes=None, chunk_size=64,
+                 word_sets=(), costs=None, budget=None, measure=False,
+                 options=None):
+    """
+    Yield (puzzle, solution) for each of puzzles in order, solution being
+    the root of a path found by the solver named solver, given the
+    keyword arguments in options, or None.  The
+    puzzles are solved chunk_size at a time across processes worker
+    processes (all cores when None, in this process when 1), with at
+    most two chunks per process read ahead.
+
+    Each search is limited by budget, if given, and solution is None
+    when it runs out.  When measure is True, the metrics of
+    measured_solve follow as a third item.
+
+    Word ladders are sent by the fingerprints of their word sets, so
+    every word set they use must be in word_sets, and costs must be the
+    word costs they use, if any.
+
+    @type puzzles: Iterable[Puzzle]
+    @type solver: str
+    @type processes: int | None
+    @type chunk_size: int
+    @type word_sets: Iterable[set[str]]
+    @type costs: WordCosts | None
+    @type budget: Budget | None
+    @type measure: bool
+    @type options: dict | None
+    @rtype: Iterator[tuple]
+
+    >>> lines = ["*1/23", "12/*3", "12/3*"]
+    >>> serial = list(solve_stream(read_mn_puzzles(lines), processes=1))
+    >>> pooled = list(solve_stream(read_mn_puzzles(lines), processes=2, \
+chunk_size=2))
+    >>> serial == pooled
+    True
+    >>> [None if s is None else len(list(iter_moves(s))) for _, s in pooled]
+    [None, 1, 0]
+    """
+    get_solver(solver)
+    if processes == 1:
+        for puzzle in puzzles:
+            if measure:
+                yield (puzzle,) + measured_solve(puzzle, solver, budget,
+                                                 options)
+            else:
+                yield puzzle, _solve(puzzle, solver, budget, None,
+                                     options)[0]
+        return
+    from multiprocessing import Pool
+    from puzzle_codec import PuzzleCodec
+    word_sets = list(word_sets)
+    codec = PuzzleCodec(word_sets, costs)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    with Pool(processes, _init_worker, (word_sets, costs)) as pool:
+        pending = deque()
+        for chunk in chunked(puzzles, chunk_size):
+            job = (solver, codec.encode_batch(chunk), budget, measure,
+                   options)
+            pending.append((chunk, pool.apply_async(_solve_job, (job,))))
+            if len(pending) > 2 * processes:
+                yield from _results(*pending.popleft(), measure)
+        while pending:
+            yield from _results(*pending.popleft(), measure)
+
+
+def _results(chunk, job, measure):
+    # Yield the results of solve_stream for the puzzles of chunk,
+    # waiting for the encoded paths job returns for them
+    for puzzle, (states, metrics) in zip(chunk, job.get()):
+        solution = None if states is None else _chain(
+            [puzzle] + [puzzle.decode_state(state) for state in states[1:]])
+        yield (puzzle, solution, metrics) if measure else (puzzle, solution)
+
+
+def write_results(results, out):
+    """
+    Write a line to the text stream out for each result of solve_stream
+    in results, as they come: its position in results, the number of
+    moves in solution, or "-" if it is None, and the moves, separated by
+    ", ".  Return the number of lines written.
+
+    @type results: Iterable[tuple]
+    @type out: TextIO
+    @rtype: int
+
+    >>> import io
+    >>> puzzles = read_ladder_pairs(["cast vase", "cast cusp"], \
+{"cast", "case", "vase", "cusp"})
+    >>> out = io.StringIO()
+    >>> write_results(solve_stream(puzzles, processes=1), out)
+    2
+    >>> out.getvalue().splitlines()
+    ['0\\t2\\t3 e 0, 0 v 0', '1\\t-']
+    """
+    count = 0
+    for count, result in enumerate(results, 1):
+        solution = result[1]
+        if solution is None:
+            out.write("{}\t-\n".format(count - 1))
+        else:
+            moves = [format_move(move) for move in iter_moves(solution)]
+            out.write("{}\t{}\t{}\n".format(count - 1, len(moves),
+                                            ", ".join(moves)))
+    return count
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -3,14 +3,15 @@ Some functions for working with puzzles
 """
 from puzzle import Puzzle
 from collections import deque
-from grid_peg_solitaire_puzzle import *
-from word_ladder_puzzle import *
-# set higher recursion limit
-# which is needed in PuzzleNode.__str__
-# import resource
+from heapq import heappush, heappop, nsmallest
+from itertools import count
+from search_stats import NullStats, SearchStats
+from search_budget import Budget, BudgetExhausted, outcome, exhausted
 import sys
-# resource.setrlimit(resource.RLIMIT_STACK, (2**29, -1))
-sys.setrecursionlimit(10**6)
+
+# depth_helper recurses once per move, so depth-first searches raise the
+# recursion limit to this while they run
+DEPTH_RECURSION_LIMIT = 10 ** 6
 
 # implement depth_first_solve
 # do NOT change the type contract
@@ -18,15 +19,35 @@ sys.setrecursionlimit(10**6)
 # you like
 
 
-def depth_first_solve(puzzle):
+def depth_first_solve(puzzle, dead_states=None, stats=None, budget=None,
+                      order=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
     in its parent.  Return None if this is not possible.
 
+    Configurations in dead_states (puzzle.dead_states by default) are
+    not expanded, and configurations of acyclic puzzles found to lead
+    to no solution are added to it, so later solves skip them too.
+
+    The extensions of each configuration are tried in the order of
+    order, a MoveOrder (puzzle.move_order by default).
+
+    What the search did is recorded in stats, if given.
+
+    Given a Budget, the search stops when it runs out and a
+    SearchOutcome is returned instead of the path, holding the path to
+    the best configuration reached.
+
     @type puzzle: Puzzle
-    @rtype: PuzzleNode | None
+    @type dead_states: DeadStateCache | None
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @type order: MoveOrder | None
+    @rtype: PuzzleNode | SearchOutcome | None
 
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> from word_ladder_puzzle import WordLadderPuzzle
     >>> tester1 = WordLadderPuzzle("cast", "vase", {"case", "cast", "vase"})
     >>> print(depth_first_solve(tester1))
     cast --> vase
@@ -36,6 +57,15 @@ def depth_first_solve(puzzle):
     vase --> vase
     <BLANKLINE>
     <BLANKLINE>
+    >>> from dead_state_cache import DeadStateCache
+    >>> grid = [[".", "*", "*", "*"], ["*", "*", "*", "*"], \
+["*", "*", "*", "*"]]
+    >>> result = depth_first_solve(GridPegSolitairePuzzle(grid, \
+{"*", ".", "#"}), DeadStateCache(), budget=Budget(max_nodes=3))
+    >>> result
+    SearchOutcome(exhausted: max_nodes, 3 nodes)
+    >>> len(list(_iter_chain(result.node)))
+    4
     """
 
     seen = set()
@@ -43,7 +73,29 @@ def depth_first_solve(puzzle):
     # of PuzzleNodes where the returned node and all of its children only
     # have one child, eventually leading to the solution
     node = PuzzleNode(puzzle)
-    solution_ = depth_helper(node, seen)
+    if dead_states is None:
+        dead_states = puzzle.dead_states
+    if order is None:
+        order = puzzle.move_order
+    if stats is None:
+        stats = NullStats()
+    if budget is not None:
+        budget.start()
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, DEPTH_RECURSION_LIMIT))
+    try:
+        solution_ = depth_helper(node, seen, dead_states, stats,
+                                 budget=budget, order=order)
+    except BudgetExhausted:
+        stats.finish()
+        return exhausted(budget)
+    finally:
+        sys.setrecursionlimit(limit)
+    if solution_ is not None:
+        stats.solution(solution_)
+    stats.finish()
+    if budget is not None:
+        return outcome(budget, solution_)
     #
     # if solution is not None:
     #     while solution.parent:
@@ -53,14 +105,24 @@ def depth_first_solve(puzzle):
     return solution_
 
 
-def depth_helper(puzzle_node, seen):
+def depth_helper(puzzle_node, seen, dead_states=None, stats=None, depth=0,
+                 budget=None, order=None):
     """
-    Return the root of a path to a solution to puzzle_node
+    Return the root of a path to a solution to puzzle_node, which is
+    depth moves from the root of the search, trying extensions in the
+    order of order when it is given.  Raise BudgetExhausted when budget
+    runs out.
 
     :param puzzle_node: PuzzleNode
-    :param seen: set[str]
+    :param seen: set[Hashable]
+    :param dead_states: DeadStateCache | None
+    :param stats: SearchStats | NullStats | None
+    :param depth: int
+    :param budget: Budget | None
+    :param order: MoveOrder | None
     :return: PuzzleNode | None
 
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
     >>> tester = GridPegSolitairePuzzle([[".", ".", "."], ["*", "*", "."]], \
     {".", "*", "#"})
     >>> seen = set()
@@ -75,23 +137,54 @@ def depth_helper(puzzle_node, seen):
     <BLANKLINE>
     """
 
-    seen.add(str(puzzle_node.puzzle))
+    if stats is None:
+        stats = NullStats()
+    puzzle = puzzle_node.puzzle
+    key = stats.call("hashing", puzzle.state_key)
+    seen.add(key)
+    stats.visited(seen)
+    stats.frontier(depth + 1)
+    # only acyclic puzzles fail independently of what the search has seen
+    if not puzzle.acyclic:
+        dead_states = None
 
-    if puzzle_node.puzzle.is_solved():
+    if stats.call("is_solved", puzzle.is_solved):
         # print("solved!!")
         return puzzle_node
 
-    elif puzzle_node.puzzle.fail_fast():
+    elif dead_states is not None and key in dead_states:
+        stats.duplicate(puzzle, depth)
         return None
 
-    for ex in puzzle_node.puzzle.extensions():
+    elif stats.call("fail_fast", puzzle.fail_fast):
+        if dead_states is not None:
+            dead_states.add(key)
+        return None
 
-        if str(ex) not in seen:
+    if budget is not None:
+        budget.expand(puzzle_node, depth)
+    extensions = stats.call("extensions", puzzle.extensions)
+    stats.expanded(puzzle, depth, extensions)
+    if order is not None:
+        extensions = order.order(puzzle, extensions, depth)
+    ex_keys = []
+    for ex in extensions:
+        ex_key = stats.call("hashing", ex.state_key)
+        ex_keys.append(ex_key)
+
+        if ex_key not in seen and (dead_states is None or
+                                   ex_key not in dead_states):
             puzzle_node.children.append(PuzzleNode(ex, [], puzzle_node))
-        seen.add(str(ex))
+        else:
+            stats.duplicate(ex, depth + 1)
+        seen.add(ex_key)
 
     for child in puzzle_node.children:
-        solution_node = depth_helper(child, seen)
+        solution_node = depth_helper(child, seen, dead_states, stats,
+                                     depth + 1, budget, order)
+        if order is not None:
+            order.record(puzzle, child.puzzle, depth,
+                         solution_node is not None)
 
         if solution_node is not None:
             # Going backwards in the linked list to find the root
@@ -101,17 +194,60 @@ def depth_helper(puzzle_node, seen):
 
             return solution_node.parent
     else:
+        # Extensions skipped only because they were seen may still be
+        # solvable, so this is dead only if every extension is
+        if dead_states is not None and all(k in dead_states
+                                           for k in ex_keys):
+            dead_states.add(key)
         return None
 
 
-def breadth_first_solve(puzzle):
+def breadth_first_solve(puzzle, stats=None, budget=None, frontier=False):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
     of the puzzle in its parent.  Return None if this is not possible.
 
+    The search expands a whole level of configurations at a time and
+    drops an extension as soon as it is generated if its configuration
+    was generated before, so no configuration is queued twice.
+
+    With frontier, the keys of old levels are dropped as the search
+    goes, so memory grows with the widest levels rather than with every
+    configuration seen: reversible puzzles keep the two levels before
+    the one being generated, which are the only ones an extension can
+    lead back to, and acyclic puzzles keep none, removing duplicates
+    within each level only.  Other puzzles keep every key either way.
+
+    What the search did is recorded in stats, if given.
+
+    Given a Budget, the search stops when it runs out and a
+    SearchOutcome is returned instead of the path, as for
+    depth_first_solve.
+
     @type puzzle: Puzzle
-    @rtype: PuzzleNode
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @type frontier: bool
+    @rtype: PuzzleNode | SearchOutcome | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cast", "case", "cost", "vase", "vast"}
+    >>> result = breadth_first_solve(WordLadderPuzzle("cast", "vase", ws), \
+budget=Budget(max_nodes=1))
+    >>> result
+    SearchOutcome(exhausted: max_nodes, 1 nodes)
+    >>> print(result.node.puzzle)
+    cast --> vase
+    >>> breadth_first_solve(WordLadderPuzzle("cast", "vase", ws), \
+budget=Budget(deadline=10)).status
+    'solved'
+
+    >>> stats = SearchStats()
+    >>> sol = breadth_first_solve(WordLadderPuzzle("cast", "vase", \
+    {"case", "cast", "vase"}), stats)
+    >>> stats.nodes_expanded, stats.solutions, stats.branching_factors()
+    (2, 1, {0: 1.0, 1: 2.0})
 
     >>> not_tester1 = WordLadderPuzzle("cast", "vase", {"case", "cast", "vase"})
     >>> print(breadth_first_solve(not_tester1))
@@ -122,6 +258,18 @@ def breadth_first_solve(puzzle):
     vase --> vase
     <BLANKLINE>
     <BLANKLINE>
+
+    A frontier search finds a path as short, holding fewer keys:
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> full, kept = SearchStats(), SearchStats()
+    >>> start = (("*", "4", "2"), ("3", "5", "1"))
+    >>> sol = breadth_first_solve(MNPuzzle(start, goal), full)
+    >>> breadth_first_solve(MNPuzzle(start, goal), kept, frontier=True) == sol
+    True
+    >>> full.peak_visited, kept.peak_visited
+    (284, 123)
     """
 
 # implement breadth_first_solve
@@ -131,41 +279,1033 @@ def breadth_first_solve(puzzle):
 # Hint: you may find a queue useful, that's why
 # we imported deque
 
-    new_puzzle_node = PuzzleNode(puzzle)
-    to_check = deque()
-    to_check.append(new_puzzle_node)
-    seen = set()
+    if stats is None:
+        stats = NullStats()
+    kept = None
+    if frontier and puzzle.acyclic:
+        kept = 0
+    elif frontier and puzzle.reversible:
+        kept = 2
+    return _run_budgeted(lambda p, s, b: _breadth_first(p, s, b, kept),
+                         puzzle, stats, budget)
 
-    while to_check:
-        puzzle_node = to_check.popleft()
-        if puzzle_node.puzzle.fail_fast():
-            return None
-        if str(puzzle_node.puzzle) not in seen:
+
+def _run_budgeted(search, puzzle, stats, budget):
+    # Return search(puzzle, stats, budget), or its SearchOutcome when
+    # there is a budget
+    if budget is None:
+        return search(puzzle, stats, None)
+    budget.start()
+    try:
+        return outcome(budget, search(puzzle, stats, budget))
+    except BudgetExhausted:
+        stats.finish()
+        return exhausted(budget)
+
+
+def _breadth_first(puzzle, stats, budget, kept=None):
+    # The search of breadth_first_solve, raising BudgetExhausted when
+    # budget runs out.  Extensions whose keys are held are dropped: the
+    # keys of the level being generated and of the kept levels before
+    # it, or of every level when kept is None
+    dead_states = puzzle.dead_states if puzzle.acyclic else None
+    key = stats.call("hashing", puzzle.state_key)
+    # each entry is (node, its state key)
+    level = [(PuzzleNode(puzzle), key)]
+    if dead_states is not None and key in dead_states:
+        level = []
+    held, depth = {key}, 0
+    # the keys of each level before the one being generated, while
+    # levels are dropped
+    history = deque([[key]])
+
+    while level:
+        next_level = []
+        for i, (puzzle_node, key) in enumerate(level):
+            current = puzzle_node.puzzle
             # Check if the puzzle configuration is a solution
             # and return it straight away if it is
-            if puzzle_node.puzzle.is_solved():
-                # Need to set the right path for this node so it only moves
-                # toward solution
-                # Going backwards in the linked list to make
+            if stats.call("is_solved", current.is_solved):
+                # Need to set the right path for this node so it only
+                # moves toward solution
                 while puzzle_node.parent:
                     puzzle_node.parent.children = [puzzle_node]
                     puzzle_node = puzzle_node.parent
 
+                stats.solution(puzzle_node)
+                stats.finish()
                 return puzzle_node
 
-            if puzzle_node.puzzle.extensions():
-                # If there are extensions add children all at once to the queue
-                for extension in puzzle_node.puzzle.extensions():
-                    new_node = PuzzleNode(extension, [], puzzle_node)
-                    puzzle_node.children.append(new_node)
+            # A configuration that can't be solved is not extended,
+            # but its siblings may still lead to a solution
+            if stats.call("fail_fast", current.fail_fast):
+                continue
+
+            if budget is not None:
+                budget.expand(puzzle_node, depth)
+            extensions = stats.call("extensions", current.extensions)
+            stats.expanded(current, depth, extensions)
+            # children are only linked to their parent, so that nodes
+            # of dropped levels without queued descendants are freed
+            for extension in extensions:
+                new_key = stats.call("hashing", extension.state_key)
+                if new_key in held or (dead_states is not None and
+                                       new_key in dead_states):
+                    stats.duplicate(extension, depth + 1)
+                    continue
+                held.add(new_key)
+                next_level.append((PuzzleNode(extension, [], puzzle_node),
+                                   new_key))
+            stats.visited(held)
+            stats.frontier(len(level) - i - 1 + len(next_level))
+
+        if kept is not None:
+            history.append([new_key for _, new_key in next_level])
+            while len(history) > kept:
+                held.difference_update(history.popleft())
+        level, depth = next_level, depth + 1
+
+    stats.finish()
+    # If it gets to this line it means that there were no solutions
+    # found at all
+    return None
+
+
+def dijkstra_solve(puzzle, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution of least total cost, adding up puzzle.step_cost for each
+    move, or None if there is none.
+
+    Stats and budget are as for breadth_first_solve.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | SearchOutcome | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> from word_ladder_puzzle import WordCosts
+    >>> ws = {"cast", "case", "vase", "vast"}
+    >>> costs = WordCosts({"case": 8, "vase": 8, "vast": 1})
+    >>> sol = dijkstra_solve(WordLadderPuzzle("cast", "vase", ws, \
+costs=costs))
+    >>> [str(n.puzzle) for n in _iter_chain(sol)], path_cost(sol)
+    (['cast --> vase', 'case --> vase', 'vase --> vase'], 2.0)
+
+    Stats file expansions by number of moves, not by cost:
+
+    >>> stats = SearchStats()
+    >>> sol = dijkstra_solve(WordLadderPuzzle("cost", "vase", ws | {"cost"}, \
+costs=costs), stats)
+    >>> path_cost(sol), sorted(stats.expanded_by_depth.items())
+    (6.0, [(0, 1), (1, 1), (2, 1)])
+    """
+    if stats is None:
+        stats = NullStats()
+    return _run_budgeted(_best_first_search(0), puzzle, stats, budget)
+
+
+def astar_solve(puzzle, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution of least total cost, like dijkstra_solve, expanding
+    configurations in order of cost so far plus puzzle.heuristic().
+
+    Stats and budget are as for breadth_first_solve.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | SearchOutcome | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> sol = astar_solve(MNPuzzle((("*", "4", "2"), ("3", "5", "1")), goal))
+    >>> path_cost(sol)
+    15
+    """
+    if stats is None:
+        stats = NullStats()
+    return _run_budgeted(_best_first_search(1), puzzle, stats, budget)
+
+
+def weighted_astar_solve(puzzle, weight=2, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution, like astar_solve but expanding configurations in order of
+    cost so far plus weight times puzzle.heuristic().  A weight above 1
+    heads for the target more greedily, trading cost for speed: when
+    the heuristic never overestimates, the solution costs at most weight
+    times the least cost.
+
+    The cost of the solution and a lower bound on the least cost, from
+    the configurations left unexpanded, go to stats.bound, so
+    stats.suboptimality() tells how far from the least cost the
+    solution may be, usually much less than weight.
+
+    Stats and budget are as for breadth_first_solve.
+
+    @type puzzle: Puzzle
+    @type weight: int | float
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | SearchOutcome | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> goal = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+    >>> start = MNPuzzle((("8", "6", "7"), ("2", "5", "4"), \
+("3", "*", "1")), goal)
+    >>> fast, exact = SearchStats(), SearchStats()
+    >>> path_cost(weighted_astar_solve(start, 2, fast)), fast.nodes_expanded
+    (31, 382)
+    >>> path_cost(astar_solve(start, exact)), exact.nodes_expanded
+    (31, 20290)
+    >>> fast.lower_bound, round(fast.suboptimality(), 2)
+    (23, 1.35)
+    """
+    if stats is None:
+        stats = NullStats()
+    return _run_budgeted(_best_first_search(weight), puzzle, stats, budget)
+
+
+def _best_first_search(weight):
+    # Return the search of dijkstra_solve (weight 0), astar_solve
+    # (weight 1) or weighted_astar_solve, taking (puzzle, stats, budget)
+    def search(puzzle, stats, budget):
+        root_key = stats.call("hashing", puzzle.state_key)
+        nodes, costs = {root_key: PuzzleNode(puzzle)}, {root_key: 0}
+        # configurations expanded, and those of them reached again at
+        # less cost, which only happens with weight above 1
+        closed, improved = set(), set()
+        # entries are (estimated total cost, tie breakers, cost, number
+        # of moves, key); weighted searches take the costlier of equal
+        # estimates first, being nearer the target, and otherwise equal
+        # estimates keep their order of insertion.  Entries made stale
+        # by a cheaper path are skipped when popped
+        order = count()
+        heap = [(weight * puzzle.heuristic() if weight else 0, 0,
+                 next(order), 0, 0, root_key)]
+        while heap:
+            _, _, _, cost, depth, key = heappop(heap)
+            if key in closed or cost > costs[key]:
+                continue
+            closed.add(key)
+            node = nodes[key]
+            current = node.puzzle
+            if stats.call("is_solved", current.is_solved):
+                stats.bound(cost, cost if weight <= 1 else _open_bound(
+                    heap, improved, nodes, costs, closed, cost))
+                while node.parent:
+                    node.parent.children = [node]
+                    node = node.parent
+                stats.solution(node)
+                stats.finish()
+                return node
+            if stats.call("fail_fast", current.fail_fast):
+                continue
+            if budget is not None:
+                budget.expand(node, depth)
+            extensions = stats.call("extensions", current.extensions)
+            stats.expanded(current, depth, extensions)
+            for extension in extensions:
+                new_key = stats.call("hashing", extension.state_key)
+                new_cost = cost + current.step_cost(extension)
+                if new_cost >= costs.get(new_key, new_cost + 1):
+                    stats.duplicate(extension, depth + 1)
+                    continue
+                costs[new_key] = new_cost
+                if new_key in closed:
+                    # not expanded again, as reopening can cost far
+                    # more than it saves, but it still bounds the cost
+                    stats.duplicate(extension, depth + 1)
+                    improved.add(new_key)
+                    continue
+                nodes[new_key] = PuzzleNode(extension, [], node)
+                heappush(heap, (new_cost + weight * extension.heuristic()
+                                if weight else new_cost,
+                                -new_cost if weight > 1 else 0,
+                                next(order), new_cost, depth + 1, new_key))
+            stats.frontier(len(heap))
+            stats.visited(costs)
+        stats.finish()
+        return None
+    return search
+
+
+def _open_bound(heap, improved, nodes, costs, closed, cost):
+    # Return a lower bound on the least cost of a solution, given one
+    # costing cost: as in ARA*, some configuration on a least costly
+    # path is either in heap or improved at its least cost, so the least
+    # cost plus heuristic among them is a bound
+    keys = [key for _, _, _, open_cost, _, key in heap
+            if key not in closed and open_cost == costs[key]]
+    for key in keys + list(improved):
+        cost = min(cost, costs[key] + nodes[key].puzzle.heuristic())
+    return cost
+
+
+def beam_search_solve(puzzle, width=100, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution, searching a level at a time like breadth_first_solve but
+    only going on from the width configurations of each level with the
+    least cost so far plus puzzle.heuristic(), and of those estimated
+    the same, the least puzzle.tie_break().  Return None if every
+    configuration of a level was pruned, skipped or failed, which does
+    not prove that puzzle has no solution: a wider beam may find one.
+
+    Each level holds at most width configurations, so the time and
+    memory per level stay flat however large the puzzle; only the keys
+    of configurations kept, at most width per level, are remembered.
+
+    The cost of the solution and puzzle.heuristic(), a lower bound on
+    the least cost when it never overestimates, go to stats.bound.
+
+    Stats and budget are as for breadth_first_solve.
+
+    @type puzzle: Puzzle
+    @type width: int
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | SearchOutcome | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> goal = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+    >>> start = MNPuzzle((("8", "6", "7"), ("2", "5", "4"), \
+("3", "*", "1")), goal)
+    >>> stats = SearchStats()
+    >>> path_cost(beam_search_solve(start, 10, stats)), stats.nodes_expanded
+    (39, 368)
+    >>> stats.lower_bound, round(stats.suboptimality(), 2)
+    (21, 1.86)
+    >>> beam_search_solve(MNPuzzle((("2", "1"), ("3", "*")), (("1", "2"), \
+("3", "*"))), 2) is None
+    True
+    """
+    if stats is None:
+        stats = NullStats()
+    return _run_budgeted(lambda p, s, b: _beam(p, width, s, b), puzzle,
+                         stats, budget)
 
-                    if str(new_node.puzzle) not in seen:
-                        to_check.append(new_node)
-            seen.add(str(puzzle_node.puzzle))
 
-    # If it gets to this line it means that there were no solutions found at all
+def _beam(puzzle, width, stats, budget):
+    # The search of beam_search_solve, raising BudgetExhausted when
+    # budget runs out
+    seen = {stats.call("hashing", puzzle.state_key)}
+    # entries are ((estimated total cost, tie break), cost so far, node)
+    level, depth = [(None, 0, PuzzleNode(puzzle))], 0
+    while level:
+        # the extensions generated from level by key, the first
+        # generated of each kept
+        candidates = {}
+        for _, cost, node in level:
+            current = node.puzzle
+            if stats.call("is_solved", current.is_solved):
+                stats.bound(cost, puzzle.heuristic())
+                while node.parent:
+                    node.parent.children = [node]
+                    node = node.parent
+                stats.solution(node)
+                stats.finish()
+                return node
+            if stats.call("fail_fast", current.fail_fast):
+                continue
+            if budget is not None:
+                budget.expand(node, depth)
+            extensions = stats.call("extensions", current.extensions)
+            stats.expanded(current, depth, extensions)
+            for extension in extensions:
+                key = stats.call("hashing", extension.state_key)
+                if key in seen or key in candidates:
+                    stats.duplicate(extension, depth + 1)
+                    continue
+                new_cost = cost + current.step_cost(extension)
+                candidates[key] = ((new_cost + extension.heuristic(),
+                                    extension.tie_break()),
+                                   new_cost, PuzzleNode(extension, [], node))
+        # nsmallest keeps equal ranks in the order generated
+        kept = nsmallest(width, candidates.items(),
+                         key=lambda item: item[1][0])
+        seen.update(key for key, _ in kept)
+        level = [entry for _, entry in kept]
+        depth += 1
+        stats.frontier(len(level))
+        stats.visited(seen)
+    stats.finish()
     return None
 
+
+def ida_star_solve(puzzle, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution of least total cost, like astar_solve, by depth-first
+    searches that give up on a configuration once its cost so far plus
+    puzzle.heuristic() goes over a bound, each search raising the bound
+    to the least estimate that went over it.
+
+    Each search only keeps its current path and the least cost it
+    reached each configuration at, skipping a configuration reached
+    again at no less cost; nothing is kept between searches.  A search
+    with no estimate over its bound has seen every configuration, so
+    the puzzle has no solution.
+
+    Stats and budget are as for breadth_first_solve.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | SearchOutcome | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> from mn_puzzle import MNPuzzle
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> sol = ida_star_solve(MNPuzzle((("*", "4", "2"), ("3", "5", "1")), \
+goal))
+    >>> path_cost(sol)
+    15
+    >>> ida_star_solve(WordLadderPuzzle("cast", "cusp", {"cast", "cost"}))
+    >>> ida_star_solve(MNPuzzle((("2", "1"), ("3", "*")), (("1", "2"), \
+("3", "*"))))
+    """
+    if stats is None:
+        stats = NullStats()
+    return _run_budgeted(_ida_star, puzzle, stats, budget)
+
+
+def _ida_star(puzzle, stats, budget):
+    # The search of ida_star_solve, raising BudgetExhausted when budget
+    # runs out
+    root = PuzzleNode(puzzle)
+    root_key = stats.call("hashing", puzzle.state_key)
+    bound = puzzle.heuristic()
+    while True:
+        exceeded = None
+        # frames are [node, key, cost so far, extensions, position of
+        # the next extension to try]; reached holds the least cost so
+        # far of each configuration seen in this search
+        stack, reached = [[root, root_key, 0, None, 0]], {root_key: 0}
+        while stack:
+            frame = stack[-1]
+            node, cost = frame[0], frame[2]
+            current = node.puzzle
+            if frame[3] is None:
+                estimate = cost + current.heuristic()
+                if estimate > bound:
+                    if exceeded is None or estimate < exceeded:
+                        exceeded = estimate
+                    stack.pop()
+                    continue
+                if stats.call("is_solved", current.is_solved):
+                    while node.parent:
+                        node.parent.children = [node]
+                        node = node.parent
+                    stats.solution(node)
+                    stats.finish()
+                    return node
+                if stats.call("fail_fast", current.fail_fast):
+                    stack.pop()
+                    continue
+                if budget is not None:
+                    budget.expand(node, len(stack) - 1)
+                frame[3] = stats.call("extensions", current.extensions)
+                stats.expanded(current, len(stack) - 1, frame[3])
+                stats.frontier(len(stack))
+            if frame[4] == len(frame[3]):
+                stack.pop()
+                continue
+            extension = frame[3][frame[4]]
+            frame[4] += 1
+            key = stats.call("hashing", extension.state_key)
+            step = cost + current.step_cost(extension)
+            if reached.get(key, step + 1) <= step:
+                stats.duplicate(extension, len(stack))
+                continue
+            reached[key] = step
+            stack.append([PuzzleNode(extension, [], node), key, step,
+                          None, 0])
+        if exceeded is None:
+            stats.finish()
+            return None
+        bound = exceeded
+
+
+def bidirectional_solve(puzzle, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution with the fewest moves, like breadth_first_solve, searching
+    forwards from puzzle and backwards from puzzle.goal_state() through
+    predecessors, a whole layer at a time from whichever side has the
+    smaller layer, until the two meet.
+
+    Puzzles without a goal_state are solved by breadth_first_solve.
+    Stats and budget are as for breadth_first_solve.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | SearchOutcome | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> from mn_puzzle import MNPuzzle
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> mn = MNPuzzle((("*", "4", "2"), ("3", "5", "1")), goal)
+    >>> both, one = SearchStats(), SearchStats()
+    >>> len(list(bidirectional_solve(mn, both).iter_path())) == \
+len(list(breadth_first_solve(mn, one).iter_path()))
+    True
+    >>> both.nodes_expanded < one.nodes_expanded
+    True
+    >>> ws = {"cast", "case", "vase", "cost"}
+    >>> [p._from_word for p in bidirectional_solve(WordLadderPuzzle(\
+"cost", "vase", ws)).iter_path()]
+    ['cost', 'cast', 'case', 'vase']
+    """
+    if stats is None:
+        stats = NullStats()
+    if puzzle.goal_state() is None:
+        return breadth_first_solve(puzzle, stats, budget)
+    return _run_budgeted(_bidirectional, puzzle, stats, budget)
+
+
+def _bidirectional(puzzle, stats, budget):
+    # The search of bidirectional_solve, raising BudgetExhausted when
+    # budget runs out
+    root = PuzzleNode(puzzle)
+    if stats.call("is_solved", puzzle.is_solved):
+        stats.solution(root)
+        stats.finish()
+        return root
+    goal = puzzle.goal_state()
+    root_key = stats.call("hashing", puzzle.state_key)
+    goal_key = stats.call("hashing", goal.state_key)
+    # forward[key] is (PuzzleNode, depth) and backward[key] is (puzzle,
+    # key of the next configuration towards goal, depth)
+    forward, backward = {root_key: (root, 0)}, {goal_key: (goal, None, 0)}
+    layers = [[root_key], [goal_key]]
+    while layers[0] and layers[1]:
+        side = 0 if len(layers[0]) <= len(layers[1]) else 1
+        mine, other = (forward, backward) if side == 0 else (backward,
+                                                             forward)
+        best, next_layer = None, []
+        for key in layers[side]:
+            if side == 0:
+                node, depth = forward[key]
+                current = node.puzzle
+                if stats.call("fail_fast", current.fail_fast):
+                    continue
+                if budget is not None:
+                    budget.expand(node, depth)
+                neighbours = stats.call("extensions", current.extensions)
+            else:
+                current, _, depth = backward[key]
+                if budget is not None:
+                    # charged to the root, so that a configuration near
+                    # the goal is never reported as the best partial path
+                    budget.expand(root, 0)
+                neighbours = stats.call("extensions", current.predecessors)
+            stats.expanded(current, depth, neighbours)
+            for neighbour in neighbours:
+                new_key = stats.call("hashing", neighbour.state_key)
+                if new_key in mine:
+                    stats.duplicate(neighbour, depth + 1)
+                    continue
+                if side == 0:
+                    mine[new_key] = (PuzzleNode(neighbour, [], node),
+                                     depth + 1)
+                else:
+                    mine[new_key] = (neighbour, key, depth + 1)
+                if new_key not in other:
+                    next_layer.append(new_key)
+                # every meeting in this layer is checked, as they may
+                # differ in length by a move
+                elif best is None or other[new_key][-1] < best[0]:
+                    best = (other[new_key][-1], new_key)
+        if best is not None:
+            node = _meet(forward, backward, best[1])
+            stats.solution(node)
+            stats.finish()
+            return node
+        layers[side] = next_layer
+        stats.frontier(len(layers[0]) + len(layers[1]))
+        stats.visited(mine)
+    stats.finish()
+    return None
+
+
+def _meet(forward, backward, key):
+    # Return the root of the path of bidirectional_solve through the
+    # configuration with key, reached by both of its searches
+    node, following = forward[key][0], backward[key][1]
+    while following is not None:
+        puzzle, following, _ = backward[following]
+        node = PuzzleNode(puzzle, [], node)
+    while node.parent:
+        node.parent.children = [node]
+        node = node.parent
+    return node
+
+
+def path_cost(node):
+    """
+    Return the total step_cost of the moves along the PuzzleNode chain
+    rooted at node.
+
+    @type node: PuzzleNode
+    @rtype: float
+    """
+    total = 0
+    while node.children:
+        total += node.puzzle.step_cost(node.children[0].puzzle)
+        node = node.children[0]
+    return total
+
+
+def _leaf_count(puzzle, stats):
+    # Return 1 if puzzle is solved, 0 if it fails fast,
+    # and None if it has to be extended
+    if stats.call("is_solved", puzzle.is_solved):
+        return 1
+    elif stats.call("fail_fast", puzzle.fail_fast):
+        return 0
+    return None
+
+
+def _shortest_layers(puzzle, stats):
+    # Breadth-first search from puzzle, one level at a time, stopping
+    # after the first level holding a solved configuration.  Return
+    # (puzzles, parents, goals): the configuration for each state key
+    # reached, every parent key on a shortest path to each key, and the
+    # keys of the solved configurations found (empty if there are none)
+    root_key = stats.call("hashing", puzzle.state_key)
+    puzzles, parents = {root_key: puzzle}, {root_key: []}
+    level, depth = [root_key], 0
+    while level:
+        stats.frontier(len(level))
+        goals = [key for key in level
+                 if stats.call("is_solved", puzzles[key].is_solved)]
+        if goals:
+            return puzzles, parents, goals
+        next_level, next_keys = [], set()
+        for key in level:
+            current = puzzles[key]
+            if stats.call("fail_fast", current.fail_fast):
+                continue
+            extensions = stats.call("extensions", current.extensions)
+            stats.expanded(current, depth, extensions)
+            for child in extensions:
+                child_key = stats.call("hashing", child.state_key)
+                if child_key not in parents:
+                    puzzles[child_key], parents[child_key] = child, [key]
+                    next_level.append(child_key)
+                    next_keys.add(child_key)
+                else:
+                    stats.duplicate(child, depth + 1)
+                    if child_key in next_keys and \
+                            key not in parents[child_key]:
+                        parents[child_key].append(key)
+        stats.visited(parents)
+        level, depth = next_level, depth + 1
+    return puzzles, parents, []
+
+
+def count_solutions(puzzle, limit=None, memoize=None, stats=None):
+    """
+    Return the number of solutions of puzzle, counting up to limit when
+    limit is not None.  A solved configuration ends a solution, as in
+    depth_first_solve.
+
+    When puzzle.acyclic is True, every path from puzzle to a solved
+    configuration is a solution.  The search keeps an explicit stack, so
+    only the current path is held in memory, and with memoize (the
+    default) the number of solutions below each configuration is
+    remembered by state key, so shared subtrees are only counted once.
+
+    Spaces with cycles have unboundedly many paths, so there only the
+    distinct shortest paths to a solved configuration are counted, with
+    a level-by-level breadth-first search.
+
+    What the search did is recorded in stats, if given.
+
+    @type puzzle: Puzzle
+    @type limit: int | None
+    @type memoize: bool | None
+    @type stats: SearchStats | None
+    @rtype: int
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cast", "case", "cost", "vase", "vast"}
+    >>> count_solutions(WordLadderPuzzle("cast", "vase", ws))
+    2
+    >>> count_solutions(WordLadderPuzzle("cast", "vase", ws), limit=1)
+    1
+    >>> grid = [[".", "*", "*", "*"], ["*", "*", "*", "*"], \
+    ["*", "*", "*", "*"]]
+    >>> count_solutions(GridPegSolitairePuzzle(grid, {"*", ".", "#"}))
+    852
+    >>> count_solutions(WordLadderPuzzle("cast", "vase", ws), memoize=True)
+    Traceback (most recent call last):
+    ...
+    ValueError: memoize needs an acyclic puzzle
+    """
+    if memoize is None:
+        memoize = puzzle.acyclic
+    elif memoize and not puzzle.acyclic:
+        raise ValueError("memoize needs an acyclic puzzle")
+    if stats is None:
+        stats = NullStats()
+    if not puzzle.acyclic:
+        found = _count_shortest(puzzle, limit, stats)
+        stats.finish()
+        return found
+    found = _leaf_count(puzzle, stats)
+    if found is not None:
+        stats.finish()
+        return found
+
+    found, memo = 0, {}
+    # each frame is [state key, iterator over extensions, count so far]
+    stack = [[stats.call("hashing", puzzle.state_key),
+              iter(_expand(puzzle, 0, stats)), 0]]
+    while stack:
+        frame = stack[-1]
+        child = next(frame[1], None)
+        if child is None:
+            stack.pop()
+            if memoize:
+                memo[frame[0]] = frame[2]
+                stats.visited(memo)
+            if stack:
+                stack[-1][2] += frame[2]
+            continue
+        key = stats.call("hashing", child.state_key)
+        count = memo.get(key) if memoize else None
+        if count is None:
+            count = _leaf_count(child, stats)
+            if count is None:
+                stack.append([key, iter(_expand(child, len(stack), stats)),
+                              0])
+                stats.frontier(len(stack))
+                continue
+            if memoize:
+                memo[key] = count
+        else:
+            stats.duplicate(child, len(stack))
+        frame[2] += count
+        found += count
+        if limit is not None and found >= limit:
+            found = limit
+            break
+    stats.solutions = found
+    stats.finish()
+    return found
+
+
+def _expand(puzzle, depth, stats):
+    # Return the extensions of puzzle, which is at depth, recording
+    # the expansion in stats
+    extensions = stats.call("extensions", puzzle.extensions)
+    stats.expanded(puzzle, depth, extensions)
+    return extensions
+
+
+def _count_shortest(puzzle, limit, stats):
+    # Return the number of shortest paths from puzzle to a solved
+    # configuration, at most limit when limit is not None
+    puzzles, parents, goals = _shortest_layers(puzzle, stats)
+    counts = {}
+
+    def paths_to(key):
+        # number of shortest paths from the root to key
+        stack = [key]
+        while stack:
+            top = stack[-1]
+            missing = [p for p in parents[top] if p not in counts]
+            if missing:
+                stack.extend(missing)
+            else:
+                stack.pop()
+                counts[top] = sum(counts[p] for p in parents[top]) or 1
+        return counts[key]
+
+    found = sum(paths_to(key) for key in goals)
+    stats.solutions = found if limit is None else min(found, limit)
+    return stats.solutions
+
+
+def iter_solutions(puzzle, stats=None):
+    """
+    Yield the solutions of puzzle, one at a time, each as the root of a
+    PuzzleNode chain like depth_first_solve returns.
+
+    When puzzle.acyclic is True, every path to a solved configuration is
+    yielded.  Only the current path is held in memory, and
+    configurations already shown to lead to no solution are remembered
+    by state key and not searched again.  In spaces with cycles, the
+    distinct shortest paths to a solved configuration are yielded.
+
+    What the search did is recorded in stats, if given.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @rtype: generator[PuzzleNode]
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cast", "case", "cost", "vase", "vast"}
+    >>> for sol in iter_solutions(WordLadderPuzzle("cast", "vase", ws)):
+    ...     print(" ".join(node.puzzle._from_word for node in \
+    _iter_chain(sol)))
+    cast vast vase
+    cast case vase
+    >>> grid = [["*", ".", "*", "*"]]
+    >>> for sol in iter_solutions(GridPegSolitairePuzzle(grid, \
+    {"*", ".", "#"})):
+    ...     print(" / ".join(str(node.puzzle) for node in _iter_chain(sol)))
+    * . * * / * * . . / . . * .
+    """
+    if stats is None:
+        stats = NullStats()
+    if not puzzle.acyclic:
+        for path in _iter_shortest(puzzle, stats):
+            solution = _chain(path)
+            stats.solution(solution)
+            yield solution
+        stats.finish()
+        return
+    leaf = _leaf_count(puzzle, stats)
+    if leaf is not None:
+        if leaf:
+            solution = _chain([puzzle])
+            stats.solution(solution)
+            yield solution
+        stats.finish()
+        return
+
+    dead = set()
+    # each frame is [state key, puzzle, iterator over extensions, found any]
+    stack = [[stats.call("hashing", puzzle.state_key), puzzle,
+              iter(_expand(puzzle, 0, stats)), False]]
+    while stack:
+        frame = stack[-1]
+        child = next(frame[2], None)
+        if child is None:
+            stack.pop()
+            if not frame[3]:
+                dead.add(frame[0])
+            elif stack:
+                stack[-1][3] = True
+            continue
+        key = stats.call("hashing", child.state_key)
+        if key in dead:
+            stats.duplicate(child, len(stack))
+            continue
+        leaf = _leaf_count(child, stats)
+        if leaf is None:
+            stack.append([key, child, iter(_expand(child, len(stack), stats)),
+                          False])
+            stats.frontier(len(stack))
+        elif leaf:
+            frame[3] = True
+            solution = _chain([f[1] for f in stack] + [child])
+            stats.solution(solution)
+            yield solution
+        else:
+            dead.add(key)
+            stats.visited(dead)
+    stats.finish()
+
+
+def _iter_shortest(puzzle, stats, layers=None):
+    # Yield each shortest path from puzzle to a solved configuration as
+    # a list of puzzles, walking the parent links back from each goal,
+    # using layers from _shortest_layers if they are given
+    if layers is None:
+        layers = _shortest_layers(puzzle, stats)
+    puzzles, parents, goals = layers
+    for goal in goals:
+        # each frame is [key, iterator over its parents]
+        stack = [[goal, iter(parents[goal])]]
+        while stack:
+            key, parent_iter = stack[-1]
+            if not parents[key]:
+                yield [puzzles[k] for k, _ in reversed(stack)]
+                stack.pop()
+                continue
+            parent = next(parent_iter, None)
+            if parent is None:
+                stack.pop()
+            else:
+                stack.append([parent, iter(parents[parent])])
+
+
+def shortest_solutions(puzzle, stats=None):
+    """
+    Yield every shortest solution of puzzle, one at a time, each as the
+    root of a PuzzleNode chain like breadth_first_solve returns.
+
+    One level-by-level breadth-first search records every parent on a
+    shortest path to each configuration, and is then cut down to the
+    configurations on a shortest path to a solution.  The solutions are
+    enumerated from that graph as they are asked for, so the ones after
+    the first need no further search.
+
+    What the search did is recorded in stats, if given.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @rtype: generator[PuzzleNode]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cast", "case", "cost", "vase", "vast"}
+    >>> for sol in shortest_solutions(WordLadderPuzzle("cast", "vase", ws)):
+    ...     print(" ".join(node.puzzle._from_word for node in \
+    _iter_chain(sol)))
+    cast vast vase
+    cast case vase
+    """
+    if stats is None:
+        stats = NullStats()
+    puzzles, parents, goals = _shortest_layers(puzzle, stats)
+    # keep only what lies on a shortest path to a goal
+    keep, stack = set(goals), list(goals)
+    while stack:
+        for parent in parents[stack.pop()]:
+            if parent not in keep:
+                keep.add(parent)
+                stack.append(parent)
+    puzzles = {key: puzzles[key] for key in keep}
+    parents = {key: parents[key] for key in keep}
+    for path in _iter_shortest(puzzle, stats, (puzzles, parents, goals)):
+        solution = _chain(path)
+        stats.solution(solution)
+        yield solution
+    stats.finish()
+
+
+def k_shortest_solutions(puzzle, k, stats=None):
+    """
+    Return a list of the k least costly solutions of puzzle, or all of
+    them if there are fewer, in order of path_cost, each as the root of
+    a PuzzleNode chain.  No solution visits a configuration twice.
+
+    This is Yen's algorithm: each solution after the first is the
+    cheapest deviation from one found earlier, searched for with A*
+    from the configuration where it deviates.
+
+    What the searches did is recorded in stats, if given.
+
+    @type puzzle: Puzzle
+    @type k: int
+    @type stats: SearchStats | None
+    @rtype: list[PuzzleNode]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cast", "case", "cost", "vase", "vast", "cose"}
+    >>> for sol in k_shortest_solutions(WordLadderPuzzle("cast", "vase", \
+ws), 3):
+    ...     print(" ".join(node.puzzle._from_word for node in \
+_iter_chain(sol)))
+    cast vast vase
+    cast case vase
+    cast cost cose case vase
+    """
+    if stats is None:
+        stats = NullStats()
+    first = _cheapest_path(puzzle, stats, set(), set())
+    found = [] if first is None else [first]
+    # candidate solutions, as (cost, tie breaker, puzzles, keys), and
+    # the keys of every solution found or queued
+    candidates, order = [], count()
+    queued = {first[2]} if first else set()
+    while found and len(found) < k:
+        _, path, keys = found[-1]
+        cost = 0
+        for i in range(len(path) - 1):
+            # the found solutions that share the first i moves of path
+            # may not take their next move again from path[i]
+            banned_moves = {other[2][i + 1] for other in found
+                            if other[2][:i + 1] == keys[:i + 1]}
+            spur = _cheapest_path(path[i], stats, set(keys[:i]),
+                                  banned_moves)
+            if spur is not None:
+                candidate = keys[:i] + spur[2]
+                if candidate not in queued:
+                    queued.add(candidate)
+                    heappush(candidates, (cost + spur[0], next(order),
+                                          path[:i] + spur[1], candidate))
+            cost += path[i].step_cost(path[i + 1])
+        if not candidates:
+            break
+        cost, _, path, keys = heappop(candidates)
+        found.append((cost, path, keys))
+    solutions = [_chain(path) for _, path, _ in found]
+    for solution in solutions:
+        stats.solution(solution)
+    stats.finish()
+    return solutions
+
+
+def _cheapest_path(puzzle, stats, banned, banned_moves):
+    # Return (cost, puzzles, tuple of keys) for a least costly path from
+    # puzzle to a solved configuration found by A*, avoiding the state
+    # keys in banned and first moves to the keys in banned_moves, or None
+    root_key = stats.call("hashing", puzzle.state_key)
+    previous, costs = {root_key: (None, puzzle)}, {root_key: 0}
+    closed, order = set(), count()
+    # entries are (estimated total cost, tie breaker, cost, number of
+    # moves, key)
+    heap = [(puzzle.heuristic(), next(order), 0, 0, root_key)]
+    while heap:
+        _, _, cost, depth, key = heappop(heap)
+        if key in closed or cost > costs[key]:
+            continue
+        closed.add(key)
+        current = previous[key][1]
+        if stats.call("is_solved", current.is_solved):
+            keys = [key]
+            while previous[keys[-1]][0] is not None:
+                keys.append(previous[keys[-1]][0])
+            keys.reverse()
+            return cost, [previous[k][1] for k in keys], tuple(keys)
+        if stats.call("fail_fast", current.fail_fast):
+            continue
+        extensions = stats.call("extensions", current.extensions)
+        stats.expanded(current, depth, extensions)
+        for extension in extensions:
+            new_key = stats.call("hashing", extension.state_key)
+            new_cost = cost + current.step_cost(extension)
+            if (new_key in banned or new_key in closed or
+                    (key == root_key and new_key in banned_moves) or
+                    new_cost >= costs.get(new_key, new_cost + 1)):
+                stats.duplicate(extension, depth + 1)
+                continue
+            costs[new_key], previous[new_key] = new_cost, (key, extension)
+            heappush(heap, (new_cost + extension.heuristic(), next(order),
+                            new_cost, depth + 1, new_key))
+        stats.frontier(len(heap))
+    return None
+
+
+def _chain(puzzles):
+    # Return the root of a chain of PuzzleNodes holding puzzles in order,
+    # each node having the next as its only child
+    root = node = PuzzleNode(puzzles[0])
+    for puzzle in puzzles[1:]:
+        child = PuzzleNode(puzzle, [], node)
+        node.children.append(child)
+        node = child
+    return root
+
+
+def _iter_chain(node):
+    # Yield node and its first descendants, following children[0]
+    while node is not None:
+        yield node
+        node = node.children[0] if node.children else None
+
+
 # Class PuzzleNode helps build trees of PuzzleNodes that have
 # an arbitrary number of children, and a parent.
 
@@ -210,19 +1350,98 @@ class PuzzleNode:
         True
         >>> pn1.__eq__(pn3)
         False
+        >>> pn1.children = [PuzzleNode(p) for p in pn1.puzzle.extensions()]
+        >>> pn2.children = [PuzzleNode(p) for p in pn2.puzzle.extensions()]
+        >>> pn1 == pn2
+        True
+        >>> pn2.children.reverse()
+        >>> pn1 == pn2
+        True
+        >>> pn2.children.pop().children.append(pn3)
+        >>> pn1 == pn2
+        False
         """
+        # pairs of nodes still to compare; children are paired up by the
+        # state keys of their puzzles, so the trees are compared in about
+        # linear time, without recursion unless siblings share a key
+        pairs = [(self, other)]
+        while pairs:
+            node, other = pairs.pop()
+            if (type(node) != type(other) or node.puzzle != other.puzzle or
+                    len(node.children) != len(other.children)):
+                return False
+            unmatched = {}
+            for child in other.children:
+                unmatched.setdefault(child.puzzle.state_key(),
+                                     []).append(child)
+            for child in node.children:
+                candidates = unmatched.get(child.puzzle.state_key())
+                if not candidates:
+                    return False
+                if len(candidates) == 1:
+                    pairs.append((child, candidates.pop()))
+                    continue
+                match = next((c for c in candidates if child == c), None)
+                if match is None:
+                    return False
+                candidates.remove(match)
+        return True
 
-        return (type(self) == type(other) and
-                self.puzzle == other.puzzle and
-                all([x in self.children for x in other.children]) and
-                all([x in other.children for x in self.children]))
+    def iter_path(self):
+        """
+        Yield the puzzles from PuzzleNode self down to the end of its
+        path, following the first child of each node, as a solution
+        path is stored.  Nothing is copied or rendered.
 
-    def __str__(self):
+        @type self: PuzzleNode
+        @rtype: Iterator[Puzzle]
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"cast", "case", "vase"}
+        >>> sol = breadth_first_solve(WordLadderPuzzle("cast", "vase", ws))
+        >>> [p._from_word for p in sol.iter_path()]
+        ['cast', 'case', 'vase']
         """
-        Return a human-readable string representing PuzzleNode self.
+        node = self
+        while node is not None:
+            yield node.puzzle
+            node = node.children[0] if node.children else None
 
-        # doctest not feasible.
+    def __str__(self):
         """
+        Return a human-readable string representing PuzzleNode self:
+        its puzzle, a blank line and then each of its subtrees in turn.
 
-        return "{}\n\n{}".format(self.puzzle,
-                                 "\n".join([str(x) for x in self.children]))
+        The tree is walked with an explicit stack, so this works on
+        paths of any length.
+
+        @type self: PuzzleNode
+        @rtype: str
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> node = PuzzleNode(WordLadderPuzzle("on", "no", {"oo", "nn"}))
+        >>> node.children = [PuzzleNode(p) for p in node.puzzle.extensions()]
+        >>> print(node)
+        on --> no
+        <BLANKLINE>
+        nn --> no
+        <BLANKLINE>
+        <BLANKLINE>
+        oo --> no
+        <BLANKLINE>
+        <BLANKLINE>
+        """
+        parts, stack = [], [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            parts.append(str(item.puzzle))
+            parts.append("\n\n")
+            # each child but the last is followed by a newline
+            for i in range(len(item.children) - 1, -1, -1):
+                if i < len(item.children) - 1:
+                    stack.append("\n")
+                stack.append(item.children[i])
+        return "".join(parts)
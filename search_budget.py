@@ -0,0 +1,229 @@
+"""
+Time, node and memory budgets for the solvers in puzzle_tools, and the
+outcome a budgeted search reports.
+"""
+import os
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# how a budgeted search ended
+SOLVED, UNSOLVABLE, EXHAUSTED = "solved", "unsolvable", "exhausted"
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised inside a search when its budget runs out; the solvers catch
+    it and report a SearchOutcome instead.
+    """
+
+
+def memory_in_use():
+    """
+    Return the resident memory of this process in bytes: the current
+    resident set size where /proc is available, else the peak, else 0.
+
+    @rtype: int
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    return peak_memory()
+
+
+def peak_memory():
+    """
+    Return the peak resident memory of this process in bytes, or 0
+    where it cannot be measured.
+
+    @rtype: int
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+class Budget:
+    """
+    Limits on a search: deadline seconds of wall time, max_nodes
+    configurations expanded and max_memory bytes of resident memory,
+    each None for no limit.  Memory is only measured every check_every
+    expansions, since that takes a system call.
+
+    While the search runs, the budget also keeps the best configuration
+    expanded so far, rated by its heuristic and then by its depth, so a
+    partial path can be reported if the budget runs out.
+    """
+
+    def __init__(self, deadline=None, max_nodes=None, max_memory=None,
+                 check_every=256):
+        """
+        Create a new Budget self.
+
+        @type self: Budget
+        @type deadline: float | None
+        @type max_nodes: int | None
+        @type max_memory: int | None
+        @type check_every: int
+        @rtype: None
+        """
+        self.deadline, self.max_nodes, self.max_memory = (
+            deadline, max_nodes, max_memory)
+        self.check_every = check_every
+        self.start()
+
+    def start(self):
+        """
+        Start the clock and node count of self over, forgetting the best
+        configuration seen.  Every solver calls this when it begins.
+
+        @type self: Budget
+        @rtype: None
+        """
+        self.nodes, self.best, self.reason = 0, None, None
+        self._started, self._rating = perf_counter(), None
+
+    def elapsed(self):
+        """
+        Return the seconds since self was started.
+
+        @type self: Budget
+        @rtype: float
+        """
+        return perf_counter() - self._started
+
+    def expand(self, node, depth):
+        """
+        Record that PuzzleNode node, at depth, is about to be expanded,
+        raising BudgetExhausted if that would go over a limit of self.
+
+        @type self: Budget
+        @type node: PuzzleNode
+        @type depth: int
+        @rtype: None
+
+        >>> from puzzle_tools import PuzzleNode
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> budget = Budget(max_nodes=1)
+        >>> budget.expand(PuzzleNode(WordLadderPuzzle("ab", "cd", set())), 0)
+        >>> try:
+        ...     budget.expand(PuzzleNode(WordLadderPuzzle("cb", "cd", set())), 1)
+        ... except BudgetExhausted as e:
+        ...     print(e)
+        max_nodes
+        >>> budget.best.puzzle._from_word
+        'cb'
+        """
+        rating = (node.puzzle.heuristic(), -depth)
+        if self._rating is None or rating < self._rating:
+            self.best, self._rating = node, rating
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            self._exhaust("max_nodes")
+        self.nodes += 1
+        if (self.deadline is not None and
+                perf_counter() - self._started > self.deadline):
+            self._exhaust("deadline")
+        if (self.max_memory is not None and
+                self.nodes % self.check_every == 0 and
+                memory_in_use() > self.max_memory):
+            self._exhaust("max_memory")
+
+    def _exhaust(self, reason):
+        # Stop the search because of reason
+        self.reason = reason
+        raise BudgetExhausted(reason)
+
+
+class SearchOutcome:
+    """
+    How a budgeted search ended: status is SOLVED, UNSOLVABLE (the
+    search finished without a solution) or EXHAUSTED, in which case
+    reason names the limit that ran out.
+
+    node is the root of the path found, like the solvers return: to a
+    solution when solved, to the best configuration reached when the
+    budget was exhausted, and None when unsolvable.
+    """
+
+    def __init__(self, status, node=None, reason=None, nodes=0, elapsed=0.0):
+        """
+        Create a new SearchOutcome self.
+
+        @type self: SearchOutcome
+        @type status: str
+        @type node: PuzzleNode | None
+        @type reason: str | None
+        @type nodes: int
+        @type elapsed: float
+        @rtype: None
+        """
+        self.status, self.node, self.reason = status, node, reason
+        self.nodes, self.elapsed = nodes, elapsed
+
+    @property
+    def solved(self):
+        """
+        Return whether the search found a solution.
+
+        @type self: SearchOutcome
+        @rtype: bool
+        """
+        return self.status == SOLVED
+
+    def __repr__(self):
+        """
+        Return a representation of SearchOutcome self.
+
+        @type self: SearchOutcome
+        @rtype: str
+
+        >>> SearchOutcome(EXHAUSTED, reason="deadline", nodes=12)
+        SearchOutcome(exhausted: deadline, 12 nodes)
+        """
+        return "SearchOutcome({}{}, {} nodes)".format(
+            self.status, "" if self.reason is None else ": " + self.reason,
+            self.nodes)
+
+
+def outcome(budget, node):
+    """
+    Return the SearchOutcome of a search under budget that ended with
+    node: a solution, or None when the search space was exhausted.
+
+    @type budget: Budget
+    @type node: PuzzleNode | None
+    @rtype: SearchOutcome
+    """
+    return SearchOutcome(SOLVED if node is not None else UNSOLVABLE, node,
+                         nodes=budget.nodes, elapsed=budget.elapsed())
+
+
+def exhausted(budget):
+    """
+    Return the SearchOutcome of a search whose budget ran out, with the
+    path to the best configuration it reached.
+
+    @type budget: Budget
+    @rtype: SearchOutcome
+    """
+    node = budget.best
+    if node is not None:
+        # keep only the path from the root to the best node
+        node.children = []
+        while node.parent is not None:
+            node.parent.children = [node]
+            node = node.parent
+    return SearchOutcome(EXHAUSTED, node, budget.reason, budget.nodes,
+                         budget.elapsed())
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,370 @@
+"""
+Breadth-first and depth-first searches that write their frontier and
+visited configurations to a checkpoint file at regular intervals, so
+that a search interrupted by a pre-emption can be resumed where it
+stopped with resume_solve.
+
+Configurations are stored with Puzzle.encode_state, so this works for
+any Puzzle subclass implementing encode_state and decode_state.
+
+A checkpoint file is MAGIC, a version byte and a strategy byte,
+followed by a zlib-compressed body of unsigned LEB128 varints and byte
+strings: the pickled root puzzle, the number of configurations expanded,
+every configuration reached with the index of the one it was reached
+from, and the frontier as indexes (with, for depth-first search, the
+number of extensions already tried at each level of the stack).
+"""
+from collections import deque
+import os
+import pickle
+from time import perf_counter
+import zlib
+from puzzle_tools import PuzzleNode, _chain, _iter_chain
+from search_budget import (BudgetExhausted, SearchOutcome, EXHAUSTED,
+                           outcome)
+from search_stats import NullStats
+
+MAGIC = b"PZCK"
+VERSION = 1
+# strategy names and their codes in the header
+STRATEGIES = ("bfs", "dfs")
+
+
+def _write_varint(out, value):
+    # Append unsigned int value to bytearray out, 7 bits per byte
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    # Return (value, position after it) for the varint at pos in data
+    value, shift = 0, 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _write_bytes(out, data):
+    # Append data to out, prefixed by its length
+    _write_varint(out, len(data))
+    out += data
+
+
+def _read_bytes(data, pos):
+    # Return (bytes, position after them) for the byte string at pos
+    size, pos = _read_varint(data, pos)
+    return bytes(data[pos:pos + size]), pos + size
+
+
+class SearchCheckpoint:
+    """
+    The state of a resumable search from puzzle: every configuration
+    reached, as encoded states, with the index of its parent, and the
+    frontier, a queue of indexes for "bfs" or, for "dfs", a stack of
+    [index, extensions tried, extensions] frames.
+    """
+
+    def __init__(self, puzzle, strategy="bfs"):
+        """
+        Create a new SearchCheckpoint self for a search from puzzle
+        that has not started yet.
+
+        @type self: SearchCheckpoint
+        @type puzzle: Puzzle
+        @type strategy: str
+        @rtype: None
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError("unknown strategy: {}".format(strategy))
+        self.root, self.strategy = puzzle, strategy
+        self.states, self.parents, self.depths = [], [], []
+        self.index = {}
+        self.expanded = 0
+        self.frontier = deque() if strategy == "bfs" else []
+        if puzzle is not None:
+            self._add(puzzle.encode_state(), -1)
+            self.frontier.append(0 if strategy == "bfs" else [0, 0, None])
+
+    def _add(self, state, parent):
+        # Record encoded state, reached from index parent, and return
+        # its index
+        i = len(self.states)
+        self.states.append(state)
+        self.parents.append(parent)
+        self.depths.append(self.depths[parent] + 1 if parent >= 0 else 0)
+        self.index[state] = i
+        return i
+
+    def puzzle(self, i):
+        """
+        Return the configuration with index i.
+
+        @type self: SearchCheckpoint
+        @type i: int
+        @rtype: Puzzle
+        """
+        return self.root.decode_state(self.states[i])
+
+    def path(self, i):
+        """
+        Return the root of a PuzzleNode chain from the root puzzle to
+        the configuration with index i.
+
+        @type self: SearchCheckpoint
+        @type i: int
+        @rtype: PuzzleNode
+        """
+        indexes = []
+        while i >= 0:
+            indexes.append(i)
+            i = self.parents[i]
+        return _chain([self.puzzle(k) for k in reversed(indexes)])
+
+    def save(self, path):
+        """
+        Write self to the checkpoint file at path, replacing it only
+        once the new checkpoint is complete.
+
+        @type self: SearchCheckpoint
+        @type path: str
+        @rtype: None
+        """
+        body = bytearray()
+        _write_bytes(body, pickle.dumps(self.root, pickle.HIGHEST_PROTOCOL))
+        _write_varint(body, self.expanded)
+        _write_varint(body, len(self.states))
+        for state, parent in zip(self.states, self.parents):
+            _write_bytes(body, state)
+            _write_varint(body, parent + 1)
+        _write_varint(body, len(self.frontier))
+        for entry in self.frontier:
+            if self.strategy == "bfs":
+                _write_varint(body, entry)
+            else:
+                _write_varint(body, entry[0])
+                _write_varint(body, entry[1])
+        temp = path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(MAGIC + bytes([VERSION, STRATEGIES.index(self.strategy)]))
+            f.write(zlib.compress(bytes(body)))
+        os.replace(temp, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Return the SearchCheckpoint saved at path.
+
+        @type path: str
+        @rtype: SearchCheckpoint
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a search checkpoint".format(path))
+        version, strategy = data[len(MAGIC)], data[len(MAGIC) + 1]
+        if version != VERSION:
+            raise ValueError("unsupported checkpoint version {}".format(
+                version))
+        body = zlib.decompress(data[len(MAGIC) + 2:])
+        result = cls(None, STRATEGIES[strategy])
+        root, pos = _read_bytes(body, 0)
+        result.root = pickle.loads(root)
+        result.expanded, pos = _read_varint(body, pos)
+        count, pos = _read_varint(body, pos)
+        for _ in range(count):
+            state, pos = _read_bytes(body, pos)
+            parent, pos = _read_varint(body, pos)
+            result._add(state, parent - 1)
+        count, pos = _read_varint(body, pos)
+        for _ in range(count):
+            i, pos = _read_varint(body, pos)
+            if result.strategy == "bfs":
+                result.frontier.append(i)
+            else:
+                tried, pos = _read_varint(body, pos)
+                result.frontier.append([i, tried, None])
+        return result
+
+    def run(self, path, interval, stats, budget):
+        """
+        Continue the search of self, saving it to path whenever interval
+        seconds have passed since the last save.  Return the index of a
+        solved configuration, or None if there is none.  Raise
+        BudgetExhausted, after saving, when budget runs out.
+
+        @type self: SearchCheckpoint
+        @type path: str
+        @type interval: float
+        @type stats: SearchStats | NullStats
+        @type budget: Budget | None
+        @rtype: int | None
+        """
+        step = self._bfs_step if self.strategy == "bfs" else self._dfs_step
+        saved_at = perf_counter()
+        try:
+            while self.frontier:
+                found = step(stats, budget)
+                if found is not None:
+                    return found
+                if perf_counter() - saved_at >= interval:
+                    self.save(path)
+                    saved_at = perf_counter()
+        except BudgetExhausted:
+            self.save(path)
+            raise
+        return None
+
+    def _bfs_step(self, stats, budget):
+        # Expand the configuration at the head of the queue, removing it
+        # only once all its extensions are queued, so that a checkpoint
+        # never loses it.  Return the index of a solved extension, if any
+        i = self.frontier[0]
+        current, depth = self.puzzle(i), self.depths[i]
+        if budget is not None:
+            budget.expand(PuzzleNode(current), depth)
+        extensions = stats.call("extensions", current.extensions)
+        stats.expanded(current, depth, extensions)
+        self.expanded += 1
+        for extension in extensions:
+            state = stats.call("hashing", extension.encode_state)
+            if state in self.index:
+                stats.duplicate(extension, depth + 1)
+                continue
+            j = self._add(state, i)
+            if stats.call("is_solved", extension.is_solved):
+                return j
+            if not stats.call("fail_fast", extension.fail_fast):
+                self.frontier.append(j)
+        self.frontier.popleft()
+        stats.visited(self.index)
+        stats.frontier(len(self.frontier))
+        return None
+
+    def _dfs_step(self, stats, budget):
+        # Try the next extension of the configuration on top of the
+        # stack.  Return its index if it is solved
+        frame = self.frontier[-1]
+        i, depth = frame[0], self.depths[frame[0]]
+        if frame[2] is None:
+            current = self.puzzle(i)
+            if budget is not None:
+                budget.expand(PuzzleNode(current), depth)
+            frame[2] = stats.call("extensions", current.extensions)
+            stats.expanded(current, depth, frame[2])
+            self.expanded += 1
+        if frame[1] == len(frame[2]):
+            self.frontier.pop()
+            return None
+        extension = frame[2][frame[1]]
+        frame[1] += 1
+        state = stats.call("hashing", extension.encode_state)
+        if state in self.index:
+            stats.duplicate(extension, depth + 1)
+            return None
+        j = self._add(state, i)
+        stats.visited(self.index)
+        if stats.call("is_solved", extension.is_solved):
+            return j
+        if not stats.call("fail_fast", extension.fail_fast):
+            self.frontier.append([j, 0, None])
+            stats.frontier(len(self.frontier))
+        return None
+
+
+def checkpointed_solve(puzzle, path, strategy="bfs", interval=60.0,
+                       stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution, like breadth_first_solve ("bfs") or depth_first_solve
+    ("dfs"), or None if there is none, saving the search to the
+    checkpoint file path every interval seconds.
+
+    Given a Budget, the search is saved when it runs out and a
+    SearchOutcome is returned; resume_solve(path) carries on from there.
+
+    @type puzzle: Puzzle
+    @type path: str
+    @type strategy: str
+    @type interval: float
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | SearchOutcome | None
+
+    >>> import os, tempfile
+    >>> from mn_puzzle import MNPuzzle
+    >>> from search_budget import Budget
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> mn = MNPuzzle((("*", "4", "2"), ("3", "5", "1")), goal)
+    >>> path = os.path.join(tempfile.mkdtemp(), "mn.ckpt")
+    >>> checkpointed_solve(mn, path, budget=Budget(max_nodes=50))
+    SearchOutcome(exhausted: max_nodes, 50 nodes)
+    >>> resumed = resume_solve(path)
+    >>> len(list(_iter_chain(resumed)))
+    16
+    >>> os.path.exists(path)
+    False
+    """
+    if stats is None:
+        stats = NullStats()
+    if budget is not None:
+        budget.start()
+    if stats.call("is_solved", puzzle.is_solved):
+        node = PuzzleNode(puzzle)
+        stats.solution(node)
+        stats.finish()
+        return node if budget is None else outcome(budget, node)
+    return _finish(SearchCheckpoint(puzzle, strategy), path, interval,
+                   stats, budget)
+
+
+def resume_solve(checkpoint, interval=60.0, stats=None, budget=None):
+    """
+    Continue the search saved in the checkpoint file at path checkpoint,
+    returning what checkpointed_solve would have.  The search keeps
+    saving itself to the same file.
+
+    @type checkpoint: str
+    @type interval: float
+    @type stats: SearchStats | None
+    @type budget: Budget | None
+    @rtype: PuzzleNode | SearchOutcome | None
+    """
+    if stats is None:
+        stats = NullStats()
+    if budget is not None:
+        budget.start()
+    return _finish(SearchCheckpoint.load(checkpoint), checkpoint, interval,
+                   stats, budget)
+
+
+def _finish(search, path, interval, stats, budget):
+    # Run search to the end or until budget runs out, and return the
+    # result.  A finished search has nothing to resume, so its
+    # checkpoint file is removed
+    try:
+        found = search.run(path, interval, stats, budget)
+    except BudgetExhausted:
+        stats.finish()
+        best = budget.best
+        if best is not None:
+            best = search.path(search.index[best.puzzle.encode_state()])
+        return SearchOutcome(EXHAUSTED, best, budget.reason, budget.nodes,
+                             budget.elapsed())
+    if os.path.exists(path):
+        os.remove(path)
+    node = None if found is None else search.path(found)
+    if node is not None:
+        stats.solution(node)
+    stats.finish()
+    return node if budget is None else outcome(budget, node)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,275 @@
+"""
+Counters, timings and callbacks for the solvers in puzzle_tools.
+"""
+import sys
+from time import perf_counter
+
+# the puzzle methods whose time is tracked separately; "hashing" is
+# building state keys
+PHASES = ("extensions", "is_solved", "fail_fast", "hashing")
+
+
+class NullStats:
+    """
+    Statistics that record nothing, used when a solver is given none.
+    """
+
+    def call(self, phase, method):
+        """
+        Return the result of calling method.
+
+        @type self: NullStats
+        @type phase: str
+        @type method: callable
+        @rtype: Any
+        """
+        return method()
+
+    def expanded(self, puzzle, depth, children):
+        pass
+
+    def duplicate(self, puzzle, depth):
+        pass
+
+    def frontier(self, size):
+        pass
+
+    def visited(self, seen):
+        pass
+
+    def solution(self, node):
+        pass
+
+    def bound(self, cost, lower_bound):
+        pass
+
+    def finish(self):
+        pass
+
+
+class SearchStats(NullStats):
+    """
+    What a search did: nodes generated and expanded, duplicates hit,
+    the largest frontier (queue or stack) and visited set, the nodes
+    generated and expanded at each depth, and the time and number of
+    calls spent in each of PHASES.
+
+    Callbacks passed as on_expand(puzzle, depth, children),
+    on_solution(node) and on_finish(stats) are called as the search
+    goes, for exporting to other tools.
+    """
+
+    def __init__(self, on_expand=None, on_solution=None, on_finish=None):
+        """
+        Create a new, empty SearchStats self with the given callbacks.
+
+        @type self: SearchStats
+        @type on_expand: callable | None
+        @type on_solution: callable | None
+        @type on_finish: callable | None
+        @rtype: None
+        """
+        self.on_expand, self.on_solution, self.on_finish = (
+            on_expand, on_solution, on_finish)
+        self.nodes_generated, self.nodes_expanded, self.duplicates = 0, 0, 0
+        self.peak_frontier, self.peak_visited = 0, 0
+        self.peak_visited_bytes = 0
+        self.generated_by_depth, self.expanded_by_depth = {}, {}
+        self.times = {phase: 0.0 for phase in PHASES}
+        self.calls = {phase: 0 for phase in PHASES}
+        self.solutions = 0
+        self.solution_cost, self.lower_bound = None, None
+        self._key_bytes, self._estimated_at = None, 0
+
+    def call(self, phase, method):
+        """
+        Return the result of calling method, adding the time it took
+        to phase.
+
+        @type self: SearchStats
+        @type phase: str
+        @type method: callable
+        @rtype: Any
+
+        >>> stats = SearchStats()
+        >>> stats.call("is_solved", lambda: True)
+        True
+        >>> stats.calls["is_solved"]
+        1
+        """
+        start = perf_counter()
+        result = method()
+        self.times[phase] += perf_counter() - start
+        self.calls[phase] += 1
+        return result
+
+    def expanded(self, puzzle, depth, children):
+        """
+        Record that puzzle, at depth, was expanded into children.
+
+        @type self: SearchStats
+        @type puzzle: Puzzle
+        @type depth: int
+        @type children: list[Puzzle]
+        @rtype: None
+        """
+        self.nodes_expanded += 1
+        self.nodes_generated += len(children)
+        self.expanded_by_depth[depth] = (
+            self.expanded_by_depth.get(depth, 0) + 1)
+        self.generated_by_depth[depth + 1] = (
+            self.generated_by_depth.get(depth + 1, 0) + len(children))
+        if self.on_expand is not None:
+            self.on_expand(puzzle, depth, children)
+
+    def duplicate(self, puzzle, depth):
+        """
+        Record that puzzle, generated at depth, had already been seen.
+
+        @type self: SearchStats
+        @type puzzle: Puzzle
+        @type depth: int
+        @rtype: None
+        """
+        self.duplicates += 1
+
+    def frontier(self, size):
+        """
+        Record that the frontier (queue or stack) holds size nodes.
+
+        @type self: SearchStats
+        @type size: int
+        @rtype: None
+        """
+        if size > self.peak_frontier:
+            self.peak_frontier = size
+
+    def visited(self, seen):
+        """
+        Record the size of the visited set seen.  Its memory, the set
+        itself plus its keys at the size of the first key measured, is
+        estimated whenever the set has doubled since the last estimate.
+
+        @type self: SearchStats
+        @type seen: set | dict
+        @rtype: None
+        """
+        size = len(seen)
+        if size > self.peak_visited:
+            self.peak_visited = size
+            if size >= 2 * self._estimated_at:
+                if self._key_bytes is None:
+                    self._key_bytes = _deep_size(next(iter(seen)))
+                self.peak_visited_bytes = (sys.getsizeof(seen) +
+                                           size * self._key_bytes)
+                self._estimated_at = size
+
+    def solution(self, node):
+        """
+        Record that node solves the puzzle.
+
+        @type self: SearchStats
+        @type node: PuzzleNode
+        @rtype: None
+        """
+        self.solutions += 1
+        if self.on_solution is not None:
+            self.on_solution(node)
+
+    def bound(self, cost, lower_bound):
+        """
+        Record that the solution found costs cost, and that no solution
+        costs less than lower_bound.
+
+        @type self: SearchStats
+        @type cost: int | float
+        @type lower_bound: int | float
+        @rtype: None
+        """
+        self.solution_cost, self.lower_bound = cost, lower_bound
+
+    def suboptimality(self):
+        """
+        Return how many times the cost of a least costly solution the
+        solution found may cost at most, its cost over the lower bound
+        recorded by bound, or None when there is no bound.
+
+        @type self: SearchStats
+        @rtype: float | None
+
+        >>> stats = SearchStats()
+        >>> stats.suboptimality() is None
+        True
+        >>> stats.bound(12, 10)
+        >>> stats.suboptimality()
+        1.2
+        """
+        if self.solution_cost is None:
+            return None
+        if self.solution_cost == self.lower_bound:
+            return 1.0
+        if not self.lower_bound:
+            return None
+        return self.solution_cost / self.lower_bound
+
+    def finish(self):
+        """
+        Record that the search is over.
+
+        @type self: SearchStats
+        @rtype: None
+        """
+        if self.on_finish is not None:
+            self.on_finish(self)
+
+    def branching_factors(self):
+        """
+        Return the effective branching factor at each depth: the nodes
+        generated from that depth per node expanded there.
+
+        @type self: SearchStats
+        @rtype: dict[int, float]
+
+        >>> stats = SearchStats()
+        >>> stats.expanded(None, 0, [1, 2, 3])
+        >>> stats.expanded(None, 1, [4])
+        >>> stats.expanded(None, 1, [])
+        >>> stats.branching_factors()
+        {0: 3.0, 1: 0.5}
+        """
+        return {depth: self.generated_by_depth.get(depth + 1, 0) / count
+                for depth, count in sorted(self.expanded_by_depth.items())}
+
+    def as_dict(self):
+        """
+        Return the statistics of self as a dict of plain values, ready
+        to be exported.
+
+        @type self: SearchStats
+        @rtype: dict
+        """
+        return {"nodes_generated": self.nodes_generated,
+                "nodes_expanded": self.nodes_expanded,
+                "duplicates": self.duplicates,
+                "peak_frontier": self.peak_frontier,
+                "peak_visited": self.peak_visited,
+                "peak_visited_bytes": self.peak_visited_bytes,
+                "solutions": self.solutions,
+                "solution_cost": self.solution_cost,
+                "lower_bound": self.lower_bound,
+                "suboptimality": self.suboptimality(),
+                "branching_factors": self.branching_factors(),
+                "times": dict(self.times),
+                "calls": dict(self.calls)}
+
+
+def _deep_size(key):
+    # Return the size in bytes of key and, for tuples, its items
+    if isinstance(key, tuple):
+        return sys.getsizeof(key) + sum(_deep_size(k) for k in key)
+    return sys.getsizeof(key)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,319 @@
+"""
+A cache of solutions in front of the solvers in puzzle_tools, shared
+across requests and optionally kept on disk in sqlite.
+
+Entries are keyed by the puzzle type and Puzzle.context_key(), the
+solver strategy and the encoded state of a configuration.  A solution
+path is stored as one entry per configuration on it, each naming the
+next configuration towards the solved one, so any query starting
+partway along a cached path is a hit.  Depth-first searches also stop
+as soon as they reach a cached configuration and reuse its cached tail.
+Puzzles found to have no solution are cached too.
+
+A changed word list changes the context key of word ladders, so their
+old entries are never returned; invalidate() drops them.
+"""
+from collections import OrderedDict
+import sqlite3
+from puzzle import Puzzle
+from puzzle_tools import (breadth_first_solve, depth_first_solve, _chain,
+                          _iter_chain)
+
+# kinds of entry: a solved configuration, one step on the way to a
+# solved configuration, and a configuration with no solution
+GOAL, STEP, UNSOLVABLE = 0, 1, 2
+
+# strategies whose results are cached, by name
+STRATEGIES = {"bfs": breadth_first_solve, "dfs": depth_first_solve}
+# strategies that may stop at a cached configuration and reuse its tail;
+# breadth-first search would lose the guarantee of a shortest path
+SPLICING = {"dfs"}
+
+
+def context_of(puzzle):
+    """
+    Return the context part of the cache keys for puzzle.
+
+    @type puzzle: Puzzle
+    @rtype: str
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> context_of(MNPuzzle((("*", "1"),), (("1", "*"),)))
+    'MNPuzzle|1 *'
+    """
+    return "{}|{}".format(type(puzzle).__name__, puzzle.context_key())
+
+
+class SolutionCache:
+    """
+    Solutions by (context, strategy, encoded state), the max_size most
+    recently used held in memory and, when path is given, every one in
+    a sqlite database at path.
+
+    hits counts queries answered from the cache, spliced the searches
+    that reused a cached tail, and misses the searches run from scratch.
+    """
+
+    def __init__(self, max_size=100000, path=None):
+        """
+        Create a new SolutionCache self.
+
+        @type self: SolutionCache
+        @type max_size: int
+        @type path: str | None
+        @rtype: None
+        """
+        assert max_size > 0
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits, self.spliced, self.misses, self.evictions = 0, 0, 0, 0
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS solutions (context TEXT, "
+                "strategy TEXT, state BLOB, kind INTEGER, next BLOB, "
+                "PRIMARY KEY (context, strategy, state))")
+            self._db.commit()
+
+    def solve(self, puzzle, strategy="bfs", stats=None):
+        """
+        Return what the solver for strategy returns for puzzle, from
+        the cache when possible, caching the result.
+
+        @type self: SolutionCache
+        @type puzzle: Puzzle
+        @type strategy: str
+        @type stats: SearchStats | None
+        @rtype: PuzzleNode | None
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"cast", "case", "vase", "cost"}
+        >>> cache = SolutionCache()
+        >>> print(cache.solve(WordLadderPuzzle("cast", "vase", ws)).puzzle)
+        cast --> vase
+        >>> sol = cache.solve(WordLadderPuzzle("case", "vase", ws))
+        >>> [str(node.puzzle) for node in _iter_chain(sol)]
+        ['case --> vase', 'vase --> vase']
+        >>> cache.hits, cache.misses
+        (1, 1)
+        >>> ws.add("vast")
+        >>> _ = cache.solve(WordLadderPuzzle("case", "vase", ws))
+        >>> cache.hits, cache.misses
+        (1, 2)
+
+        Depth-first searches reuse the tail of a path they run into, and
+        a cache with a path outlives the process:
+
+        >>> import os, tempfile
+        >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+        >>> db = os.path.join(tempfile.mkdtemp(), "solutions.db")
+        >>> cache = SolutionCache(path=db)
+        >>> grid = [[".", "*", "*", "*"], ["*", "*", "*", "*"], \
+["*", "*", "*", "*"]]
+        >>> start = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> GridPegSolitairePuzzle.dead_states.clear()
+        >>> sol = cache.solve(start.extensions()[0], "dfs")
+        >>> len(list(_iter_chain(cache.solve(start, "dfs"))))
+        11
+        >>> cache.spliced, cache.misses
+        (1, 1)
+        >>> cache.close()
+        >>> SolutionCache(path=db).solve(start, "dfs") is not None
+        True
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError("unknown strategy: {}".format(strategy))
+        context = context_of(puzzle)
+        found, node = self._lookup(puzzle, context, strategy)
+        if found:
+            self.hits += 1
+            return node
+        if strategy in SPLICING:
+            result = STRATEGIES[strategy](_CacheAware(puzzle, self, context,
+                                                      strategy), stats=stats)
+            node = None if result is None else self._unwrap(result, context,
+                                                            strategy)
+        else:
+            self.misses += 1
+            node = STRATEGIES[strategy](puzzle, stats=stats)
+        self._store(puzzle, node, context, strategy)
+        return node
+
+    def _unwrap(self, result, context, strategy):
+        # Return the chain of puzzles in result, a solution found on
+        # _CacheAware puzzles, ending with the cached tail of its last
+        # configuration if it was not solved itself
+        puzzles = [puzzle.puzzle for puzzle in result.iter_path()]
+        last = puzzles[-1]
+        if last.is_solved():
+            self.misses += 1
+            return _chain(puzzles)
+        self.spliced += 1
+        tail = self._lookup(last, context, strategy)[1]
+        return _chain(puzzles[:-1] +
+                      list(tail.iter_path()))
+
+    def _get(self, key):
+        # Return the (kind, next state) entry for key, or None
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT kind, next FROM solutions WHERE context = ? AND "
+                "strategy = ? AND state = ?", key).fetchone()
+            if row is not None:
+                entry = (row[0], row[1])
+                self._remember(key, entry)
+        return entry
+
+    def _remember(self, key, entry):
+        # Put entry for key in memory, evicting the least recently used
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _lookup(self, puzzle, context, strategy):
+        # Return (found, solution): whether the cache knows the answer
+        # for puzzle and, if so, the root of the solution path, or None
+        # when there is none.  A path broken by an eviction is a miss
+        state = puzzle.encode_state()
+        entry = self._get((context, strategy, state))
+        if entry is None:
+            return False, None
+        if entry[0] == UNSOLVABLE:
+            return True, None
+        puzzles, seen = [puzzle], {state}
+        while entry[0] == STEP:
+            state = entry[1]
+            entry = self._get((context, strategy, state))
+            if entry is None or state in seen:
+                return False, None
+            seen.add(state)
+            puzzles.append(puzzle.decode_state(state))
+        return True, _chain(puzzles)
+
+    def _store(self, puzzle, node, context, strategy):
+        # Cache solution node of puzzle, or that it has none
+        if node is None:
+            entries = [(puzzle.encode_state(), UNSOLVABLE, None)]
+        else:
+            states = [p.encode_state() for p in node.iter_path()]
+            entries = [(state, STEP, following)
+                       for state, following in zip(states, states[1:])]
+            entries.append((states[-1], GOAL, None))
+        for state, kind, following in entries:
+            self._remember((context, strategy, state), (kind, following))
+        if self._db is not None:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)",
+                [(context, strategy, state, kind, following)
+                 for state, kind, following in entries])
+            self._db.commit()
+
+    def hit_rate(self):
+        """
+        Return the fraction of queries answered at least partly from
+        the cache.
+
+        @type self: SolutionCache
+        @rtype: float
+        """
+        total = self.hits + self.spliced + self.misses
+        return (self.hits + self.spliced) / total if total else 0.0
+
+    def metrics(self):
+        """
+        Return the counters of self as a dict.
+
+        @type self: SolutionCache
+        @rtype: dict
+        """
+        return {"hits": self.hits, "spliced": self.spliced,
+                "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hit_rate(), "size": len(self._entries)}
+
+    def invalidate(self, puzzle=None):
+        """
+        Drop every entry sharing the context of puzzle, such as every
+        word ladder over the same word list and target, or every entry
+        when puzzle is None.
+
+        @type self: SolutionCache
+        @type puzzle: Puzzle | None
+        @rtype: None
+        """
+        if puzzle is None:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM solutions")
+        else:
+            context = context_of(puzzle)
+            for key in [k for k in self._entries if k[0] == context]:
+                del self._entries[key]
+            if self._db is not None:
+                self._db.execute("DELETE FROM solutions WHERE context = ?",
+                                 (context,))
+        if self._db is not None:
+            self._db.commit()
+
+    def close(self):
+        """
+        Close the database of self, if it has one.
+
+        @type self: SolutionCache
+        @rtype: None
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class _CacheAware(Puzzle):
+    # A puzzle that counts as solved when its configuration is solved
+    # or has a cached solution, so a search stops there
+
+    def __init__(self, puzzle, cache, context, strategy):
+        self.puzzle, self.cache = puzzle, cache
+        self.context, self.strategy = context, strategy
+        self.acyclic, self.dead_states = puzzle.acyclic, puzzle.dead_states
+        self.reversible = puzzle.reversible
+        self.move_order = puzzle.move_order
+
+    def __str__(self):
+        return str(self.puzzle)
+
+    def state_key(self):
+        return self.puzzle.state_key()
+
+    def fail_fast(self):
+        if self.puzzle.fail_fast():
+            return True
+        entry = self.cache._get((self.context, self.strategy,
+                                 self.puzzle.encode_state()))
+        return entry is not None and entry[0] == UNSOLVABLE
+
+    def heuristic(self):
+        return self.puzzle.heuristic()
+
+    def is_solved(self):
+        if self.puzzle.is_solved():
+            return True
+        entry = self.cache._get((self.context, self.strategy,
+                                 self.puzzle.encode_state()))
+        return (entry is not None and entry[0] != UNSOLVABLE and
+                self.cache._lookup(self.puzzle, self.context,
+                                   self.strategy)[0])
+
+    def extensions(self):
+        return [_CacheAware(p, self.cache, self.context, self.strategy)
+                for p in self.puzzle.extensions()]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,198 @@
+"""
+Solutions as moves rather than boards, for writing long solutions out
+as they are read and for sending them over the wire.
+
+write_moves writes a solution path to a text stream, such as a file or
+socket.makefile("w"), one line per move as named by Puzzle.move_to,
+without rendering any configuration.
+
+A move list is the compact form: MAGIC and a version byte, then for each
+move one unsigned LEB128 varint, one more than the position of the
+configuration moved to among the extensions() of the configuration
+moved from, and a final 0.  Replaying it from the starting
+configuration with decode_moves rebuilds the solution, so a move list
+only makes sense with the puzzle it was written for.
+"""
+import io
+from puzzle_tools import _chain
+from search_checkpoint import _write_varint, _read_varint
+
+MAGIC = b"PZMV"
+VERSION = 1
+
+
+def format_move(move):
+    """
+    Return move, as returned by Puzzle.move_to, as one line of text:
+    the parts of a tuple separated by spaces, or str(move).
+
+    @type move: Hashable
+    @rtype: str
+
+    >>> format_move(("2", 0, 1))
+    '2 0 1'
+    >>> format_move(7)
+    '7'
+    """
+    if isinstance(move, tuple):
+        return " ".join(str(part) for part in move)
+    return str(move)
+
+
+def iter_moves(node):
+    """
+    Yield the moves along the solution path from PuzzleNode node, as
+    named by Puzzle.move_to.
+
+    @type node: PuzzleNode
+    @rtype: Iterator[Hashable]
+
+    >>> from puzzle_tools import breadth_first_solve
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cast", "case", "vase"}
+    >>> list(iter_moves(breadth_first_solve(WordLadderPuzzle("cast", \
+"vase", ws))))
+    [(3, 'e', 0), (0, 'v', 0)]
+    """
+    puzzles = node.iter_path()
+    previous = next(puzzles)
+    for puzzle in puzzles:
+        yield previous.move_to(puzzle)
+        previous = puzzle
+
+
+def write_moves(node, out):
+    """
+    Write the moves along the solution path from PuzzleNode node to the
+    text stream out, one line each, and return how many there were.
+
+    @type node: PuzzleNode
+    @type out: TextIO
+    @rtype: int
+
+    >>> import sys
+    >>> from puzzle_tools import breadth_first_solve
+    >>> from mn_puzzle import MNPuzzle
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> sol = breadth_first_solve(MNPuzzle((("1", "2", "3"), \
+("*", "4", "5")), goal))
+    >>> write_moves(sol, sys.stdout)
+    4 1 0
+    5 1 1
+    2
+    """
+    count = 0
+    for move in iter_moves(node):
+        out.write(format_move(move))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def _indexes(node):
+    # Yield, for each move along the solution path from node, the
+    # position of the configuration moved to among the extensions of
+    # the one moved from
+    puzzles = node.iter_path()
+    previous = next(puzzles)
+    for puzzle in puzzles:
+        key = puzzle.state_key()
+        for i, extension in enumerate(previous.extensions()):
+            if extension.state_key() == key:
+                yield i
+                break
+        else:
+            raise ValueError("{} is not an extension of {}".format(
+                puzzle, previous))
+        previous = puzzle
+
+
+def dump_moves(node, out):
+    """
+    Write the move list of the solution path from PuzzleNode node to
+    the binary stream out, a move at a time.
+
+    @type node: PuzzleNode
+    @type out: BinaryIO
+    @rtype: None
+    """
+    out.write(MAGIC + bytes([VERSION]))
+    buffer = bytearray()
+    for i in _indexes(node):
+        _write_varint(buffer, i + 1)
+        if len(buffer) >= 4096:
+            out.write(bytes(buffer))
+            buffer.clear()
+    buffer.append(0)
+    out.write(bytes(buffer))
+
+
+def encode_moves(node):
+    """
+    Return the move list of the solution path from PuzzleNode node.
+
+    @type node: PuzzleNode
+    @rtype: bytes
+
+    >>> from puzzle_tools import breadth_first_solve
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> start = GridPegSolitairePuzzle([[".", "*", "*", ".", "*"]], \
+{"*", "."})
+    >>> encode_moves(breadth_first_solve(start))
+    b'PZMV\\x01\\x02\\x01\\x00'
+    """
+    out = io.BytesIO()
+    dump_moves(node, out)
+    return out.getvalue()
+
+
+def decode_moves(puzzle, data):
+    """
+    Return the root of the solution path that the move list data
+    describes from puzzle, as a chain of PuzzleNodes.
+
+    @type puzzle: Puzzle
+    @type data: bytes
+    @rtype: PuzzleNode
+
+    >>> from puzzle_tools import breadth_first_solve
+    >>> from mn_puzzle import MNPuzzle
+    >>> goal = (("1", "2", "3"), ("4", "5", "*"))
+    >>> start = MNPuzzle((("*", "4", "2"), ("3", "5", "1")), goal)
+    >>> sol = breadth_first_solve(start)
+    >>> decode_moves(start, encode_moves(sol)) == sol
+    True
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a move list")
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError("unsupported move list version {}".format(
+            data[len(MAGIC)]))
+    return _replay(puzzle, _read_indexes(data, len(MAGIC) + 1))
+
+
+def _read_indexes(data, pos):
+    # Yield the extension positions of the 0-terminated move list at
+    # pos in data
+    while True:
+        i, pos = _read_varint(data, pos)
+        if i == 0:
+            return
+        yield i - 1
+
+
+def _replay(puzzle, indexes):
+    # Return the root of the chain of PuzzleNodes reached from puzzle by
+    # moving, at each step, to the extension at the next of indexes
+    puzzles = [puzzle]
+    for i in indexes:
+        extensions = puzzles[-1].extensions()
+        if not 0 <= i < len(extensions):
+            raise ValueError("move {} of {} is not an extension".format(
+                len(puzzles), puzzles[-1]))
+        puzzles.append(extensions[i])
+    return _chain(puzzles)
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
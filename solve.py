@@ -0,0 +1,285 @@
+"""
+Solve puzzles read from a file or standard input, writing one JSON line
+per puzzle with how it ended and what the search took:
+
+    python solve.py sudoku sudokus.txt --strategy dfs
+    python solve.py ladder pairs.txt --strategy bidirectional --deadline 5
+    python solve.py mn boards.txt --strategy parallel --workers 4
+    python solve.py mn big_boards.txt --strategy beam --width 500
+    python solve.py peg boards.txt --profile peg.prof
+
+The input formats are those read by puzzle_stream.  The throughput of
+the whole run goes to standard error at the end.
+
+Only the modules of the puzzle type and strategy asked for are
+imported, and the profilers only with --profile, so short runs start
+quickly.
+"""
+import argparse
+from collections import Counter
+import json
+import os
+import signal
+import sys
+from time import perf_counter
+from puzzle_registry import solver_names
+from puzzle_stream import (read_sudokus, read_mn_puzzles, read_peg_puzzles,
+                           read_ladder_pairs, solve_stream, parse_grid)
+from search_budget import Budget
+from solution_moves import iter_moves, format_move
+
+# the words file at the root of the project
+WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "words")
+# the strategy running the --search strategy across worker processes;
+# the other strategies are the solvers of puzzle_registry
+PARALLEL = "parallel"
+PUZZLE_TYPES = ("sudoku", "mn", "peg", "ladder")
+
+
+class Sampler:
+    """
+    A sampling profiler: every interval seconds of CPU time, the stack
+    of the running Python code is counted in stacks, by the
+    "file:function" of each frame from the outermost in, joined by ";".
+    This is the collapsed-stack format of flame graph tools.  Needs
+    signal.setitimer, so not on Windows.
+    """
+
+    def __init__(self, interval=0.001):
+        """
+        Create a new Sampler self that has not started.
+
+        @type self: Sampler
+        @type interval: float
+        @rtype: None
+        """
+        self.interval, self.stacks = interval, Counter()
+
+    def _sample(self, signum, frame):
+        # Signal handler: count the stack of frame
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append("{}:{}".format(os.path.basename(code.co_filename),
+                                        code.co_name))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        """
+        Start sampling.
+
+        @type self: Sampler
+        @rtype: None
+        """
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        """
+        Stop sampling.
+
+        @type self: Sampler
+        @rtype: None
+        """
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def write(self, path):
+        """
+        Write the stacks of self to path, one "stack count" line each,
+        most frequent first.
+
+        @type self: Sampler
+        @type path: str
+        @rtype: None
+        """
+        with open(path, "w") as f:
+            for stack, samples in self.stacks.most_common():
+                f.write("{} {}\n".format(stack, samples))
+
+
+def read_puzzles(puzzle_type, lines, args):
+    """
+    Return an iterator over the puzzles of puzzle_type in lines, as
+    told by the command line arguments args, and the word sets they use.
+
+    @type puzzle_type: str
+    @type lines: Iterable[str]
+    @type args: argparse.Namespace
+    @rtype: (Iterator[Puzzle], list[set[str]])
+    """
+    if puzzle_type == "sudoku":
+        return read_sudokus(lines), []
+    if puzzle_type == "mn":
+        target = None if args.target is None else parse_grid(args.target)
+        return read_mn_puzzles(lines, target), []
+    if puzzle_type == "peg":
+        return read_peg_puzzles(lines), []
+    with open(args.words) as words:
+        ws = set(words.read().split())
+    return read_ladder_pairs(lines, ws, indels=args.indels,
+                             costs=args.costs), [ws]
+
+
+def record(index, solution, metrics, with_moves):
+    """
+    Return the JSON line reporting on the puzzle at index, with its
+    solution and the metrics of measured_solve, listing the moves of
+    solution if with_moves.
+
+    @type index: int
+    @type solution: PuzzleNode | None
+    @type metrics: dict
+    @type with_moves: bool
+    @rtype: str
+
+    >>> record(3, None, {"status": "unsolvable", "moves": None}, True)
+    '{"index": 3, "moves": null, "path": null, "status": "unsolvable"}'
+    """
+    line = dict(metrics, index=index)
+    if with_moves:
+        line["path"] = (None if solution is None else
+                        [format_move(move) for move in iter_moves(solution)])
+    return json.dumps(line, sort_keys=True)
+
+
+def run(args, out, err):
+    """
+    Solve the puzzles named by the command line arguments args, writing
+    a JSON line for each to the text stream out and the throughput to
+    err.  Return the number of puzzles solved.
+
+    @type args: argparse.Namespace
+    @type out: TextIO
+    @type err: TextIO
+    @rtype: int
+    """
+    budget = None
+    if (args.deadline is not None or args.max_nodes is not None or
+            args.max_memory is not None):
+        budget = Budget(args.deadline, args.max_nodes,
+                        None if args.max_memory is None else
+                        int(args.max_memory * 2 ** 20))
+    if args.strategy == PARALLEL:
+        solver, processes = args.search, args.workers
+    else:
+        solver, processes = args.strategy, args.workers or 1
+    options = {}
+    if solver == "beam" and args.width is not None:
+        options["width"] = args.width
+    if solver == "wastar" and args.weight is not None:
+        options["weight"] = args.weight
+    source = sys.stdin if args.input == "-" else open(args.input)
+    start = perf_counter()
+    count, solved, nodes = 0, 0, 0
+    try:
+        puzzles, word_sets = read_puzzles(args.type, source, args)
+        for _, solution, metrics in solve_stream(
+                puzzles, solver, processes, args.chunk_size, word_sets,
+                args.costs, budget, measure=True, options=options):
+            out.write(record(count, solution, metrics, args.moves))
+            out.write("\n")
+            count += 1
+            solved += solution is not None
+            nodes += metrics["nodes_expanded"]
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    seconds = perf_counter() - start
+    err.write("{} puzzles, {} solved in {:.3f}s: {:.1f} puzzles/s, "
+              "{:.0f} nodes/s\n".format(count, solved, seconds,
+                                        count / seconds if seconds else 0.0,
+                                        nodes / seconds if seconds else 0.0))
+    return solved
+
+
+def main(argv=None):
+    """
+    Run the command line solver on the arguments argv, or on sys.argv.
+
+    @type argv: list[str] | None
+    @rtype: None
+    """
+    parser = argparse.ArgumentParser(prog="python solve.py",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("type", choices=PUZZLE_TYPES,
+                        help="the type of the puzzles")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="the file of puzzles (default: stdin)")
+    parser.add_argument("--strategy", choices=solver_names() + [PARALLEL],
+                        default="bfs",
+                        help="how to solve each puzzle (default: bfs)")
+    parser.add_argument("--search", choices=solver_names(),
+                        default="astar",
+                        help="the strategy of --strategy parallel "
+                             "(default: astar)")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: 1, or every core "
+                             "with --strategy parallel)")
+    parser.add_argument("--chunk-size", type=int, default=16,
+                        help="puzzles sent to a worker at a time")
+    parser.add_argument("--width", type=int,
+                        help="configurations kept per level by beam "
+                             "(default: 100)")
+    parser.add_argument("--weight", type=float,
+                        help="heuristic weight of wastar (default: 2)")
+    parser.add_argument("--deadline", type=float,
+                        help="seconds allowed per puzzle")
+    parser.add_argument("--max-nodes", type=int,
+                        help="expansions allowed per puzzle")
+    parser.add_argument("--max-memory", type=float,
+                        help="resident memory allowed, in MiB")
+    parser.add_argument("--moves", action="store_true",
+                        help="list the moves of each solution")
+    parser.add_argument("--target",
+                        help='MN target grid, like "1 2 3/4 5 *" (default: '
+                             "the tiles in order, blank last)")
+    parser.add_argument("--words", default=WORDS_PATH,
+                        help="word list for ladders")
+    parser.add_argument("--indels", action="store_true",
+                        help="let ladder steps insert and delete letters")
+    parser.add_argument("--costs", action="store_true",
+                        help="weigh ladder steps by word frequency")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="profile this process and write the result "
+                             "to PATH; workers are not profiled")
+    parser.add_argument("--profiler", choices=("cprofile", "sample"),
+                        default="cprofile",
+                        help="cProfile statistics, read with pstats, or "
+                             "sampled stacks for flame graphs")
+    args = parser.parse_args(argv)
+    if args.costs:
+        from word_ladder_puzzle import load_word_costs
+        args.costs = load_word_costs()
+        if args.costs is None:
+            parser.error("no word frequency file for --costs")
+    else:
+        args.costs = None
+    if args.profile is None:
+        run(args, sys.stdout, sys.stderr)
+    elif args.profiler == "sample":
+        sampler = Sampler()
+        sampler.start()
+        try:
+            run(args, sys.stdout, sys.stderr)
+        finally:
+            sampler.stop()
+            sampler.write(args.profile)
+    else:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            run(args, sys.stdout, sys.stderr)
+        finally:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats(
+                "cumulative").print_stats(15)
+
+
+if __name__ == "__main__":
+    main()
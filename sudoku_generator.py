@@ -0,0 +1,349 @@
+"""
+Generate sudoku puzzles with a unique solution and grade their
+difficulty by the propagation techniques the solve needed.
+"""
+import random
+from multiprocessing import Pool
+from sudoku_grid import SudokuGrid, popcount
+from sudoku_puzzle import SudokuPuzzle
+
+# default symbols, in code order, for grids of up to 35 symbols
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# grades, easiest first
+EASY, MEDIUM, HARD = "easy", "medium", "hard"
+
+
+class SolveStats:
+    """
+    Which techniques a solve needed: how many positions were filled as
+    naked singles (one candidate left) and hidden singles (the only
+    place left for a symbol in some unit), and how many guesses were
+    made when propagation got stuck.
+    """
+
+    def __init__(self):
+        """
+        Create an empty SolveStats self.
+
+        @type self: SolveStats
+        @rtype: None
+        """
+        self.naked, self.hidden, self.guesses = 0, 0, 0
+
+    def grade(self):
+        """
+        Return EASY if naked singles were enough, MEDIUM if hidden
+        singles were needed and HARD if the solve had to guess.
+
+        @type self: SolveStats
+        @rtype: str
+        """
+        if self.guesses:
+            return HARD
+        elif self.hidden:
+            return MEDIUM
+        return EASY
+
+
+def _assign(cand, m, bit, peers, queue):
+    # Fix position m to the code with mask bit, removing bit from its
+    # peers and queueing peers that are left with a single candidate.
+    # Return False on a contradiction.
+    cand[m] = bit
+    for p in peers[m]:
+        c = cand[p]
+        if c & bit:
+            c &= ~bit
+            if not c:
+                return False
+            cand[p] = c
+            if not c & (c - 1):
+                queue.append(p)
+    return True
+
+
+def _propagate(cand, fixed, tables, full, stats, queue):
+    # Fill naked singles until none are left, then look for hidden
+    # singles, and repeat.  Return False on a contradiction.
+    peers, units = tables.peers, tables.units
+    while True:
+        while queue:
+            m = queue.pop()
+            if fixed[m]:
+                continue
+            fixed[m] = True
+            stats.naked += 1
+            if not _assign(cand, m, cand[m], peers, queue):
+                return False
+        for unit in units:
+            once, twice = 0, 0
+            for p in unit:
+                c = cand[p]
+                twice |= once & c
+                once |= c
+            if once != full:
+                return False
+            singles = once & ~twice
+            if not singles:
+                continue
+            for p in unit:
+                c = cand[p] & singles
+                if c and not fixed[p]:
+                    if c & (c - 1):
+                        return False
+                    fixed[p] = True
+                    stats.hidden += 1
+                    if not _assign(cand, p, c, peers, queue):
+                        return False
+        if not queue:
+            return True
+
+
+def _search(cand, fixed, tables, full, limit, stats, solutions):
+    # Count solutions below the propagated state cand, stopping once
+    # limit are found.  The first solution found is kept in solutions.
+    best, best_count = -1, tables.n + 1
+    for m, c in enumerate(cand):
+        if not fixed[m]:
+            k = popcount(c)
+            if k < best_count:
+                best, best_count = m, k
+                if k == 2:
+                    break
+    if best < 0:
+        if not solutions:
+            solutions.append(cand[:])
+        return 1
+    total, c = 0, cand[best]
+    while c and total < limit:
+        bit = c & -c
+        c &= ~bit
+        stats.guesses += 1
+        child, child_fixed, queue = cand[:], fixed[:], []
+        child_fixed[best] = True
+        if (_assign(child, best, bit, tables.peers, queue) and
+                _propagate(child, child_fixed, tables, full, stats, queue)):
+            total += _search(child, child_fixed, tables, full,
+                             limit - total, stats, solutions)
+    return total
+
+
+def count_grid_solutions(grid, limit=2, stats=None, solutions=None):
+    """
+    Return the number of solutions of SudokuGrid grid, stopping once
+    limit of them have been found.  Techniques used are tallied in
+    stats, and the first solution found is appended to solutions as a
+    list of codes.
+
+    @type grid: SudokuGrid
+    @type limit: int
+    @type stats: SolveStats | None
+    @type solutions: list[list[int]] | None
+    @rtype: int
+
+    >>> g = SudokuGrid(4, [1, 2, 3, 4, 3, 4, 1, 2,
+    ...                    2, 1, 4, 3, 4, 3, 2, 1], tuple("1234"))
+    >>> count_grid_solutions(g)
+    1
+    >>> count_grid_solutions(SudokuGrid(4, [0] * 16, tuple("1234")),
+    ...                      limit=1000)
+    288
+    """
+    if stats is None:
+        stats = SolveStats()
+    if solutions is None:
+        solutions = []
+    tables, full = grid.tables, grid.full_mask
+    if not grid.is_valid():
+        return 0
+    cand = [(1 << c) if c else m for c, m in zip(grid.cells,
+                                                  grid.candidate_masks())]
+    if not all(cand):
+        return 0
+    fixed = [False] * len(cand)
+    queue = [m for m, c in enumerate(cand) if not c & (c - 1)]
+    if not _propagate(cand, fixed, tables, full, stats, queue):
+        return 0
+    return _search(cand, fixed, tables, full, limit, stats, solutions)
+
+
+def grade(grid):
+    """
+    Return EASY, MEDIUM or HARD for SudokuGrid grid, according to the
+    techniques needed to solve it.
+
+    @type grid: SudokuGrid
+    @rtype: str
+
+    >>> grade(SudokuGrid(4, [1, 2, 3, 4, 3, 4, 1, 2,
+    ...                      2, 1, 4, 3, 4, 3, 2, 0], tuple("1234")))
+    'easy'
+    """
+    stats = SolveStats()
+    count_grid_solutions(grid, 1, stats)
+    return stats.grade()
+
+
+def random_full_grid(n=9, rng=random):
+    """
+    Return a random completely filled nxn SudokuGrid.
+
+    A fixed pattern solution is shuffled with validity-preserving
+    transformations: relabelling the symbols, permuting rows inside a
+    band and bands, columns inside a stack and stacks, and transposing.
+
+    @type n: int
+    @type rng: random.Random
+    @rtype: SudokuGrid
+
+    >>> random_full_grid(9, random.Random(1)).is_solved()
+    True
+    """
+    ss = round(n ** (1 / 2))
+    assert ss * ss == n and n <= len(SYMBOLS)
+
+    def shuffled_lines():
+        bands = list(range(ss))
+        rng.shuffle(bands)
+        lines = []
+        for b in bands:
+            inner = list(range(ss))
+            rng.shuffle(inner)
+            lines.extend(b * ss + i for i in inner)
+        return lines
+
+    labels = list(range(1, n + 1))
+    rng.shuffle(labels)
+    rows, cols = shuffled_lines(), shuffled_lines()
+    transpose = rng.random() < 0.5
+    cells = []
+    for r in range(n):
+        for c in range(n):
+            row, col = (cols[c], rows[r]) if transpose else (rows[r], cols[c])
+            cells.append(labels[(ss * (row % ss) + row // ss + col) % n])
+    return SudokuGrid(n, cells, tuple(sorted(SYMBOLS[:n])))
+
+
+class GeneratedSudoku:
+    """
+    A generated puzzle together with its unique solution and grade.
+    """
+
+    def __init__(self, puzzle, solution, grade_):
+        """
+        Create a new GeneratedSudoku self.
+
+        @type self: GeneratedSudoku
+        @type puzzle: SudokuPuzzle
+        @type solution: SudokuPuzzle
+        @type grade_: str
+        @rtype: None
+        """
+        self.puzzle, self.solution, self.grade = puzzle, solution, grade_
+
+    def __repr__(self):
+        """
+        Return a representation of GeneratedSudoku self.
+
+        @type self: GeneratedSudoku
+        @rtype: str
+        """
+        symbols = self.puzzle._symbols
+        return "GeneratedSudoku({}, {} clues)".format(
+            self.grade, len(symbols) - symbols.count("*"))
+
+
+def generate(n=9, seed=None, symmetric=True, min_clues=0):
+    """
+    Return a GeneratedSudoku for an nxn puzzle with a unique solution.
+
+    Clues are removed from a random full grid in random order (in
+    point-symmetric pairs when symmetric is True), keeping each removal
+    only if the puzzle still has exactly one solution, until no clue
+    can go or only min_clues are left.
+
+    @type n: int
+    @type seed: int | None
+    @type symmetric: bool
+    @type min_clues: int
+    @rtype: GeneratedSudoku
+
+    >>> g = generate(4, seed=3)
+    >>> count_grid_solutions(g.puzzle.grid())
+    1
+    >>> g.solution.is_solved()
+    True
+    """
+    rng = random.Random(seed)
+    solution = random_full_grid(n, rng)
+    grid = SudokuGrid(n, solution.cells, solution.symbols)
+    cells, size = grid.cells, n ** 2
+    order = list(range(size))
+    rng.shuffle(order)
+    clues = size
+    for m in order:
+        group = {m, size - 1 - m} if symmetric else {m}
+        if not all(cells[p] for p in group) or clues - len(group) < min_clues:
+            continue
+        saved = [(p, cells[p]) for p in group]
+        for p in group:
+            cells[p] = 0
+        if count_grid_solutions(grid, 2) == 1:
+            clues -= len(group)
+        else:
+            for p, c in saved:
+                cells[p] = c
+    symbol_set = set(solution.symbols)
+    return GeneratedSudoku(SudokuPuzzle(n, grid.to_symbols(), symbol_set),
+                           SudokuPuzzle(n, solution.to_symbols(), symbol_set),
+                           grade(grid))
+
+
+def _generate_job(args):
+    # Pool worker: unpack the arguments for generate
+    return generate(*args)
+
+
+def generate_many(count, n=9, seed=None, processes=None, symmetric=True,
+                  min_clues=0):
+    """
+    Return a list of count GeneratedSudoku puzzles, generated in
+    parallel across processes worker processes (all cores when None,
+    in this process when 1).  The same seed gives the same puzzles.
+
+    @type count: int
+    @type n: int
+    @type seed: int | None
+    @type processes: int | None
+    @type symmetric: bool
+    @type min_clues: int
+    @rtype: list[GeneratedSudoku]
+
+    >>> serial = generate_many(4, 4, seed=5, processes=1)
+    >>> pooled = generate_many(4, 4, seed=5, processes=2)
+    >>> [g.puzzle for g in serial] == [g.puzzle for g in pooled]
+    True
+    >>> all(count_grid_solutions(g.puzzle.grid()) == 1 for g in pooled)
+    True
+    """
+    rng = random.Random(seed)
+    jobs = [(n, rng.getrandbits(64), symmetric, min_clues)
+            for _ in range(count)]
+    if processes == 1:
+        return [_generate_job(job) for job in jobs]
+    with Pool(processes) as pool:
+        return pool.map(_generate_job, jobs, chunksize=max(1, count // 64))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from time import time
+    start = time()
+    puzzles = generate_many(1000, 9, seed=0)
+    end = time()
+    grades = [p.grade for p in puzzles]
+    print("Generated {} unique 9x9 sudokus in {} seconds: {}".format(
+        len(puzzles), end - start,
+        {g: grades.count(g) for g in (EASY, MEDIUM, HARD)}))
@@ -0,0 +1,344 @@
+"""
+Array-backed sudoku grids: n ** 2 integer codes checked against
+precomputed unit index tables with bitmasks, instead of rebuilding
+row, column and subsquare sets for every cell.
+"""
+from operator import itemgetter
+
+# unit index tables, keyed by n, built once and shared by every grid
+_TABLES = {}
+
+
+class UnitTables:
+    """
+    Precomputed index tables for nxn sudoku grids.
+
+    units is a tuple of 3 * n tuples of cell positions: the n rows, then
+    the n columns, then the n subsquares.  row_of, col_of and box_of map
+    each cell position to the index of its row, column and subsquare.
+    """
+
+    def __init__(self, n):
+        """
+        Create the unit index tables for nxn sudoku grids.
+
+        @type self: UnitTables
+        @type n: int
+        @rtype: None
+        """
+        ss = round(n ** (1 / 2))
+        assert ss * ss == n
+        self.n, self.size = n, n ** 2
+        self.row_of = tuple(m // n for m in range(n ** 2))
+        self.col_of = tuple(m % n for m in range(n ** 2))
+        self.box_of = tuple((m // n // ss) * ss + (m % n) // ss
+                            for m in range(n ** 2))
+        rows = tuple(tuple(r * n + c for c in range(n)) for r in range(n))
+        cols = tuple(tuple(r * n + c for r in range(n)) for c in range(n))
+        boxes = tuple(tuple(m for m in range(n ** 2) if self.box_of[m] == b)
+                      for b in range(n))
+        self.units = rows + cols + boxes
+        # peers[m] is every other position sharing a unit with m
+        self.peers = tuple(
+            tuple(sorted((set(rows[self.row_of[m]]) |
+                          set(cols[self.col_of[m]]) |
+                          set(boxes[self.box_of[m]])) - {m}))
+            for m in range(n ** 2))
+        # one C-level gather per unit, used by the batch checks
+        self.getters = tuple(itemgetter(*unit) for unit in self.units)
+
+
+def unit_tables(n):
+    """
+    Return the shared UnitTables for nxn grids.
+
+    @type n: int
+    @rtype: UnitTables
+
+    >>> t = unit_tables(4)
+    >>> t.units[8]
+    (0, 1, 4, 5)
+    >>> t.peers[0]
+    (1, 2, 3, 4, 5, 8, 12)
+    >>> unit_tables(4) is t
+    True
+    """
+    if n not in _TABLES:
+        _TABLES[n] = UnitTables(n)
+    return _TABLES[n]
+
+
+def popcount(mask):
+    """
+    Return the number of bits set in mask.
+
+    @type mask: int
+    @rtype: int
+
+    >>> popcount(0b10110)
+    3
+    """
+    return bin(mask).count("1")
+
+
+class SudokuGrid:
+    """
+    An nxn sudoku grid stored as n ** 2 integer codes in a bytearray.
+
+    Code 0 is an empty position and codes 1 .. n stand for the symbols
+    in sorted order, so candidate sets are bitmasks with bit k set
+    when symbol k is still allowed.
+    """
+
+    def __init__(self, n, cells, symbols):
+        """
+        Create a new SudokuGrid self from cells, n ** 2 codes in 0 .. n,
+        where code k > 0 stands for symbols[k - 1].
+
+        @type self: SudokuGrid
+        @type n: int
+        @type cells: bytearray | list[int]
+        @type symbols: tuple[str]
+        @rtype: None
+        """
+        assert 0 < n < 256
+        assert len(cells) == n ** 2
+        assert len(symbols) == n
+        self.n, self.symbols = n, symbols
+        self.cells = bytearray(cells)
+        self.tables = unit_tables(n)
+        # every symbol allowed: bits 1 .. n
+        self.full_mask = ((1 << n) - 1) << 1
+
+    @classmethod
+    def from_symbols(cls, n, symbols, symbol_set, empty="*"):
+        """
+        Return a SudokuGrid for the symbol list used by SudokuPuzzle.
+
+        @type n: int
+        @type symbols: list[str] | str
+        @type symbol_set: set[str]
+        @type empty: str
+        @rtype: SudokuGrid
+
+        >>> g = SudokuGrid.from_symbols(4, "AB*D" * 4, {"A", "B", "C", "D"})
+        >>> list(g.cells[:4])
+        [1, 2, 0, 4]
+        """
+        order = tuple(sorted(symbol_set))
+        code = {s: k + 1 for k, s in enumerate(order)}
+        code[empty] = 0
+        return cls(n, [code[s] for s in symbols], order)
+
+    def to_symbols(self, empty="*"):
+        """
+        Return the symbol list SudokuPuzzle uses for self.
+
+        @type self: SudokuGrid
+        @type empty: str
+        @rtype: list[str]
+
+        >>> g = SudokuGrid(4, [1, 0, 0, 0] * 4, ("A", "B", "C", "D"))
+        >>> g.to_symbols()[:4]
+        ['A', '*', '*', '*']
+        """
+        lookup = (empty,) + self.symbols
+        return [lookup[c] for c in self.cells]
+
+    def unit_masks(self):
+        """
+        Return (rows, columns, subsquares, valid): bitmasks of the codes
+        used in each unit, found in a single pass over the cells, and
+        whether no unit repeats a code.
+
+        @type self: SudokuGrid
+        @rtype: (list[int], list[int], list[int], bool)
+        """
+        n, t = self.n, self.tables
+        rows, cols, boxes = [0] * n, [0] * n, [0] * n
+        row_of, col_of, box_of = t.row_of, t.col_of, t.box_of
+        valid = True
+        for m, c in enumerate(self.cells):
+            if c:
+                bit = 1 << c
+                r, k, b = row_of[m], col_of[m], box_of[m]
+                if (rows[r] | cols[k] | boxes[b]) & bit:
+                    valid = False
+                rows[r] |= bit
+                cols[k] |= bit
+                boxes[b] |= bit
+        return rows, cols, boxes, valid
+
+    def candidate_masks(self):
+        """
+        Return a list with the bitmask of allowed codes for each empty
+        position of self, and 0 for filled positions.
+
+        @type self: SudokuGrid
+        @rtype: list[int]
+
+        >>> g = SudokuGrid(4, [1, 2, 3, 4, 3, 4, 1, 2,
+        ...                    2, 1, 4, 3, 4, 3, 2, 0], ("A", "B", "C", "D"))
+        >>> g.candidate_masks()[-1] == 1 << 1
+        True
+        """
+        rows, cols, boxes, _ = self.unit_masks()
+        t, full = self.tables, self.full_mask
+        row_of, col_of, box_of = t.row_of, t.col_of, t.box_of
+        return [0 if c else
+                full & ~(rows[row_of[m]] | cols[col_of[m]] | boxes[box_of[m]])
+                for m, c in enumerate(self.cells)]
+
+    def is_valid(self):
+        """
+        Return whether no row, column or subsquare of self repeats
+        a symbol.  Empty positions are ignored.
+
+        @type self: SudokuGrid
+        @rtype: bool
+
+        >>> SudokuGrid(4, [1, 1] + [0] * 14, ("A", "B", "C", "D")).is_valid()
+        False
+        """
+        return self.unit_masks()[3]
+
+    def is_solved(self):
+        """
+        Return whether self is completely and validly filled.
+
+        @type self: SudokuGrid
+        @rtype: bool
+
+        >>> g = SudokuGrid(4, [1, 2, 3, 4, 3, 4, 1, 2,
+        ...                    2, 1, 4, 3, 4, 3, 2, 1], ("A", "B", "C", "D"))
+        >>> g.is_solved()
+        True
+        """
+        return 0 not in self.cells and self.is_valid()
+
+    def fail_fast(self):
+        """
+        Return whether self can never be completed: some unit repeats
+        a symbol or some empty position has no candidates left.
+
+        @type self: SudokuGrid
+        @rtype: bool
+
+        >>> g = SudokuGrid(4, [1, 2, 3, 4, 3, 0, 1, 2,
+        ...                    0, 3, 2, 1, 2, 4, 0, 3], ("A", "B", "C", "D"))
+        >>> g.fail_fast()
+        True
+        """
+        rows, cols, boxes, valid = self.unit_masks()
+        if not valid:
+            return True
+        t, full = self.tables, self.full_mask
+        row_of, col_of, box_of = t.row_of, t.col_of, t.box_of
+        for m, c in enumerate(self.cells):
+            if not c and not (full & ~(rows[row_of[m]] | cols[col_of[m]] |
+                                       boxes[box_of[m]])):
+                return True
+        return False
+
+    def score(self):
+        """
+        Return (clues, candidates, dead) for self: the number of filled
+        positions, the total number of candidates over the empty
+        positions, and whether self fails fast.
+
+        @type self: SudokuGrid
+        @rtype: (int, int, bool)
+
+        >>> SudokuGrid(4, [0] * 16, ("A", "B", "C", "D")).score()
+        (0, 64, False)
+        """
+        rows, cols, boxes, valid = self.unit_masks()
+        t, full = self.tables, self.full_mask
+        row_of, col_of, box_of = t.row_of, t.col_of, t.box_of
+        clues, candidates, dead = 0, 0, not valid
+        for m, c in enumerate(self.cells):
+            if c:
+                clues += 1
+            else:
+                k = popcount(full & ~(rows[row_of[m]] | cols[col_of[m]] |
+                                      boxes[box_of[m]]))
+                candidates += k
+                dead = dead or k == 0
+        return clues, candidates, dead
+
+
+def batch_is_valid(grids, n=9, empty="*"):
+    """
+    Return a list saying, for each grid in grids, whether no row, column
+    or subsquare repeats a symbol.  Grids are strings or sequences of
+    n ** 2 symbols, with empty marking open positions.
+
+    @type grids: iterable[str | list[str]]
+    @type n: int
+    @type empty: str
+    @rtype: list[bool]
+
+    >>> batch_is_valid(["AB**" + "*" * 12, "AA**" + "*" * 12], 4)
+    [True, False]
+    """
+    getters = unit_tables(n).getters
+    result = []
+    for grid in grids:
+        ok = True
+        for get in getters:
+            values = get(grid)
+            blanks = values.count(empty)
+            if len(set(values)) != n - blanks + (1 if blanks else 0):
+                ok = False
+                break
+        result.append(ok)
+    return result
+
+
+def batch_is_solved(grids, n=9, empty="*", symbol_set=None):
+    """
+    Return a list saying, for each grid in grids, whether it is
+    completely and validly filled.  If symbol_set is given, grids using
+    any other symbol are not solved.
+
+    @type grids: iterable[str | list[str]]
+    @type n: int
+    @type empty: str
+    @type symbol_set: set[str] | None
+    @rtype: list[bool]
+
+    >>> batch_is_solved(["ABCDCDABBADCDCBA", "ABCDCDABBADCDCB*"], 4)
+    [True, False]
+    """
+    getters = unit_tables(n).getters
+    result = []
+    for grid in grids:
+        result.append(empty not in grid and
+                      (symbol_set is None or set(grid) <= symbol_set) and
+                      all(len(set(get(grid))) == n for get in getters))
+    return result
+
+
+def batch_score(grids, n=9, symbol_set=None, empty="*"):
+    """
+    Return SudokuGrid.score() for each grid in grids.  The symbols are
+    symbol_set, or "1" .. str(n) when symbol_set is None.
+
+    @type grids: iterable[str | list[str]]
+    @type n: int
+    @type symbol_set: set[str] | None
+    @type empty: str
+    @rtype: list[(int, int, bool)]
+
+    >>> batch_score(["ABCDCDABBADCDCB*"], 4, {"A", "B", "C", "D"})
+    [(15, 1, False)]
+    """
+    if symbol_set is None:
+        symbol_set = {str(k) for k in range(1, n + 1)}
+    return [SudokuGrid.from_symbols(n, grid, symbol_set, empty).score()
+            for grid in grids]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
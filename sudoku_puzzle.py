@@ -1,4 +1,5 @@
 from puzzle import Puzzle
+from sudoku_grid import SudokuGrid, popcount
 
 
 class SudokuPuzzle(Puzzle):
@@ -6,6 +7,9 @@ class SudokuPuzzle(Puzzle):
     A sudoku puzzle that may be solved, unsolved, or even unsolvable.
     """
 
+    # every extension fills an open position
+    acyclic = True
+
     def __init__(self, n, symbols, symbol_set):
         """
         Create a new nxn SudokuPuzzle self with symbols
@@ -22,6 +26,8 @@ class SudokuPuzzle(Puzzle):
         assert len(symbol_set) == n
         assert len(symbols) == n ** 2
         self._n, self._symbols, self._symbol_set = n, symbols, symbol_set
+        # integer codes for symbols, built on first use by grid()
+        self._grid = None
 
     def __eq__(self, other):
         """
@@ -130,18 +136,85 @@ class SudokuPuzzle(Puzzle):
         >>> s.is_solved()
         False
         """
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # no "*" left and all rows, column, subsquares have correct symbols
-        return ("*" not in symbols and
-                all([(self._row_set(i) == self._symbol_set and
-                      self._column_set(i) == self._symbol_set and
-                      self._subsquare_set(i) ==
-                      self._symbol_set) for i in range(n ** 2)]))
+        # no "*" left and no row, column or subsquare repeats a symbol
+        return "*" not in self._symbols and self.grid().is_solved()
+
+    def encode_state(self):
+        """
+        Return the symbol codes of SudokuPuzzle self, one byte each.
+
+        @type self: SudokuPuzzle
+        @rtype: bytes
+
+        >>> s = SudokuPuzzle(4, ["A", "*", "*", "*"] * 4, {"A", "B", "C", "D"})
+        >>> s.encode_state()[:4]
+        b'\\x01\\x00\\x00\\x00'
+        >>> s.decode_state(s.encode_state()) == s
+        True
+        """
+        return bytes(self.grid().cells)
+
+    def decode_state(self, data):
+        """
+        Return the SudokuPuzzle with the symbol codes in data and the
+        size and symbols of SudokuPuzzle self.
+
+        @type self: SudokuPuzzle
+        @type data: bytes
+        @rtype: SudokuPuzzle
+        """
+        grid = SudokuGrid(self._n, data, self.grid().symbols)
+        result = SudokuPuzzle(self._n, grid.to_symbols(), self._symbol_set)
+        result._grid = grid
+        return result
+
+    def context_key(self):
+        """
+        Return the size and symbols of SudokuPuzzle self.
+
+        @type self: SudokuPuzzle
+        @rtype: str
+
+        >>> SudokuPuzzle(4, ["*"] * 16, {"A", "B", "C", "D"}).context_key()
+        '4:ABCD'
+        """
+        return "{}:{}".format(self._n, "".join(sorted(self._symbol_set)))
+
+    def heuristic(self):
+        """
+        Return the number of empty positions of SudokuPuzzle self, each
+        filled by one extension.
+
+        @type self: SudokuPuzzle
+        @rtype: int
+
+        >>> SudokuPuzzle(4, ["A", "*", "*", "*"] * 4, {"A", "B", "C", "D"}).\
+heuristic()
+        12
+        """
+        return self._symbols.count("*")
+
+    def move_to(self, child):
+        """
+        Return the position that SudokuPuzzle self fills to reach its
+        extension child, and the symbol it puts there.
+
+        @type self: SudokuPuzzle
+        @type child: SudokuPuzzle
+        @rtype: (int, str)
+
+        >>> s = SudokuPuzzle(4, ["A", "*", "*", "*"] * 4, {"A", "B", "C", "D"})
+        >>> s.move_to(s.extensions()[0])
+        (1, 'B')
+        """
+        i = next(m for m, (a, b) in enumerate(zip(self._symbols,
+                                                  child._symbols)) if a != b)
+        return i, child._symbols[i]
 
     def extensions(self):
         """
-        Return list of extensions of SudokuPuzzle self.
+        Return list of extensions of SudokuPuzzle self: each way of
+        filling the empty position with the fewest symbols allowed.
 
         @type self: Puzzle
         @rtype: list[Puzzle]
@@ -162,24 +235,68 @@ class SudokuPuzzle(Puzzle):
         True
         """
         # convenient names
-        symbols, symbol_set, n = self._symbols, self._symbol_set, self._n
+        symbols, n = self._symbols, self._n
         if "*" not in symbols:
             # return an empty generator
             return [_ for _ in []]
         else:
-            # position of first empty position
-            i = symbols.index("*")
-            # allowed symbols at position i
-            # A | B == A.union(B)
-            allowed_symbols = (self._symbol_set -
-                               (self._row_set(i) |
-                                self._column_set(i) |
-                                self._subsquare_set(i)))
+            # allowed codes at each position: those unused in its units
+            grid = self.grid()
+            masks = grid.candidate_masks()
+            # the empty position with the fewest allowed codes, so that
+            # forced positions are filled first and dead ends found early
+            i = min((m for m, c in enumerate(grid.cells) if not c),
+                    key=lambda m: popcount(masks[m]))
+            mask = masks[i]
             # list of SudokuPuzzles with each legal digit at position i
-            return (
-                [SudokuPuzzle(n,
-                 symbols[:i] + [d] + symbols[i + 1:], symbol_set)
-                 for d in allowed_symbols])
+            return [self._filled(i, k) for k in range(1, n + 1)
+                    if mask & (1 << k)]
+
+    def _filled(self, i, k):
+        # Return the SudokuPuzzle with code k at empty position i of
+        # self, sharing the parent's codes
+        grid = self.grid()
+        child = SudokuPuzzle(
+            self._n, self._symbols[:i] + [grid.symbols[k - 1]] +
+            self._symbols[i + 1:], self._symbol_set)
+        cells = grid.cells[:]
+        cells[i] = k
+        child._grid = SudokuGrid(self._n, cells, grid.symbols)
+        return child
+
+    def step_toward(self, solved):
+        """
+        Return SudokuPuzzle self with the empty position allowing the
+        fewest symbols filled as in solved, or None if self is full or
+        disagrees with solved anywhere.
+
+        @type self: SudokuPuzzle
+        @type solved: SudokuPuzzle
+        @rtype: SudokuPuzzle | None
+
+        >>> solved = SudokuPuzzle(4, list("ABCDCDABBADCDCBA"), \
+{"A", "B", "C", "D"})
+        >>> s = SudokuPuzzle(4, list("A***C*A**A**D**A"), \
+{"A", "B", "C", "D"})
+        >>> print(s.step_toward(solved))
+        A*|**
+        C*|A*
+        -----
+        BA|**
+        D*|*A
+        >>> s.step_toward(SudokuPuzzle(4, list("ABCDCDABDCBABADC"), \
+{"A", "B", "C", "D"})) is None
+        True
+        """
+        cells, target = self.grid().cells, solved.grid().cells
+        if any(c and c != t for c, t in zip(cells, target)):
+            return None
+        masks = self.grid().candidate_masks()
+        empty = [m for m, c in enumerate(cells) if not c]
+        if not empty:
+            return None
+        i = min(empty, key=lambda m: popcount(masks[m]))
+        return self._filled(i, target[i])
 
     def fail_fast(self):
         # override fail_fast
@@ -215,70 +332,28 @@ class SudokuPuzzle(Puzzle):
 
         """
 
-        for i in range(len(self._symbols)):
-
-            if self._symbols[i] == "*":
-
-                possible = (self._symbol_set -
-                            (self._row_set(i) |
-                                self._column_set(i) |
-                                self._subsquare_set(i)))
+        return self.grid().fail_fast()
 
-                if len(possible) == 0:
-                    return True
-
-        return False
+    def grid(self):
+        """
+        Return the array-backed SudokuGrid with the contents of self,
+        encoding the symbols the first time it is needed.
 
-    # some helper methods
-    def _row_set(self, m):
-        #
-        # Return set of symbols in row of SudokuPuzzle self's symbols
-        # where position m occurs.
-        #
-        # @type self: SudokuPuzzle
-        # @type m: int
-        assert 0 <= m < self._n ** 2
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # first position in m's row
-        r = (m // n) * n
-        # set of elements from symbols[r] .. symbols[r+n-1]
-        return set([symbols[r + i] for i in range(n)])
-
-    def _column_set(self, m):
-        # Return set of symbols in column of SudokuPuzzle self's symbols
-        # where position m occurs.
-        #
-        # @type self: SudokuPuzzle
-        # @type m: int
-        assert 0 <= m <= self._n ** 2
-        # convenient names
-        symbols, n = self._symbols, self._n
-        # first position in m's column
-        c = m % n
-        # set of elements from symbols[c], symbols[c + n],
-        # ... symbols[c + (n * (n-1))]
-        return set([symbols[c + (i * n)] for i in range(n)])
-
-    def _subsquare_set(self, m):
-        # Return set of symbols in subsquare of SudokuPuzzle self's symbols
-        # where position m occurs.
-        #
-        # @type self: Sudoku Puzzle
-        # @type m: int
-        assert 0 <= m < self._n ** 2
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # row, column where m occur
-        row, col = m // n, m % n
-        # length of subsquares
-        ss = round(n ** (1 / 2))
-        # upper-left position of m's subsquare
-        ul = (((row // ss) * ss) * n) + ((col // ss) * ss)
-        # return set of symbols from subsquare starting at ul
-        return set(
-            [symbols[ul + i + n * j] for i in range(ss) for j in range(ss)])
+        @type self: SudokuPuzzle
+        @rtype: SudokuGrid
 
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["C", "D", "A", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> list(s.grid().cells[-4:])
+        [4, 3, 2, 0]
+        """
+        if self._grid is None:
+            self._grid = SudokuGrid.from_symbols(self._n, self._symbols,
+                                                 self._symbol_set)
+        return self._grid
 
 if __name__ == "__main__":
     import doctest
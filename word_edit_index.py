@@ -0,0 +1,242 @@
+"""
+Word sets: fingerprints that change with their words, and a deletion
+index (as in SymSpell) finding the words one edit away from a word by
+dictionary lookups instead of trying every character of an alphabet.
+"""
+from collections import OrderedDict
+import hashlib
+
+# word sets remembered by word_set_fingerprint and by intern_word_set,
+# each forgetting the least recently used first
+FINGERPRINT_CACHE_SIZE = 16
+# word_set_fingerprint results by id of the word set: (word set, its
+# size, fingerprint), keeping each word set alive so its id stays unique
+_FINGERPRINTS = OrderedDict()
+# the word set intern_word_set returns, by fingerprint
+_INTERNED = OrderedDict()
+
+
+def _remember(cache, key, value):
+    # Put value in cache at key as the most recently used, forgetting
+    # the least recently used beyond FINGERPRINT_CACHE_SIZE
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > FINGERPRINT_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def word_set_fingerprint(ws):
+    """
+    Return a digest of the words in ws, which changes when the words do.
+
+    Digests are remembered for the FINGERPRINT_CACHE_SIZE word set
+    objects used most recently and recomputed when their size changes;
+    call forget_fingerprint(ws) after editing a word set in place
+    without changing its size.
+
+    @type ws: set[str]
+    @rtype: str
+
+    >>> word_set_fingerprint({"cast", "vase"}) == \
+word_set_fingerprint({"vase", "cast"})
+    True
+    >>> word_set_fingerprint({"cast"}) == word_set_fingerprint({"vase"})
+    False
+    >>> for n in range(2 * FINGERPRINT_CACHE_SIZE):
+    ...     _ = word_set_fingerprint({str(n)})
+    >>> len(_FINGERPRINTS) == FINGERPRINT_CACHE_SIZE
+    True
+    """
+    known = _FINGERPRINTS.get(id(ws))
+    if known is None or known[0] is not ws or known[1] != len(ws):
+        digest = hashlib.sha1("\n".join(sorted(ws)).encode()).hexdigest()
+        known = (ws, len(ws), digest[:16])
+    _remember(_FINGERPRINTS, id(ws), known)
+    return known[2]
+
+
+def intern_word_set(ws):
+    """
+    Return the first word set seen holding the same words as ws, or ws
+    itself if there is none, so that puzzles over equal word sets share
+    one object and can compare them by identity.  Only the
+    FINGERPRINT_CACHE_SIZE word sets interned most recently are
+    remembered.
+
+    @type ws: set[str]
+    @rtype: set[str]
+
+    >>> ws = {"cast", "vase"}
+    >>> intern_word_set(ws) is ws
+    True
+    >>> intern_word_set({"vase", "cast"}) is ws
+    True
+    """
+    digest = word_set_fingerprint(ws)
+    known = _INTERNED.get(digest)
+    # a word set edited since it was interned no longer stands for it
+    if known is None or (known is not ws and
+                         word_set_fingerprint(known) != digest):
+        known = ws
+    _remember(_INTERNED, digest, known)
+    return known
+
+
+def forget_fingerprint(ws):
+    """
+    Forget the remembered fingerprint of word set ws.
+
+    @type ws: set[str]
+    @rtype: None
+    """
+    _FINGERPRINTS.pop(id(ws), None)
+
+
+# EditIndexes kept, by word set fingerprint, most recently used last
+INDEX_CACHE_SIZE = 4
+_INDEXES = OrderedDict()
+# frozensets of alphabets, by alphabet
+_CHARSETS = {}
+
+
+def _charset(chars):
+    # Return the shared frozenset of the characters in chars
+    if chars not in _CHARSETS:
+        _CHARSETS[chars] = frozenset(chars)
+    return _CHARSETS[chars]
+
+
+class EditIndex:
+    """
+    Every word of a word set, numbered in sorted order, and for each
+    word with one letter deleted the words it comes from.  deletes maps
+    such a string to codes id * span + position: the word's id and the
+    position of the deleted letter.
+
+    Words one substitution apart at position p share their deletion at
+    p, a word with one letter inserted has the word itself among its
+    deletions, so all neighbours at one edit are found by looking up
+    the deletions of a word and the word itself.
+    """
+
+    def __init__(self, ws):
+        """
+        Create a new EditIndex self over the words in ws.
+
+        @type self: EditIndex
+        @type ws: set[str]
+        @rtype: None
+        """
+        self.words = sorted(ws)
+        self.ids = {w: i for i, w in enumerate(self.words)}
+        self.span = max((len(w) for w in self.words), default=0) + 1
+        self.deletes = {}
+        span, deletes = self.span, self.deletes
+        for i, w in enumerate(self.words):
+            for p in range(len(w)):
+                key = w[:p] + w[p + 1:]
+                if key in deletes:
+                    deletes[key].append(i * span + p)
+                else:
+                    deletes[key] = [i * span + p]
+
+    def successors(self, word, chars, indels=False):
+        """
+        Return the words of self one step from word: the same word with
+        one letter changed to one of chars and, when indels is True,
+        with one letter of chars inserted or with one letter deleted.
+        Words are ordered by position, then by the letter there.
+
+        @type self: EditIndex
+        @type word: str
+        @type chars: str
+        @type indels: bool
+        @rtype: list[str]
+
+        >>> index = EditIndex({"cast", "case", "cat", "cats", "vast"})
+        >>> index.successors("cast", "abcdefghijklmnopqrstuvwxyz")
+        ['vast', 'case']
+        >>> index.successors("cast", "abcdefghijklmnopqrstuvwxyz", True)
+        ['vast', 'cat', 'case']
+        >>> index.successors("cat", "abcdefghijklmnopqrstuvwxyz", True)
+        ['cast', 'cats']
+        """
+        return self._neighbours(word, _charset(chars), indels, False)
+
+    def predecessors(self, word, chars, indels=False):
+        """
+        Return the words of self from which word is one step, as for
+        successors.
+
+        @type self: EditIndex
+        @type word: str
+        @type chars: str
+        @type indels: bool
+        @rtype: list[str]
+
+        >>> index = EditIndex({"cast", "cat", "Cat"})
+        >>> index.predecessors("cast", "abcdefghijklmnopqrstuvwxyz", True)
+        ['cat']
+        >>> index.successors("Cat", "abcdefghijklmnopqrstuvwxyz")
+        ['cat']
+        >>> index.predecessors("Cat", "abcdefghijklmnopqrstuvwxyz")
+        []
+        """
+        return self._neighbours(word, _charset(chars), indels, True)
+
+    def _neighbours(self, word, charset, indels, reverse):
+        # Return the successors of word, or its predecessors if reverse.
+        # A step must put a letter of charset into the word, so going
+        # backwards it is the letter of word that has to be in charset
+        words, ids, span, deletes = (self.words, self.ids, self.span,
+                                     self.deletes)
+        result, seen = [], {word}
+        for p in range(len(word)):
+            key = word[:p] + word[p + 1:]
+            if not reverse or word[p] in charset:
+                # substitutions at p
+                for code in deletes.get(key, ()):
+                    w = words[code // span]
+                    if (code % span == p and w not in seen and
+                            (reverse or w[p] in charset)):
+                        seen.add(w)
+                        result.append(w)
+                # deleting the letter at p, or inserting it going back
+                if indels and key in ids and key not in seen:
+                    seen.add(key)
+                    result.append(key)
+        if indels:
+            # inserting a letter, or deleting it going back
+            for code in deletes.get(word, ()):
+                w = words[code // span]
+                if w not in seen and (reverse or w[code % span] in charset):
+                    seen.add(w)
+                    result.append(w)
+        return result
+
+
+def edit_index(ws):
+    """
+    Return the shared EditIndex for ws, building it only if it is not
+    among the INDEX_CACHE_SIZE most recently used.
+
+    @type ws: set[str]
+    @rtype: EditIndex
+
+    >>> ws = {"cast", "vast"}
+    >>> edit_index(ws) is edit_index(ws)
+    True
+    """
+    key = word_set_fingerprint(ws)
+    if key in _INDEXES:
+        _INDEXES.move_to_end(key)
+    else:
+        _INDEXES[key] = EditIndex(ws)
+        if len(_INDEXES) > INDEX_CACHE_SIZE:
+            _INDEXES.popitem(last=False)
+    return _INDEXES[key]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
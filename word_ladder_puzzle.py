@@ -1,26 +1,183 @@
 from puzzle import Puzzle
+from move_ordering import HeuristicOrder
+from math import log2
+import os
+from word_edit_index import (edit_index, word_set_fingerprint,
+                             forget_fingerprint, intern_word_set)
+
+# the characters a step may change a letter to, unless given
+LOWERCASE = "abcdefghijklmnopqrstuvwxyz"
+
+# word counts, "word count" per line, looked for next to the words file
+FREQUENCY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "words.freq")
+
+
+class WordCosts:
+    """
+    The cost of stepping onto each word, lower for more frequent words:
+    1 + log2(the largest count / the word's count), so every step costs
+    at least 1.  Words without a count cost as much as a word seen once.
+    """
+
+    def __init__(self, counts):
+        """
+        Create the WordCosts self for the word counts in counts.
+
+        @type self: WordCosts
+        @type counts: dict[str, int]
+        @rtype: None
+
+        >>> costs = WordCosts({"the": 8, "cat": 2})
+        >>> costs.cost("the"), costs.cost("cat"), costs.cost("cwm")
+        (1.0, 3.0, 4.0)
+        """
+        top = max(counts.values(), default=1)
+        self._costs = {w: 1 + log2(top / max(c, 1))
+                       for w, c in counts.items()}
+        self.unknown = 1 + log2(top)
+
+    def cost(self, word):
+        """
+        Return the cost of stepping onto word.
+
+        @type self: WordCosts
+        @type word: str
+        @rtype: float
+        """
+        return self._costs.get(word, self.unknown)
+
+
+def load_word_costs(path=FREQUENCY_PATH):
+    """
+    Return the WordCosts for the word counts in the file at path, or
+    None if there is no such file.
+
+    @type path: str
+    @rtype: WordCosts | None
+    """
+    if not os.path.exists(path):
+        return None
+    counts = {}
+    with open(path, "r") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 2:
+                counts[fields[0]] = int(fields[1])
+    return WordCosts(counts)
+
+
+class LadderContext:
+    """
+    What every configuration of a word ladder shares: the target word,
+    the word set, the characters a step may use, whether steps may
+    insert and delete characters, and the costs of words.
+    """
+
+    __slots__ = ("to_word", "word_set", "chars", "indels", "costs")
+
+    def __init__(self, to_word, ws, chars=LOWERCASE, indels=False,
+                 costs=None):
+        """
+        Create a new LadderContext self.
+
+        @type self: LadderContext
+        @type to_word: str
+        @type ws: set[str]
+        @type chars: str
+        @type indels: bool
+        @type costs: WordCosts | None
+        @rtype: None
+        """
+        self.to_word, self.word_set, self.chars = to_word, ws, chars
+        self.indels, self.costs = indels, costs
+
+    def __eq__(self, other):
+        """
+        Return whether LadderContext self and other describe the same
+        ladders, comparing word sets by identity before their words.
+
+        @type self: LadderContext
+        @type other: LadderContext | Any
+        @rtype: bool
+
+        >>> LadderContext("vase", {"cast"}) == LadderContext("vase", {"cast"})
+        True
+        """
+        return self is other or (
+            type(other) == type(self) and self.to_word == other.to_word and
+            self.chars == other.chars and self.indels == other.indels and
+            (self.word_set is other.word_set or
+             self.word_set == other.word_set))
 
 
 class WordLadderPuzzle(Puzzle):
     """
     A word-ladder puzzle that may be solved, unsolved, or even unsolvable.
+
+    Each configuration holds only its word and the LadderContext that
+    every configuration of the puzzle shares.
     """
 
-    def __init__(self, from_word, to_word, ws):
+    __slots__ = ("_from_word", "_context")
+
+    # every step between two words can be taken back
+    reversible = True
+    # depth-first search tries the words closest to the target first
+    move_order = HeuristicOrder()
+
+    def __init__(self, from_word, to_word, ws, chars=LOWERCASE, indels=False,
+                 costs=None):
         """
         Create a new word-ladder puzzle with the aim of stepping
         from from_word to to_word using words in ws, changing one
-        character at each step.
+        character to one of chars at each step.  When indels is True a
+        step may also insert one of chars or delete a character.
+
+        Puzzles with indels or another alphabet find their steps in the
+        shared EditIndex of ws instead of trying every character.
+
+        Each step costs 1, or the cost in costs of the word stepped onto.
+
+        Puzzles compare word sets by identity before their words, so
+        word lists loaded more than once should go through
+        intern_word_set, making equal word sets one object.
 
         @type from_word: str
         @type to_word: str
         @type ws: set[str]
+        @type chars: str
+        @type indels: bool
+        @type costs: WordCosts | None
         @rtype: None
         """
-        (self._from_word, self._to_word, self._word_set) = (from_word,
-                                                            to_word, ws)
+        self._from_word = from_word
+        self._context = LadderContext(to_word, ws, chars, indels, costs)
+
+    @property
+    def _to_word(self):
+        # the target word
+        return self._context.to_word
+
+    @property
+    def _word_set(self):
+        # the words a ladder may use
+        return self._context.word_set
+
+    @property
+    def _chars(self):
         # set of characters to use for 1-character changes
-        self._chars = "abcdefghijklmnopqrstuvwxyz"
+        return self._context.chars
+
+    @property
+    def _indels(self):
+        # whether a step may insert or delete a character
+        return self._context.indels
+
+    @property
+    def _costs(self):
+        # the WordCosts of steps, or None when every step costs 1
+        return self._context.costs
 
         # implement __eq__ and __str__
         # __repr__ is up to you
@@ -52,8 +209,40 @@ class WordLadderPuzzle(Puzzle):
 
         return (type(other) == type(self) and
                 self._from_word == other._from_word and
-                self._to_word == other._to_word and
-                self._word_set == other._word_set)
+                self._context == other._context)
+
+    def __hash__(self):
+        """
+        Return a hash of WordLadderPuzzle self, from its words.
+
+        :type self: WordLadderPuzzle
+        :rtype: int
+
+        >>> hash(WordLadderPuzzle("cast", "vase", {"cast"})) == \
+hash(WordLadderPuzzle("cast", "vase", {"vase"}))
+        True
+        """
+        return hash((self._from_word, self._context.to_word))
+
+    def state_key(self):
+        """
+        Return from_word of WordLadderPuzzle self, all that differs
+        between the configurations of one puzzle.
+
+        :type self: WordLadderPuzzle
+        :rtype: str
+
+        >>> WordLadderPuzzle("cast", "vase", set()).state_key()
+        'cast'
+        """
+        return self._from_word
+
+    def _step(self, word):
+        # Return the WordLadderPuzzle stepping from word, sharing
+        # everything else with self
+        result = WordLadderPuzzle.__new__(WordLadderPuzzle)
+        result._from_word, result._context = word, self._context
+        return result
 
     def __str__(self):
         """
@@ -108,11 +297,25 @@ class WordLadderPuzzle(Puzzle):
         WordLadderPuzzle('case', to_word, word_set)]
         >>> new_list == puzzle.extensions()
         True
+        >>> ws = {"cast", "cat", "cats", "CAST"}
+        >>> [str(p) for p in WordLadderPuzzle("cast", "cats", ws, \
+indels=True).extensions()]
+        ['cat --> cats']
+        >>> [str(p) for p in WordLadderPuzzle("CAST", "CASE", \
+{"CAST", "CASE", "case"}, "ABCDEFGHIJKLMNOPQRSTUVWXYZ").extensions()]
+        ['CASE --> CASE']
         """
 
-        good_words = []
-        from_word, to_word, ws, chars = self._from_word, self._to_word, \
-            self._word_set, self._chars
+        context = self._context
+        from_word, ws, chars = self._from_word, context.word_set, context.chars
+        if context.indels or chars != LOWERCASE:
+            if self.is_solved():
+                return []
+            return [self._step(q)
+                    for q in edit_index(ws).successors(from_word, chars,
+                                                       context.indels)]
+
+        good_words, found = [], {from_word}
 
         if not self.is_solved():
             word_list = []
@@ -122,11 +325,46 @@ class WordLadderPuzzle(Puzzle):
                     word_list.append(from_word[:i] + q + from_word[i + 1:])
 
             for word in word_list:
-                if (word in ws) and (word not in good_words) and \
-                        (word != from_word):
+                if (word in ws) and (word not in found):
                     good_words.append(word)
+                    found.add(word)
+
+        return [self._step(q) for q in good_words]
+
+    def goal_state(self):
+        """
+        Return the WordLadderPuzzle at the target word of self, or None if
+        the target is not in the word set, so no step can reach it.
 
-        return [WordLadderPuzzle(q, to_word, ws) for q in good_words]
+        :type self: WordLadderPuzzle
+        :rtype: WordLadderPuzzle | None
+
+        >>> print(WordLadderPuzzle("cast", "vase", {"vase"}).goal_state())
+        vase --> vase
+        >>> print(WordLadderPuzzle("cast", "vase", set()).goal_state())
+        None
+        """
+        context = self._context
+        if context.to_word not in context.word_set:
+            return None
+        return self._step(context.to_word)
+
+    def predecessors(self):
+        """
+        Return the WordLadderPuzzles one step from whose words the word
+        of self is, found in the shared EditIndex of the word set.
+
+        :type self: WordLadderPuzzle
+        :rtype: list[WordLadderPuzzle]
+
+        >>> ws = {"cast", "case", "vase", "vast"}
+        >>> [str(p) for p in WordLadderPuzzle("vase", "vase", ws).\
+predecessors()]
+        ['case --> vase', 'vast --> vase']
+        """
+        context = self._context
+        return [self._step(q) for q in edit_index(context.word_set).
+                predecessors(self._from_word, context.chars, context.indels)]
 
     def is_solved(self):
         """
@@ -144,7 +382,113 @@ class WordLadderPuzzle(Puzzle):
         True
         """
 
-        return self._from_word == self._to_word
+        return self._from_word == self._context.to_word
+
+    def encode_state(self):
+        """
+        Return from_word of WordLadderPuzzle self as UTF-8 bytes.
+
+        :type self: WordLadderPuzzle
+        :rtype: bytes
+
+        >>> p = WordLadderPuzzle("cast", "vase", {"cast", "vase"})
+        >>> p.encode_state()
+        b'cast'
+        >>> p.decode_state(b'vase').is_solved()
+        True
+        """
+        return self._from_word.encode()
+
+    def decode_state(self, data):
+        """
+        Return the WordLadderPuzzle stepping from the word encoded in
+        data, with the target, word set and moves of WordLadderPuzzle self.
+
+        :type self: WordLadderPuzzle
+        :type data: bytes
+        :rtype: WordLadderPuzzle
+        """
+        return self._step(data.decode())
+
+    def context_key(self):
+        """
+        Return the target word of WordLadderPuzzle self and the
+        fingerprint of its word set, followed by its alphabet and
+        whether it allows insertions and deletions, if not the default.
+
+        :type self: WordLadderPuzzle
+        :rtype: str
+        """
+        key = "{}:{}".format(self._to_word,
+                             word_set_fingerprint(self._word_set))
+        if self._chars != LOWERCASE or self._indels:
+            key += ":{}:{}".format(self._chars, int(self._indels))
+        return key
+
+    def step_cost(self, child):
+        """
+        Return the cost of the step from WordLadderPuzzle self to its
+        extension child: the cost of the word of child, or 1 without
+        word costs.
+
+        :type self: WordLadderPuzzle
+        :type child: WordLadderPuzzle
+        :rtype: float
+
+        >>> ws, costs = {"cast", "case"}, WordCosts({"cast": 4, "case": 1})
+        >>> p = WordLadderPuzzle("cast", "case", ws, costs=costs)
+        >>> p.step_cost(p.extensions()[0])
+        3.0
+        """
+        costs = self._context.costs
+        if costs is None:
+            return 1
+        return costs.cost(child._from_word)
+
+    def move_to(self, child):
+        """
+        Return the step from WordLadderPuzzle self to its extension
+        child: the first position where their words differ, the
+        character child has there ("" for a deletion) and the change in
+        length.
+
+        :type self: WordLadderPuzzle
+        :type child: WordLadderPuzzle
+        :rtype: (int, str, int)
+
+        >>> p = WordLadderPuzzle("cast", "vase", set())
+        >>> p.move_to(WordLadderPuzzle("case", "vase", set()))
+        (3, 'e', 0)
+        >>> p.move_to(WordLadderPuzzle("cat", "vase", set()))
+        (2, '', -1)
+        """
+        word, new = self._from_word, child._from_word
+        p = 0
+        while p < len(word) and p < len(new) and word[p] == new[p]:
+            p += 1
+        grows = len(new) - len(word)
+        return p, new[p] if grows >= 0 else "", grows
+
+    def heuristic(self):
+        """
+        Return the number of positions where from_word and to_word of
+        WordLadderPuzzle self differ, each needing at least one step.
+        With insertions and deletions only the difference in length is
+        certain to need that many steps.
+
+        :type self: WordLadderPuzzle
+        :rtype: int
+
+        >>> WordLadderPuzzle("cast", "vase", set()).heuristic()
+        2
+        >>> WordLadderPuzzle("cast", "at", set(), indels=True).heuristic()
+        2
+        """
+        from_word, to_word = self._from_word, self._context.to_word
+        if self._context.indels:
+            return max(abs(len(from_word) - len(to_word)),
+                       int(from_word != to_word))
+        return sum(a != b for a, b in zip(from_word, to_word))
 
 if __name__ == '__main__':
     import doctest
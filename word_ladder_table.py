@@ -0,0 +1,263 @@
+"""
+Distances to a target word from every word at once, by one breadth-first
+search backwards from the target over the word graph, so that any
+WordLadderPuzzle with that target is solved by following next hops.
+"""
+from array import array
+from collections import OrderedDict
+from puzzle_tools import _chain
+from word_edit_index import edit_index
+from word_ladder_puzzle import (WordLadderPuzzle, word_set_fingerprint,
+                                LOWERCASE)
+
+# LadderTables kept, most recently used last
+TABLE_CACHE_SIZE = 64
+_TABLES = OrderedDict()
+# word indexes kept, by word set fingerprint and word length
+INDEX_CACHE_SIZE = 16
+_INDEXES = OrderedDict()
+
+
+def _cached(cache, size, key, make):
+    # Return cache[key], calling make() for it if missing, and evict
+    # the least recently used entries beyond size
+    if key in cache:
+        cache.move_to_end(key)
+    else:
+        cache[key] = make()
+        if len(cache) > size:
+            cache.popitem(last=False)
+    return cache[key]
+
+
+class WordIndex:
+    """
+    The words of some length in a word set, numbered in sorted order,
+    with buckets of word ids sharing every letter but one: buckets[p]
+    maps a word with position p removed to the ids of the words it
+    comes from.
+    """
+
+    def __init__(self, ws, length):
+        """
+        Create a new WordIndex self for the words of length in ws.
+
+        @type self: WordIndex
+        @type ws: set[str]
+        @type length: int
+        @rtype: None
+        """
+        self.words = sorted(w for w in ws if len(w) == length)
+        self.ids = {w: i for i, w in enumerate(self.words)}
+        self.buckets = [{} for _ in range(length)]
+        for i, w in enumerate(self.words):
+            for p, bucket in enumerate(self.buckets):
+                bucket.setdefault(w[:p] + w[p + 1:], []).append(i)
+
+
+def word_index(ws, length):
+    """
+    Return the shared WordIndex for the words of length in ws.
+
+    @type ws: set[str]
+    @type length: int
+    @rtype: WordIndex
+    """
+    return _cached(_INDEXES, INDEX_CACHE_SIZE,
+                   (word_set_fingerprint(ws), length),
+                   lambda: WordIndex(ws, length))
+
+
+class LadderTable:
+    """
+    Shortest ladder lengths to target over a word set.  dist[i] is the
+    number of steps from word i of index to target, or -1 if there is
+    no ladder, and next_hop[i] the id of the word one step closer.
+
+    Without insertions and deletions only words of the length of target
+    can reach it, and index is their WordIndex; with them, index is the
+    EditIndex of the whole word set.
+    """
+
+    def __init__(self, ws, target, chars=LOWERCASE, indels=False):
+        """
+        Create the LadderTable self for ladders to target in ws, each
+        step changing one letter to one of chars or, when indels is
+        True, also inserting one of chars or deleting a letter.
+
+        @type self: LadderTable
+        @type ws: set[str]
+        @type target: str
+        @type chars: str
+        @type indels: bool
+        @rtype: None
+
+        >>> ws = {"cast", "cat", "at", "vat"}
+        >>> LadderTable(ws, "at", indels=True).path("cast")
+        ['cast', 'cat', 'at']
+        """
+        self.target, self.chars, self.indels = target, chars, indels
+        self.index = index = (edit_index(ws) if indels else
+                              word_index(ws, len(target)))
+        n = len(index.words)
+        self.dist = array("i", [-1]) * n
+        self.next_hop = array("i", [-1]) * n
+        start = index.ids.get(target)
+        if start is None:
+            return
+        words, dist, next_hop = index.words, self.dist, self.next_hop
+        dist[start] = 0
+        queue = [start]
+        if indels:
+            ids, predecessors = index.ids, index.predecessors
+            for v in queue:
+                d = dist[v] + 1
+                for word in predecessors(words[v], chars, True):
+                    u = ids[word]
+                    if dist[u] < 0:
+                        dist[u], next_hop[u] = d, v
+                        queue.append(u)
+            return
+        buckets = index.buckets
+        # a step from u to v changes position p of u to v[p], which
+        # must be one of chars
+        for v in queue:
+            word, d = words[v], dist[v] + 1
+            for p, bucket in enumerate(buckets):
+                if word[p] not in chars:
+                    continue
+                for u in bucket[word[:p] + word[p + 1:]]:
+                    if dist[u] < 0:
+                        dist[u], next_hop[u] = d, v
+                        queue.append(u)
+
+    def _entry(self, word):
+        # Return the id of the first word in the ladder from word that
+        # is in the index, and the steps taken to reach it, or (None, 0)
+        ids = self.index.ids
+        if word in ids:
+            return ids[word], 0
+        if self.indels:
+            firsts = self.index.successors(word, self.chars, True)
+        elif len(word) != len(self.target):
+            return None, 0
+        else:
+            firsts = [word[:p] + c + word[p + 1:]
+                      for p in range(len(word)) for c in self.chars]
+        # word is not in the word set, but a first step may lead into it
+        best = None
+        for first in firsts:
+            i = ids.get(first)
+            if i is not None and self.dist[i] >= 0 and (
+                    best is None or self.dist[i] < self.dist[best]):
+                best = i
+        return best, 1
+
+    def distance(self, word):
+        """
+        Return the number of steps in a shortest ladder from word to the
+        target of self, or None if there is none.
+
+        @type self: LadderTable
+        @type word: str
+        @rtype: int | None
+
+        >>> table = LadderTable({"cast", "case", "vase", "cost"}, "vase")
+        >>> table.distance("cast"), table.distance("cost")
+        (2, 3)
+        >>> table.distance("mast"), table.distance("cusp")
+        (3, None)
+        """
+        if word == self.target:
+            return 0
+        i, steps = self._entry(word)
+        if i is None or self.dist[i] < 0:
+            return None
+        return self.dist[i] + steps
+
+    def path(self, word):
+        """
+        Return the words of a shortest ladder from word to the target of
+        self, or None if there is none.
+
+        @type self: LadderTable
+        @type word: str
+        @rtype: list[str] | None
+
+        >>> LadderTable({"cast", "case", "vase"}, "vase").path("cast")
+        ['cast', 'case', 'vase']
+        """
+        if word == self.target:
+            return [word]
+        i, steps = self._entry(word)
+        if i is None or self.dist[i] < 0:
+            return None
+        words, next_hop = self.index.words, self.next_hop
+        result = [word] if steps else []
+        while i >= 0:
+            result.append(words[i])
+            i = next_hop[i]
+        return result
+
+    def reachable(self):
+        """
+        Return a dict mapping every word of the word set with a ladder to
+        the target of self to its number of steps.
+
+        @type self: LadderTable
+        @rtype: dict[str, int]
+
+        >>> sorted(LadderTable({"cast", "case", "vase", "cusp"}, "vase").\
+reachable().items())
+        [('case', 1), ('cast', 2), ('vase', 0)]
+        """
+        return {w: d for w, d in zip(self.index.words, self.dist) if d >= 0}
+
+
+def ladder_table(ws, target, chars=LOWERCASE, indels=False):
+    """
+    Return the LadderTable for ladders to target in ws, building it only
+    if it is not among the TABLE_CACHE_SIZE most recently used.
+
+    @type ws: set[str]
+    @type target: str
+    @type chars: str
+    @type indels: bool
+    @rtype: LadderTable
+
+    >>> ws = {"cast", "case", "vase"}
+    >>> ladder_table(ws, "vase") is ladder_table(ws, "vase")
+    True
+    """
+    return _cached(_TABLES, TABLE_CACHE_SIZE,
+                   (word_set_fingerprint(ws), target, chars, indels),
+                   lambda: LadderTable(ws, target, chars, indels))
+
+
+def table_solve(puzzle):
+    """
+    Return a shortest solution of WordLadderPuzzle puzzle as the root of
+    a PuzzleNode chain, like breadth_first_solve, or None if there is
+    none, in time proportional to its length once the table for its
+    target is built.
+
+    @type puzzle: WordLadderPuzzle
+    @rtype: PuzzleNode | None
+
+    >>> ws = {"cast", "case", "vase", "cost"}
+    >>> print(table_solve(WordLadderPuzzle("cost", "vase", ws)).puzzle)
+    cost --> vase
+    """
+    table = ladder_table(puzzle._word_set, puzzle._to_word, puzzle._chars,
+                         puzzle._indels)
+    words = table.path(puzzle._from_word)
+    if words is None:
+        return None
+    return _chain([WordLadderPuzzle(w, puzzle._to_word, puzzle._word_set,
+                                    puzzle._chars, puzzle._indels)
+                   for w in words])
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()